@@ -0,0 +1,256 @@
+"""
+BatchRenderer - ヘッドレス一括レンダリングツール
+PyQtを使用せずにGameEngine/ImageProcessorで各画像のエフェクトフレームを事前生成する
+
+使い方:
+    python batch_renderer.py --mode blur --steps 31 --output video
+    python batch_renderer.py --mode hybrid --progress 0,0.5,1.0 --output images
+    python batch_renderer.py --mode blur --steps 121 --output sequence --out-dir sequences
+    python batch_renderer.py --mode hybrid --curve hybrid_blur=ease_out --output video
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+
+import pixel_layout
+import runtime_config
+from dataset_loader import DatasetLoader
+from effect_modes import mode_names
+from effect_sequence import EffectSequence, sequence_path, source_identity
+from game_engine import GameEngine
+from image_processor import BLUR_METHODS
+from label_loader import LabelLoader
+from reveal_curve import parse_curve_args
+
+
+OUTPUT_FORMATS = ("video", "images", "cache", "sequence")
+
+
+def parse_progress_values(progress=None, steps=11):
+    """
+    レンダリング対象の進行度リストを作成
+
+    Args:
+        progress: カンマ区切りの進行度文字列（例: "0,0.5,1.0"）。Noneの場合はstepsを使用
+        steps: 0.0〜1.0を等間隔に分割する点数
+
+    Returns:
+        進行度（0.0-1.0）のリスト
+    """
+    if progress:
+        values = [float(v) for v in progress.split(",") if v.strip()]
+    else:
+        steps = max(1, int(steps))
+        values = [i / (steps - 1) for i in range(steps)] if steps > 1 else [1.0]
+    return [max(0.0, min(1.0, v)) for v in values]
+
+
+def render_frames(image_path, mode, progress_values, labels_file="labels.json",
+                  use_pyramid=False, blur_method="gaussian", layout="rgb", curves=None):
+    """
+    1枚の画像について指定進行度のフレームを生成
+
+    Args:
+        image_path: 画像ファイルのパス
+        mode: ゲームモード（effect_modesに登録されたモード名）
+        progress_values: 進行度のリスト
+        labels_file: ラベルファイルのパス
+        use_pyramid: 強いぼかしを縮小ピラミッド上で近似する（高速・非可逆）
+        blur_method: ぼかし方式 ('gaussian', 'separable', 'box')
+        layout: 出力フレームの画素レイアウト
+        curves: モードごとの進行度カーブ（reveal_curve.DEFAULT_CURVESのキーとカーブ指定の辞書）
+
+    Returns:
+        フレームを積み重ねた配列 (len(progress_values), H, W, C)
+    """
+    # time_limit=1.0 にすることで経過時間 = 進行度として扱う
+    engine = GameEngine(
+        image_path, mode, time_limit=1.0, label_loader=LabelLoader(labels_file),
+        blur_method=blur_method, layout=layout, curves=curves,
+    )
+    # バッチAPIで全進行度を1度に描画する（出力配列を1つだけ確保）
+    return engine.render_progress_batch(progress_values, use_pyramid=use_pyramid)
+
+
+def write_video(frames, path, fps, layout="rgb"):
+    """フレーム列を動画ファイルとして書き出す"""
+    width, height = pixel_layout.image_size(frames[0], layout)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    try:
+        for frame in frames:
+            writer.write(pixel_layout.to_bgr(frame, layout))
+    finally:
+        writer.release()
+
+
+def write_image_sequence(frames, directory, mode, image_format, layout="rgb"):
+    """フレーム列を連番画像として書き出す"""
+    os.makedirs(directory, exist_ok=True)
+    for i, frame in enumerate(frames):
+        path = os.path.join(directory, f"{mode}_{i:04d}.{image_format}")
+        cv2.imwrite(path, pixel_layout.to_bgr(frame, layout))
+
+
+def write_frame_cache(frames, progress_values, path):
+    """フレーム列を生のRGB配列（.npz）として書き出す"""
+    np.savez(path, frames=np.asarray(frames), progress=np.asarray(progress_values, dtype=np.float32))
+
+
+def render_image_job(image_path, mode, progress_values, output, out_dir,
+                     fps=10, image_format="png", labels_file="labels.json",
+                     use_pyramid=False, blur_method="gaussian", curves=None):
+    """
+    1枚の画像のレンダリングと書き出しを行うワーカー関数
+
+    Returns:
+        画像ごとの計測結果の辞書
+    """
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+
+    # 動画・連番画像はBGRで書き出すため、読み込み時から最後までBGRのまま処理する
+    layout = "bgr" if output in ("video", "images") else "rgb"
+    start = time.perf_counter()
+    frames = render_frames(
+        image_path, mode, progress_values, labels_file, use_pyramid, blur_method, layout, curves
+    )
+    render_sec = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if output == "video":
+        target = os.path.join(out_dir, f"{stem}_{mode}.mp4")
+        write_video(frames, target, fps, layout)
+    elif output == "images":
+        target = os.path.join(out_dir, stem)
+        write_image_sequence(frames, target, mode, image_format, layout)
+    elif output == "sequence":
+        target = sequence_path(image_path, mode, out_dir)
+        EffectSequence.from_frames(frames, progress_values, source=source_identity(image_path)).save(target)
+    else:
+        target = os.path.join(out_dir, f"{stem}_{mode}.npz")
+        write_frame_cache(frames, progress_values, target)
+    write_sec = time.perf_counter() - start
+
+    return {
+        "image": image_path,
+        "output": target,
+        "frames": len(frames),
+        "render_sec": render_sec,
+        "write_sec": write_sec,
+        "ms_per_frame": render_sec * 1000 / len(frames) if len(frames) else 0.0,
+    }
+
+
+def run_batch(image_paths, mode, progress_values, output, out_dir,
+              workers=None, fps=10, image_format="png", labels_file="labels.json",
+              use_pyramid=False, blur_method="gaussian", runtime=None, curves=None):
+    """
+    全画像を複数プロセスで並列にレンダリング
+
+    Args:
+        runtime: ワーカーに適用するRuntimeConfig（Noneの場合はbatchの既定値）
+        curves: モードごとの進行度カーブ（Noneの場合は既定のカーブ）
+
+    Returns:
+        画像ごとの計測結果のリスト（画像パス順）
+    """
+    if output not in OUTPUT_FORMATS:
+        raise ValueError(f"未対応の出力形式です: {output}")
+    os.makedirs(out_dir, exist_ok=True)
+
+    if runtime is None:
+        runtime = runtime_config.RuntimeConfig.for_mode("batch", workers=workers)
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=runtime.workers or None, initializer=runtime_config.init_worker,
+        initargs=(runtime, runtime_config.make_worker_counter()),
+    ) as executor:
+        futures = {
+            executor.submit(
+                render_image_job, path, mode, progress_values, output, out_dir,
+                fps, image_format, labels_file, use_pyramid, blur_method, curves,
+            ): path
+            for path in image_paths
+        }
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append({"image": futures[future], "error": str(e)})
+
+    results.sort(key=lambda r: r["image"])
+    return results
+
+
+def print_report(results):
+    """画像ごとの計測結果を表形式で表示"""
+    print(f"{'image':<32} {'frames':>6} {'render[s]':>10} {'write[s]':>9} {'ms/frame':>9}")
+    for r in results:
+        name = os.path.basename(r["image"])
+        if "error" in r:
+            print(f"{name:<32} エラー: {r['error']}")
+            continue
+        print(
+            f"{name:<32} {r['frames']:>6} {r['render_sec']:>10.3f} "
+            f"{r['write_sec']:>9.3f} {r['ms_per_frame']:>9.2f}"
+        )
+    ok = [r for r in results if "error" not in r]
+    if ok:
+        total_frames = sum(r["frames"] for r in ok)
+        total_render = sum(r["render_sec"] for r in ok)
+        print(f"合計: {len(ok)}枚 / {total_frames}フレーム / レンダリング {total_render:.3f}s")
+
+
+def main(argv=None):
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="ヘッドレス一括レンダリング")
+    parser.add_argument("--mode", choices=mode_names(), default="blur")
+    parser.add_argument("--images-dir", default="images")
+    parser.add_argument("--labels-file", default="labels.json")
+    parser.add_argument("--steps", type=int, default=11, help="0.0〜1.0の分割数")
+    parser.add_argument("--progress", help="カンマ区切りの進行度（--stepsより優先）")
+    parser.add_argument("--output", choices=OUTPUT_FORMATS, default="cache")
+    parser.add_argument("--out-dir", default="rendered")
+    parser.add_argument("--workers", type=int, default=None, help="プロセス数（既定: CPUコア数）")
+    parser.add_argument("--fps", type=float, default=10.0, help="動画出力時のフレームレート")
+    parser.add_argument("--image-format", default="png", help="連番画像の拡張子")
+    parser.add_argument("--pyramid", action="store_true",
+                        help="強いぼかしを縮小ピラミッド上で近似する（高速）")
+    parser.add_argument("--blur-method", choices=BLUR_METHODS, default="gaussian",
+                        help="ぼかし方式（box: sigmaによらず一定コストの近似）")
+    parser.add_argument("--curve", action="append", default=[], metavar="KEY=CURVE",
+                        help="進行度カーブ（例: blur=ease_out, hybrid_blur=piecewise:0:0,0.6:1,1:1）")
+    runtime_config.add_arguments(parser)
+    parser.add_argument("--report", help="計測結果をJSONで保存するパス")
+    args = parser.parse_args(argv)
+
+    image_paths = DatasetLoader(args.images_dir).get_all_images()
+    if not image_paths:
+        print(f"画像が見つかりません: {args.images_dir}")
+        return 1
+
+    progress_values = parse_progress_values(args.progress, args.steps)
+    runtime = runtime_config.from_args("batch", args, workers=args.workers)
+    results = run_batch(
+        image_paths, args.mode, progress_values, args.output, args.out_dir,
+        workers=args.workers, fps=args.fps, image_format=args.image_format,
+        labels_file=args.labels_file, use_pyramid=args.pyramid,
+        blur_method=args.blur_method, runtime=runtime, curves=parse_curve_args(args.curve),
+    )
+    print_report(results)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    return 1 if any("error" in r for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
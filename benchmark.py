@@ -0,0 +1,356 @@
+"""
+Benchmark - ImageProcessor/GameEngineのホットパス計測ツール
+合成画像を使い、モード × 解像度 × 進行度の組み合わせごとにフレーム処理時間を計測する
+
+使い方:
+    python benchmark.py --output bench.json
+    python benchmark.py --output new.json --baseline bench.json --threshold 0.10
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+import pixel_layout
+import runtime_config
+from effect_modes import available_modes, mode_names
+from game_engine import GameEngine
+from image_processor import BLUR_METHODS, ImageProcessor
+from label_loader import LabelLoader
+
+
+DEFAULT_RESOLUTIONS = ["320x240", "640x480", "1280x720"]
+DEFAULT_PROGRESS = [0.0, 0.25, 0.5, 0.75, 1.0]
+DEFAULT_TARGETS = ["apply_blur", "apply_zoom", "apply_hybrid", "apply_pixelate", "apply_tiles",
+                   "apply_noise", "get_processed_image"]
+# バッチAPIの計測対象（batch_size枚を1回の呼び出しで描画し、1フレームあたりの時間も記録する）
+BATCH_TARGETS = ["apply_blur_batch", "apply_zoom_batch", "apply_hybrid_batch", "apply_pixelate_batch",
+                 "apply_tiles_batch", "apply_noise_batch", "render_progress_batch"]
+# レイアウトごとの読み込み・表示の変換コストの計測対象
+LAYOUT_TARGETS = ["load_image", "display_buffer"]
+
+
+def make_synthetic_image(width, height, seed=0):
+    """
+    計測用の合成RGB画像を生成（グラデーション + ノイズ）
+
+    Args:
+        width: 幅
+        height: 高さ
+        seed: 乱数シード
+
+    Returns:
+        uint8のRGB画像 (height, width, 3)
+    """
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    base = np.stack(
+        [np.broadcast_to(x, (height, width)), np.broadcast_to(y, (height, width)),
+         (x + y) / 2],
+        axis=-1,
+    )
+    noise = rng.normal(0, 20, size=(height, width, 3)).astype(np.float32)
+    return np.clip(base + noise, 0, 255).astype(np.uint8)
+
+
+def parse_resolution(text):
+    """'WIDTHxHEIGHT' 形式の文字列を (width, height) に変換"""
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def percentile_ms(samples, q):
+    """秒単位のサンプルからパーセンタイル値（ミリ秒）を計算"""
+    return float(np.percentile(samples, q) * 1000)
+
+
+def build_callable(target, image, engine, processor):
+    """
+    計測対象の関数を (progress -> frame) 形式で返す
+
+    Args:
+        target: 計測対象名
+        image: 入力画像（processorのレイアウト）
+        engine: get_processed_image用のGameEngine
+        processor: ImageProcessorインスタンス
+    """
+    if target == "get_processed_image":
+        return lambda progress: engine.get_processed_image(progress * engine.time_limit)
+    if target == "load_image":
+        # 画像ファイルのデコードと内部レイアウトへの変換
+        return lambda progress: engine.load_image()
+    if target == "display_buffer":
+        # 表示用バッファの準備（QImageへ渡す前の変換）
+        return lambda progress: pixel_layout.display_buffer(image, processor.layout)
+    method = getattr(processor, target)
+    return lambda progress: method(image, progress)
+
+
+def build_batch_callable(target, image, engine, processor, batch_size):
+    """
+    バッチAPIの計測対象を引数なしの関数として返す
+
+    出力配列は事前に確保し、毎回同じ配列に書き込む
+    """
+    progress_values = np.linspace(0.0, 1.0, batch_size)
+    out = np.empty((batch_size,) + image.shape, dtype=image.dtype)
+    if target == "render_progress_batch":
+        return lambda _: engine.render_progress_batch(progress_values, out)
+    method = getattr(processor, target)
+    return lambda _: method(image, progress_values, out)
+
+
+def measure(func, progress, repeat, warmup):
+    """
+    1つの組み合わせについて処理時間とピークメモリを計測
+
+    Returns:
+        計測結果の辞書
+    """
+    for _ in range(warmup):
+        func(progress)
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(progress)
+        samples.append(time.perf_counter() - start)
+
+    # メモリ計測は時間計測に影響しないよう別パスで行う
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    func(progress)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    mean = sum(samples) / len(samples)
+    return {
+        "p50_ms": percentile_ms(samples, 50),
+        "p95_ms": percentile_ms(samples, 95),
+        "p99_ms": percentile_ms(samples, 99),
+        "mean_ms": mean * 1000,
+        "fps": 1.0 / mean if mean > 0 else 0.0,
+        "peak_mem_bytes": int(peak),
+    }
+
+
+def run_targets(targets, image, engine, processor, resolution, layout, progress_values,
+                engine_mode, repeat, warmup, batch_size):
+    """1つの解像度・レイアウトについて全計測対象を計測"""
+    results = []
+    for target in targets:
+        if target in BATCH_TARGETS:
+            func = build_batch_callable(target, image, engine, processor, batch_size)
+            entry = {"target": target, "resolution": resolution, "layout": layout,
+                     "progress": "batch", "batch_size": batch_size}
+            if target == "render_progress_batch":
+                entry["mode"] = engine_mode
+            entry.update(measure(func, None, repeat, warmup))
+            entry["ms_per_frame"] = entry["p50_ms"] / batch_size
+            results.append(entry)
+            print(
+                f"{target:<20} {resolution:>10} {layout:<6} n={batch_size:<5d} "
+                f"p50={entry['p50_ms']:8.2f}ms ({entry['ms_per_frame']:.2f}ms/frame)"
+            )
+            continue
+
+        func = build_callable(target, image, engine, processor)
+        # 読み込み・表示の変換は進行度によらないため1回だけ計測する
+        for progress in (progress_values if target not in LAYOUT_TARGETS else [1.0]):
+            entry = {"target": target, "resolution": resolution, "layout": layout,
+                     "progress": progress}
+            if target == "get_processed_image":
+                entry["mode"] = engine_mode
+            entry.update(measure(func, progress, repeat, warmup))
+            results.append(entry)
+            print(
+                f"{target:<20} {resolution:>10} {layout:<6} p={progress:<5.2f} "
+                f"p50={entry['p50_ms']:8.2f}ms p95={entry['p95_ms']:8.2f}ms "
+                f"fps={entry['fps']:8.1f}"
+            )
+    return results
+
+
+def run_benchmarks(resolutions=None, progress_values=None, targets=None,
+                   engine_mode="hybrid", repeat=20, warmup=2, batch_size=31,
+                   blur_method="gaussian", tile_workers=0, runtime=None, layouts=None):
+    """
+    ベンチマークを実行
+
+    Args:
+        resolutions: 'WIDTHxHEIGHT' のリスト
+        progress_values: 進行度のリスト
+        targets: 計測対象名のリスト
+        engine_mode: get_processed_image計測時のモード
+        repeat: 計測回数
+        warmup: ウォームアップ回数
+        batch_size: バッチAPI計測時の1回あたりのフレーム数
+        blur_method: ImageProcessorのぼかし方式
+        tile_workers: タイル分割して並列処理するスレッド数（0: 分割しない）
+        runtime: 計測前に適用するRuntimeConfig（Noneの場合はkioskの既定値）
+        layouts: 計測する画素レイアウトのリスト（Noneの場合は 'rgb' のみ）
+
+    Returns:
+        JSONに書き出せる計測結果の辞書
+    """
+    resolutions = resolutions or DEFAULT_RESOLUTIONS
+    progress_values = progress_values or DEFAULT_PROGRESS
+    targets = targets or DEFAULT_TARGETS
+    layouts = layouts or ["rgb"]
+    runtime = runtime or runtime_config.RuntimeConfig.for_mode("kiosk")
+    runtime.apply()
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for resolution in resolutions:
+            width, height = parse_resolution(resolution)
+            bgr_image = cv2.cvtColor(make_synthetic_image(width, height), cv2.COLOR_RGB2BGR)
+
+            # GameEngineは画像ファイルから読み込むため一時ファイルに書き出す
+            image_path = os.path.join(tmp_dir, f"bench-{resolution}.png")
+            cv2.imwrite(image_path, bgr_image)
+
+            for layout in layouts:
+                image = pixel_layout.from_bgr(bgr_image, layout)
+                processor = ImageProcessor(blur_method, tile_workers, layout)
+                engine = GameEngine(
+                    image_path, engine_mode,
+                    label_loader=LabelLoader(os.path.join(tmp_dir, "none.json")),
+                    blur_method=blur_method, tile_workers=tile_workers, layout=layout,
+                )
+                results.extend(run_targets(
+                    targets, image, engine, processor, resolution, layout, progress_values,
+                    engine_mode, repeat, warmup, batch_size,
+                ))
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": repeat,
+            "batch_size": batch_size,
+            "blur_method": blur_method,
+            "tile_workers": tile_workers,
+            "layouts": layouts,
+            "runtime": runtime.describe(),
+            "modes": [mode.describe() for mode in available_modes()],
+        },
+        "results": results,
+    }
+
+
+def result_key(entry):
+    """比較用のキー（対象・解像度・レイアウト・進行度・モード）"""
+    return (entry["target"], entry["resolution"], entry.get("layout", "rgb"), entry["progress"],
+            entry.get("mode"))
+
+
+def compare_with_baseline(current, baseline, threshold=0.10, metric="p50_ms"):
+    """
+    ベースラインと比較して閾値を超えて遅くなった組み合わせを抽出
+
+    Args:
+        current: 今回の計測結果
+        baseline: ベースラインの計測結果
+        threshold: 許容する悪化率（0.10 = 10%）
+        metric: 比較する指標
+
+    Returns:
+        悪化した組み合わせのリスト
+    """
+    base_map = {result_key(e): e for e in baseline.get("results", [])}
+    regressions = []
+    for entry in current.get("results", []):
+        base = base_map.get(result_key(entry))
+        if base is None or base.get(metric, 0) <= 0:
+            continue
+        ratio = entry[metric] / base[metric] - 1.0
+        if ratio > threshold:
+            regressions.append({
+                "target": entry["target"],
+                "resolution": entry["resolution"],
+                "layout": entry.get("layout", "rgb"),
+                "progress": entry["progress"],
+                "baseline": base[metric],
+                "current": entry[metric],
+                "change": ratio,
+            })
+    return regressions
+
+
+def main(argv=None):
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="画像処理ホットパスのベンチマーク")
+    parser.add_argument("--resolutions", default=",".join(DEFAULT_RESOLUTIONS))
+    parser.add_argument("--progress", default=",".join(str(p) for p in DEFAULT_PROGRESS))
+    parser.add_argument("--targets", default=",".join(DEFAULT_TARGETS),
+                        help=f"計測対象（バッチAPI: {','.join(BATCH_TARGETS)}、"
+                             f"レイアウト変換: {','.join(LAYOUT_TARGETS)}）")
+    parser.add_argument("--engine-mode", choices=mode_names(), default="hybrid",
+                        help="get_processed_image・render_progress_batchのモード")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--blur-method", choices=BLUR_METHODS, default="gaussian")
+    parser.add_argument("--runtime-mode", choices=runtime_config.EXECUTION_MODES, default="kiosk",
+                        help="OpenCVのスレッド数などの既定値に使う実行形態")
+    runtime_config.add_arguments(parser)
+    parser.add_argument("--layouts", default="rgb",
+                        help=f"計測する画素レイアウト（カンマ区切り: {','.join(pixel_layout.LAYOUTS)}）")
+    parser.add_argument("--tile-workers", type=int, default=0,
+                        help="ぼかしをタイル分割して並列処理するスレッド数（0: 分割しない）")
+    parser.add_argument("--batch-size", type=int, default=31, help="バッチAPI計測時のフレーム数")
+    parser.add_argument("--output", help="計測結果のJSON出力先")
+    parser.add_argument("--baseline", help="比較するベースラインJSON")
+    parser.add_argument("--threshold", type=float, default=0.10, help="許容する悪化率")
+    parser.add_argument("--metric", default="p50_ms")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(
+        resolutions=[r for r in args.resolutions.split(",") if r],
+        progress_values=[float(p) for p in args.progress.split(",") if p],
+        targets=[t for t in args.targets.split(",") if t],
+        engine_mode=args.engine_mode,
+        repeat=args.repeat,
+        warmup=args.warmup,
+        batch_size=args.batch_size,
+        blur_method=args.blur_method,
+        tile_workers=args.tile_workers,
+        runtime=runtime_config.from_args(args.runtime_mode, args),
+        layouts=[l for l in args.layouts.split(",") if l],
+    )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(report, baseline, args.threshold, args.metric)
+        if regressions:
+            print(f"性能劣化を検出しました（閾値 {args.threshold:.0%}）:")
+            for r in regressions:
+                print(
+                    f"  {r['target']} {r['resolution']} {r['layout']} p={r['progress']}: "
+                    f"{r['baseline']:.2f} -> {r['current']:.2f} ({r['change']:+.1%})"
+                )
+            return 1
+        print("ベースラインからの性能劣化はありません")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
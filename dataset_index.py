@@ -0,0 +1,118 @@
+"""
+DatasetIndex - 画像ごとの事前計算結果を保持するデータセットインデックス
+画像ファイル名をキーとして、難易度の較正結果（推奨制限時間・表示カーブ）などを保存する
+
+ファイル形式（JSON）:
+    {
+        "version": 1,
+        "images": {
+            "a-cat1.jpg": {
+                "calibration": {"time_limit": 24.0, "curve": {"type": "gamma", "gamma": 1.3}, ...},
+                "validation": {"status": "ok", "reason": null, "width": 640, "height": 480, ...}
+            }
+        }
+    }
+"""
+
+import json
+import os
+
+INDEX_VERSION = 1
+
+
+def file_stamp(path):
+    """画像が変更されたかの判定に使う (サイズ, 更新時刻)"""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class DatasetIndex:
+    """データセットインデックスクラス"""
+
+    def __init__(self, index_file="dataset_index.json"):
+        """
+        初期化
+
+        Args:
+            index_file: インデックスファイルのパス（存在しない場合は空のインデックス）
+        """
+        self.index_file = index_file
+        self.images = {}
+        self.load()
+
+    def load(self):
+        """インデックスファイルを読み込む"""
+        self.images = {}
+        if not os.path.exists(self.index_file):
+            return
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"データセットインデックスの読み込みエラー: {e}")
+            return
+        self.images = data.get("images", {})
+
+    def save(self):
+        """インデックスファイルに保存（一時ファイルに書いてから置き換える）"""
+        directory = os.path.dirname(self.index_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.index_file}.tmp{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "images": self.images}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.index_file)
+
+    def get(self, image_filename):
+        """
+        画像のエントリを取得
+
+        Args:
+            image_filename: 画像ファイル名（パスを含む場合はbasenameを使用）
+
+        Returns:
+            エントリの辞書。登録されていない場合は空の辞書
+        """
+        return self.images.get(os.path.basename(image_filename), {})
+
+    def update(self, image_filename, **fields):
+        """画像のエントリに値を設定（保存はsaveで行う）"""
+        entry = self.images.setdefault(os.path.basename(image_filename), {})
+        entry.update(fields)
+        return entry
+
+    def get_calibration(self, image_filename):
+        """
+        画像の難易度較正結果を取得
+
+        Returns:
+            較正結果の辞書（time_limit, curve など）。較正されていない場合はNone
+        """
+        return self.get(image_filename).get("calibration")
+
+    def get_validation(self, image_filename):
+        """
+        画像の整合性チェックの結果を取得（image_validation.py）
+
+        Returns:
+            検証結果の辞書（status, reason など）。検証されていない場合はNone
+        """
+        return self.get(image_filename).get("validation")
+
+    def is_quarantined(self, image_filename):
+        """画像が整合性チェックで隔離されているか"""
+        validation = self.get_validation(image_filename)
+        return bool(validation) and validation.get("status") == "quarantined"
+
+    def quarantined(self):
+        """
+        隔離されている画像
+
+        Returns:
+            {画像ファイル名: 検証結果} の辞書
+        """
+        return {
+            name: entry["validation"]
+            for name, entry in self.images.items()
+            if entry.get("validation", {}).get("status") == "quarantined"
+        }
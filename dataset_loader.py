@@ -1,52 +1,110 @@
 """
 データセットローダー
 imagesフォルダからランダムに画像を選択する機能を提供
+
+validate=True の場合は、読み込み時に画像の整合性チェック（image_validation.py）を行い、
+壊れた画像・画素数が上限を超える画像を出題対象から除く（結果はdataset_indexに記録する）
 """
 
 import os
 import random
 from pathlib import Path
 
+from image_validation import MAX_PIXELS, validate_images
+
 
 class DatasetLoader:
     """データセットローダークラス"""
 
-    def __init__(self, images_dir="images"):
+    def __init__(self, images_dir="images", seed=None, validate=False, dataset_index=None, label_loader=None,
+                 max_pixels=MAX_PIXELS, workers=None, require_labels=False):
         """
         初期化
 
         Args:
             images_dir: 画像フォルダのパス
+            seed: 画像選択の乱数シード（Noneの場合は毎回異なる。シミュレーションなどで再現性が必要な場合に指定）
+            validate: Trueの場合、画像の整合性チェックを行い、隔離した画像を出題しない
+            dataset_index: 検証結果を記録するDatasetIndex（変更のない画像は再確認しない。Noneの場合は毎回確認する）
+            label_loader: ラベルの有無を記録するLabelLoader（オプション）
+            max_pixels: 画素数の上限
+            workers: 並列に検証するスレッド数（Noneの場合はCPU数）
+            require_labels: Trueの場合、labels.jsonにエントリがない画像も出題しない
         """
         self.images_dir = images_dir
+        self.rng = random.Random(seed)
         self.supported_formats = {".png", ".jpg", ".jpeg", ".bmp", ".gif"}
+        self.validate = validate
+        self.dataset_index = dataset_index
+        self.label_loader = label_loader
+        self.max_pixels = max_pixels
+        self.workers = workers or os.cpu_count() or 1
+        self.require_labels = require_labels
         self.image_files = []
+        self.quarantined = {}  # 画像パス -> 検証結果（出題対象から除いた画像）
         self.load_image_list()
 
-    def load_image_list(self):
-        """画像ファイルのリストを読み込む"""
+    def scan_image_files(self):
+        """
+        対応する拡張子の画像ファイルを列挙（整合性チェックは行わない）
+
+        Returns:
+            画像ファイルパスのリスト
+        """
         if not os.path.exists(self.images_dir):
             os.makedirs(self.images_dir, exist_ok=True)
-            return
+            return []
 
-        self.image_files = [
+        # listdirの順序はファイルシステム依存のため、シード指定時に同じ画像を選ぶよう並べ替える
+        return [
             os.path.join(self.images_dir, f)
-            for f in os.listdir(self.images_dir)
+            for f in sorted(os.listdir(self.images_dir))
             if os.path.isfile(os.path.join(self.images_dir, f))
             and Path(f).suffix.lower() in self.supported_formats
         ]
 
-    def get_random_image(self):
+    def load_image_list(self):
+        """画像ファイルのリストを読み込む（validate=Trueの場合は隔離した画像を除く）"""
+        image_files = self.scan_image_files()
+        self.quarantined = {}
+        if not self.validate or not image_files:
+            self.image_files = image_files
+            return
+
+        results, checked = validate_images(
+            image_files, self.dataset_index, self.label_loader, self.max_pixels, self.workers
+        )
+        self.image_files = []
+        for path in image_files:
+            result = results[path]
+            if result["status"] != "ok":
+                self.quarantined[path] = result
+            elif self.require_labels and not result.get("labeled", True):
+                self.quarantined[path] = result
+            else:
+                self.image_files.append(path)
+        if self.quarantined:
+            print(f"出題対象から除いた画像: {len(self.quarantined)} 枚（詳細は python image_validation.py）")
+        if checked and self.dataset_index is not None:
+            self.dataset_index.save()
+
+    def get_random_image(self, exclude=None):
         """
         ランダムに画像を1枚選択
 
+        Args:
+            exclude: 選択しない画像パスの集合（セッション内の使用済み画像など）
+
         Returns:
-            画像ファイルのパス。画像がない場合はNone
+            画像ファイルのパス。選択できる画像がない場合はNone
         """
-        if not self.image_files:
+        candidates = self.image_files
+        if exclude:
+            candidates = [img for img in candidates if img not in exclude]
+        if not candidates:
             return None
 
-        return random.choice(self.image_files)
+        return self.rng.choice(candidates)
 
     def get_all_images(self):
         """
@@ -0,0 +1,685 @@
+"""
+DatasetShards - 複数のマシンに分割したデータセット（シャード）と分散前処理
+マニフェストにシャード（名前・画像フォルダ・重み）を記述し、画像ファイル名のコンシステントハッシュで
+所属するシャードを決める（シャードを追加しても移動する画像は約1/Nで済む）
+
+前処理（サムネイル・内容ハッシュ・難易度指標のキャッシュ・キーフレームシーケンス）は
+「シャード × ハッシュバケット」を作業単位とし、コーディネーターで作業単位を取り合って各ノードで実行する
+    LocalCoordinator:   1台で実行する場合。完了した作業単位を状態ファイルに保存する
+    LockDirCoordinator: 複数ノードで共有するロックディレクトリ（NFSなど）で代替する
+                        作業単位ごとに mkdir でロックを取り、完了結果を <作業単位>.done.json に書く
+完了した作業単位と、サイズ・更新時刻が変わっていない画像は再実行しない（中断しても続きから再開できる）
+前処理の結果は merge でデータセットインデックス（dataset_index.py）に取り込む
+キーフレームシーケンスは、ゲームが再生時に参照するフォルダ（effect_sequence.SEQUENCE_DIR、
+既定 sequences、--sequence-dir）に書き出す。サムネイルは --out-dir に書き出す
+
+マニフェスト（JSON）:
+    {
+        "version": 1,
+        "vnodes": 64,       シャードあたりの仮想ノード数（× weight）
+        "buckets": 16,      シャードあたりの作業単位数
+        "shards": [{"name": "node-a", "root": "/mnt/a/images", "weight": 1}, ...]
+    }
+
+使い方:
+    python dataset_shards.py init --shard node-a=/mnt/a/images --shard node-b=/mnt/b/images@2
+    python dataset_shards.py plan
+    python dataset_shards.py preprocess --lock-dir /shared/vgi-locks --workers 4
+    python dataset_shards.py status --lock-dir /shared/vgi-locks
+    python dataset_shards.py merge --lock-dir /shared/vgi-locks --index dataset_index.json
+"""
+
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import shutil
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from dataset_index import DatasetIndex, file_stamp
+from dataset_loader import DatasetLoader
+from difficulty_calibration import image_signals
+from effect_sequence import SEQUENCE_DIR, EffectSequence, sequence_path
+from frame_cache import image_digest
+from game_engine import GameEngine
+from label_loader import LabelLoader
+from lazy_import import lazy_import
+
+cv2 = lazy_import("cv2")
+
+MANIFEST_VERSION = 1
+DEFAULT_MANIFEST = "dataset_shards.json"
+TASKS = ("hash", "thumbnail", "signals", "sequence")
+THUMBNAIL_SIZE = 256
+
+
+def stable_hash(text):
+    """プロセス・マシンによらない64ビットのハッシュ値"""
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def write_json_atomic(path, data):
+    """一時ファイルに書いてから置き換える（読み込み側が書きかけのファイルを見ないようにする）"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+class HashRing:
+    """重み付きのコンシステントハッシュ"""
+
+    def __init__(self, shards, vnodes=64):
+        """
+        初期化
+
+        Args:
+            shards: {シャード名: 重み} の辞書
+            vnodes: 重み1あたりの仮想ノード数
+        """
+        points = []
+        for name, weight in shards.items():
+            for i in range(max(1, int(vnodes * weight))):
+                points.append((stable_hash(f"{name}#{i}"), name))
+        points.sort()
+        self._keys = [p[0] for p in points]
+        self._names = [p[1] for p in points]
+
+    def lookup(self, key):
+        """キー（画像ファイル名）が所属するシャード名"""
+        if not self._keys:
+            raise ValueError("シャードが登録されていません")
+        i = bisect.bisect(self._keys, stable_hash(key)) % len(self._keys)
+        return self._names[i]
+
+
+class ShardManifest:
+    """シャードのマニフェストクラス"""
+
+    def __init__(self, shards=None, vnodes=64, buckets=16, path=DEFAULT_MANIFEST):
+        """
+        初期化
+
+        Args:
+            shards: {'name', 'root', 'weight'} の辞書のリスト
+            vnodes: 重み1あたりの仮想ノード数
+            buckets: シャードあたりの作業単位数（ノード数より十分多くする）
+            path: マニフェストファイルのパス
+        """
+        self.shards = [dict(s, weight=s.get("weight", 1)) for s in (shards or [])]
+        self.vnodes = vnodes
+        self.buckets = buckets
+        self.path = path
+        self.ring = HashRing({s["name"]: s["weight"] for s in self.shards}, vnodes)
+
+    @classmethod
+    def load(cls, path=DEFAULT_MANIFEST):
+        """マニフェストファイルを読み込む"""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("shards", []), data.get("vnodes", 64), data.get("buckets", 16), path)
+
+    def save(self):
+        """マニフェストファイルに保存"""
+        write_json_atomic(self.path, {
+            "version": MANIFEST_VERSION,
+            "vnodes": self.vnodes,
+            "buckets": self.buckets,
+            "shards": self.shards,
+        })
+
+    def shard_for(self, image_filename):
+        """画像が所属するシャード名"""
+        return self.ring.lookup(os.path.basename(image_filename))
+
+    def bucket_for(self, image_filename):
+        """画像が所属する作業単位のバケット番号（シャードの増減に影響されない）"""
+        return stable_hash("bucket:" + os.path.basename(image_filename)) % self.buckets
+
+    def unit_for(self, image_filename):
+        """画像が所属する作業単位のID"""
+        return f"{self.shard_for(image_filename)}-{self.bucket_for(image_filename):04d}"
+
+    def get_shard(self, name):
+        """シャードの定義（見つからない場合はNone）"""
+        return next((s for s in self.shards if s["name"] == name), None)
+
+    def local_shards(self, names=None):
+        """
+        このマシンから画像フォルダを参照できるシャード
+
+        Args:
+            names: 対象のシャード名（Noneの場合はすべて）
+        """
+        return [
+            s for s in self.shards
+            if (names is None or s["name"] in names) and os.path.isdir(s["root"])
+        ]
+
+    def scan(self, shard):
+        """
+        シャードの画像フォルダを走査
+
+        Returns:
+            (所属する画像パスのリスト, 別のシャードに所属する画像パスのリスト) のタプル
+        """
+        assigned, misplaced = [], []
+        for path in DatasetLoader(shard["root"]).get_all_images():
+            (assigned if self.shard_for(path) == shard["name"] else misplaced).append(path)
+        return assigned, misplaced
+
+
+class ShardedDatasetLoader(DatasetLoader):
+    """
+    このマシンから参照できるシャードの画像をまとめて扱うDatasetLoader
+    （所属するシャード以外のフォルダにある画像は、再配置中の重複を避けるため除く）
+    """
+
+    def __init__(self, manifest, shards=None, seed=None, **kwargs):
+        """
+        初期化
+
+        Args:
+            manifest: ShardManifest
+            shards: 対象のシャード名（Noneの場合は参照できるすべてのシャード）
+            seed: 画像選択の乱数シード
+            **kwargs: DatasetLoaderの整合性チェックの引数（validate, dataset_index など）
+        """
+        self.manifest = manifest
+        self.shard_names = shards
+        super().__init__(images_dir=None, seed=seed, **kwargs)
+
+    def scan_image_files(self):
+        """参照できるシャードの画像ファイルを列挙"""
+        image_files = []
+        for shard in self.manifest.local_shards(self.shard_names):
+            assigned, _ = self.manifest.scan(shard)
+            image_files.extend(assigned)
+        image_files.sort(key=os.path.basename)
+        return image_files
+
+
+# ---------------------------------------------------------------------------
+# コーディネーター
+# ---------------------------------------------------------------------------
+
+def default_owner():
+    """作業者の識別子（ホスト名:PID）"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LocalCoordinator:
+    """1台で実行する場合のコーディネーター（完了結果を状態ファイルに保存）"""
+
+    def __init__(self, state_file="preprocess_state.json", owner=None):
+        """
+        初期化
+
+        Args:
+            state_file: 完了した作業単位の結果を保存するファイル
+            owner: 作業者の識別子
+        """
+        self.state_file = state_file
+        self.owner = owner or default_owner()
+        self._lock = threading.Lock()
+        self._claimed = set()
+        self._done = {}
+        if os.path.exists(state_file):
+            with open(state_file, "r", encoding="utf-8") as f:
+                self._done = json.load(f).get("units", {})
+
+    def claim(self, unit):
+        """作業単位を取得（他の作業者が実行中の場合はFalse）"""
+        with self._lock:
+            if unit in self._claimed:
+                return False
+            self._claimed.add(unit)
+            return True
+
+    def heartbeat(self, unit):
+        """実行中であることを通知（1台の場合は何もしない）"""
+
+    def complete(self, unit, result):
+        """作業単位の完了結果を保存"""
+        with self._lock:
+            self._done[unit] = result
+            self._claimed.discard(unit)
+            write_json_atomic(self.state_file, {"units": self._done})
+
+    def release(self, unit):
+        """完了せずに作業単位を手放す（失敗時）"""
+        with self._lock:
+            self._claimed.discard(unit)
+
+    def result(self, unit):
+        """作業単位の完了結果（未完了の場合はNone）"""
+        return self._done.get(unit)
+
+    def results(self):
+        """{作業単位: 完了結果}"""
+        return dict(self._done)
+
+    def claimed(self):
+        """実行中の作業単位"""
+        return sorted(self._claimed)
+
+
+class LockDirCoordinator:
+    """共有ファイルシステムのロックディレクトリによるコーディネーター"""
+
+    def __init__(self, lock_dir, owner=None, stale_after=600.0):
+        """
+        初期化
+
+        Args:
+            lock_dir: 全ノードで共有するディレクトリ
+            owner: 作業者の識別子
+            stale_after: この秒数ハートビートのないロックは作業者が停止したとみなして引き継ぐ
+        """
+        self.lock_dir = lock_dir
+        self.owner = owner or default_owner()
+        self.stale_after = stale_after
+        os.makedirs(lock_dir, exist_ok=True)
+
+    def _lock_path(self, unit):
+        return os.path.join(self.lock_dir, f"{unit}.lock")
+
+    def _done_path(self, unit):
+        return os.path.join(self.lock_dir, f"{unit}.done.json")
+
+    def _owner_path(self, unit):
+        return os.path.join(self._lock_path(unit), "owner")
+
+    def _lock_age(self, unit):
+        """ロックの最後のハートビートからの秒数（ロックがない場合はNone）"""
+        try:
+            return time.time() - os.path.getmtime(self._owner_path(unit))
+        except FileNotFoundError:
+            # 作成直後でownerがまだない場合はロックの作成時刻で判定する
+            try:
+                return time.time() - os.path.getmtime(self._lock_path(unit))
+            except FileNotFoundError:
+                return None
+
+    def _read_owner(self, unit):
+        """ロックを保持している作業者（ownerがない場合はNone）"""
+        try:
+            with open(self._owner_path(unit), "r", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def claim(self, unit):
+        """
+        作業単位を取得（mkdirが成功した作業者だけが取得できる）
+
+        ハートビートが途絶えたロックは、引き継ぎ用のディレクトリ（<単位>.lock.takeover）を
+        mkdirできた1人だけが、ロックが古いままであることを確認し直してから引き継ぐ
+        （確認と退避の間に、別の作業者が引き継いだ新しいロックを退避しないようにする）
+        """
+        lock = self._lock_path(unit)
+        try:
+            os.mkdir(lock)
+        except FileExistsError:
+            age = self._lock_age(unit)
+            if age is None or age < self.stale_after:
+                return False
+            if not self._take_over(unit):
+                return False
+        with open(self._owner_path(unit), "w", encoding="utf-8") as f:
+            f.write(self.owner)
+        # 書き込みの競合に備えて読み直し、自分のownerでなければ取得できなかったものとする
+        return self._read_owner(unit) == self.owner
+
+    def _take_over(self, unit):
+        """古いロックを退避して作り直す（成功した場合True）"""
+        lock = self._lock_path(unit)
+        takeover = f"{lock}.takeover"
+        try:
+            os.mkdir(takeover)
+        except FileExistsError:
+            # 引き継ぎ中に停止した作業者の引き継ぎ用ディレクトリは削除し、次回の取得で引き継ぐ
+            try:
+                if time.time() - os.path.getmtime(takeover) >= self.stale_after:
+                    os.rmdir(takeover)
+            except OSError:
+                pass
+            return False
+        try:
+            age = self._lock_age(unit)
+            if age is not None and age < self.stale_after:
+                return False
+            stale = f"{lock}.stale.{self.owner.replace(':', '_')}"
+            shutil.rmtree(stale, ignore_errors=True)
+            try:
+                if age is not None:
+                    os.rename(lock, stale)
+                # 退避した直後に通常の取得でロックを作った作業者がいれば、その作業者が取得する
+                os.mkdir(lock)
+            except OSError:
+                return False
+            finally:
+                shutil.rmtree(stale, ignore_errors=True)
+            return True
+        finally:
+            os.rmdir(takeover)
+
+    def heartbeat(self, unit):
+        """実行中であることを通知（ownerの更新時刻を更新。引き継がれたロックは更新しない）"""
+        if self._read_owner(unit) != self.owner:
+            return
+        try:
+            os.utime(self._owner_path(unit))
+        except FileNotFoundError:
+            pass
+
+    def complete(self, unit, result):
+        """完了結果を書いてからロックを削除"""
+        write_json_atomic(self._done_path(unit), result)
+        self.release(unit)
+
+    def release(self, unit):
+        """ロックを削除（他の作業者に引き継がれたロックは削除しない）"""
+        lock = self._lock_path(unit)
+        if self._read_owner(unit) != self.owner:
+            return
+        # 自分専用の名前に退避してから削除する（削除中に別の作業者が作ったロックを消さない）
+        released = f"{lock}.released.{self.owner.replace(':', '_')}"
+        shutil.rmtree(released, ignore_errors=True)
+        try:
+            os.rename(lock, released)
+        except OSError:
+            return
+        shutil.rmtree(released, ignore_errors=True)
+
+    def result(self, unit):
+        """作業単位の完了結果（未完了の場合はNone）"""
+        try:
+            with open(self._done_path(unit), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def results(self):
+        """{作業単位: 完了結果}"""
+        suffix = ".done.json"
+        return {
+            name[:-len(suffix)]: self.result(name[:-len(suffix)])
+            for name in sorted(os.listdir(self.lock_dir)) if name.endswith(suffix)
+        }
+
+    def claimed(self):
+        """実行中の作業単位"""
+        return sorted(name[:-5] for name in os.listdir(self.lock_dir) if name.endswith(".lock"))
+
+
+def create_coordinator(lock_dir=None, state_file="preprocess_state.json", owner=None, stale_after=600.0):
+    """lock_dirを指定した場合はLockDirCoordinator、それ以外はLocalCoordinator"""
+    if lock_dir:
+        return LockDirCoordinator(lock_dir, owner, stale_after)
+    return LocalCoordinator(state_file, owner)
+
+
+# ---------------------------------------------------------------------------
+# 前処理
+# ---------------------------------------------------------------------------
+
+def preprocess_image(image_path, tasks=TASKS, out_dir="preprocessed", modes=("blur",), steps=121,
+                     labels_file="labels.json", sequence_dir=SEQUENCE_DIR):
+    """
+    1枚の画像の前処理（ワーカープロセスで実行）
+
+    Args:
+        image_path: 画像ファイルのパス
+        tasks: 実行する処理（TASKSの部分集合）
+        out_dir: サムネイルの出力先
+        modes: シーケンスを作成するモード
+        steps: シーケンスの進行度の分割数
+        labels_file: GameEngineに渡すラベルファイル
+        sequence_dir: シーケンスの出力先（ゲームが再生時に参照するフォルダ）
+
+    Returns:
+        画像ごとの結果の辞書（失敗した場合は 'error' を含む）
+    """
+    filename = os.path.basename(image_path)
+    result = {"file": filename, "stamp": file_stamp(image_path)}
+    try:
+        if "hash" in tasks:
+            result["sha1"] = image_digest(image_path)
+        if "thumbnail" in tasks:
+            image = cv2.imread(image_path)
+            if image is None:
+                raise ValueError(f"画像の読み込みに失敗しました: {image_path}")
+            height, width = image.shape[:2]
+            result["size"] = [width, height]
+            scale = THUMBNAIL_SIZE / max(height, width)
+            if scale < 1.0:
+                image = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                                   interpolation=cv2.INTER_AREA)
+            target = os.path.join(out_dir, "thumbnails", os.path.splitext(filename)[0] + ".jpg")
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            cv2.imwrite(target, image, [cv2.IMWRITE_JPEG_QUALITY, 85])
+            result["thumbnail"] = target
+        if "signals" in tasks:
+            result["signals"] = image_signals(image_path)
+        if "sequence" in tasks:
+            label_loader = LabelLoader(labels_file)
+            result["sequences"] = {}
+            for mode in modes:
+                engine = GameEngine(image_path, mode, label_loader=label_loader)
+                target = sequence_path(image_path, mode, sequence_dir)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                EffectSequence.render(engine, steps).save(target)
+                result["sequences"][mode] = target
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def plan_units(manifest, shards=None):
+    """
+    このマシンで実行できる作業単位を列挙
+
+    Returns:
+        ({作業単位: 画像パスのリスト}, 別のシャードに所属する画像パスのリスト) のタプル
+    """
+    units = {}
+    misplaced = []
+    for shard in manifest.local_shards(shards):
+        assigned, wrong = manifest.scan(shard)
+        misplaced.extend(wrong)
+        for path in assigned:
+            units.setdefault(manifest.unit_for(path), []).append(path)
+    return units, misplaced
+
+
+def pending_images(paths, previous):
+    """前回の結果がない、または変更された画像（失敗した画像は再実行する）"""
+    done = {r["file"]: r for r in (previous or {}).get("images", []) if "error" not in r}
+    return [
+        path for path in paths
+        if os.path.basename(path) not in done or done[os.path.basename(path)]["stamp"] != file_stamp(path)
+    ]
+
+
+def run_preprocess(manifest, coordinator, tasks=TASKS, out_dir="preprocessed", modes=("blur",), steps=121,
+                   workers=None, shards=None, labels_file="labels.json", log=print, sequence_dir=SEQUENCE_DIR):
+    """
+    作業単位を取得しながら前処理を実行
+
+    Args:
+        manifest: ShardManifest
+        coordinator: LocalCoordinator / LockDirCoordinator
+        workers: 1作業単位内の並列プロセス数
+        shards: 対象のシャード名（Noneの場合は参照できるすべてのシャード）
+        sequence_dir: シーケンスの出力先（ゲームが再生時に参照するフォルダ）
+
+    Returns:
+        {'units': 実行した作業単位数, 'images': 処理した画像数, 'errors': 失敗数, 'skipped': 他ノードが実行中の作業単位数}
+    """
+    units, _ = plan_units(manifest, shards)
+    # ノードごとに順番を変え、同じ作業単位の取り合いを減らす
+    order = sorted(units, key=lambda unit: stable_hash(f"{coordinator.owner}:{unit}"))
+    stats = {"units": 0, "images": 0, "errors": 0, "skipped": 0}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for unit in order:
+            paths = sorted(units[unit])
+            if not pending_images(paths, coordinator.result(unit)):
+                continue
+            if not coordinator.claim(unit):
+                stats["skipped"] += 1
+                continue
+            try:
+                # 取得後に結果を読み直す（他のノードが直前に完了させた場合）
+                previous = coordinator.result(unit)
+                todo = pending_images(paths, previous)
+                results = {r["file"]: r for r in (previous or {}).get("images", [])}
+                current = {os.path.basename(p) for p in paths}
+                results = {name: r for name, r in results.items() if name in current}
+                futures = [
+                    executor.submit(preprocess_image, path, tasks, out_dir, modes, steps, labels_file, sequence_dir)
+                    for path in todo
+                ]
+                for future in futures:
+                    r = future.result()
+                    results[r["file"]] = r
+                    stats["images"] += 1
+                    stats["errors"] += "error" in r
+                    coordinator.heartbeat(unit)
+                shard = manifest.shard_for(paths[0])
+                coordinator.complete(unit, {
+                    "unit": unit, "shard": shard, "owner": coordinator.owner, "finished": time.time(),
+                    "images": [results[name] for name in sorted(results)],
+                })
+                stats["units"] += 1
+                log(f"{unit}: {len(todo)}/{len(paths)} 枚を処理しました")
+            except BaseException:
+                coordinator.release(unit)
+                raise
+    return stats
+
+
+def merge_results(coordinator, index, manifest=None):
+    """
+    完了した作業単位の結果をデータセットインデックスに取り込む
+
+    Returns:
+        取り込んだ画像数
+    """
+    count = 0
+    for unit, result in coordinator.results().items():
+        if not result:
+            continue
+        for r in result.get("images", []):
+            if "error" in r:
+                continue
+            fields = {k: v for k, v in r.items() if k not in ("file", "stamp")}
+            shard = manifest.shard_for(r["file"]) if manifest is not None else result.get("shard")
+            index.update(r["file"], shard=shard, preprocess=fields)
+            count += 1
+    return count
+
+
+def main(argv=None):
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="データセットのシャード管理と分散前処理")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST, help="シャードのマニフェストのパス")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("init", help="マニフェストを作成")
+    p.add_argument("--shard", action="append", required=True, metavar="NAME=ROOT[@WEIGHT]",
+                   help="シャード名と画像フォルダ（複数指定）")
+    p.add_argument("--vnodes", type=int, default=64)
+    p.add_argument("--buckets", type=int, default=16, help="シャードあたりの作業単位数")
+
+    sub.add_parser("plan", help="シャードごとの画像数と、所属するシャードと異なるフォルダにある画像を表示")
+
+    for name, description in (("preprocess", "前処理を実行"), ("status", "作業単位の進捗を表示"),
+                              ("merge", "前処理の結果をデータセットインデックスに取り込む")):
+        p = sub.add_parser(name, help=description)
+        p.add_argument("--lock-dir", help="ノード間で共有するロックディレクトリ（指定しない場合は1台で実行）")
+        p.add_argument("--state-file", default="preprocess_state.json", help="1台で実行する場合の状態ファイル")
+        p.add_argument("--shards", help="対象のシャード名（カンマ区切り）")
+        if name == "preprocess":
+            p.add_argument("--tasks", default=",".join(TASKS), help=f"実行する処理（{', '.join(TASKS)}）")
+            p.add_argument("--modes", default="blur", help="シーケンスを作成するモード（カンマ区切り）")
+            p.add_argument("--steps", type=int, default=121)
+            p.add_argument("--out-dir", default="preprocessed", help="サムネイルの出力先")
+            p.add_argument("--sequence-dir", default=SEQUENCE_DIR,
+                           help="シーケンスの出力先（ゲームが再生時に参照するフォルダ、環境変数 VGI_SEQUENCE_DIR）")
+            p.add_argument("--labels-file", default="labels.json")
+            p.add_argument("--workers", type=int, default=None)
+            p.add_argument("--stale-after", type=float, default=600.0,
+                           help="この秒数ハートビートのないロックを引き継ぐ")
+        if name == "merge":
+            p.add_argument("--index", default="dataset_index.json")
+    args = parser.parse_args(argv)
+
+    if args.command == "init":
+        shards = []
+        for item in args.shard:
+            name, sep, rest = item.partition("=")
+            if not sep:
+                parser.error(f"シャードは NAME=ROOT の形式で指定してください: {item}")
+            root, _, weight = rest.partition("@")
+            shards.append({"name": name, "root": root, "weight": float(weight) if weight else 1})
+        manifest = ShardManifest(shards, args.vnodes, args.buckets, args.manifest)
+        manifest.save()
+        print(f"{len(shards)} シャードのマニフェストを作成しました: {args.manifest}")
+        return 0
+
+    manifest = ShardManifest.load(args.manifest)
+    if args.command == "plan":
+        for shard in manifest.shards:
+            if not os.path.isdir(shard["root"]):
+                print(f"{shard['name']}: {shard['root']}（このマシンからは参照できません）")
+                continue
+            assigned, misplaced = manifest.scan(shard)
+            print(f"{shard['name']}: {len(assigned)} 枚（{shard['root']}）")
+            for path in misplaced:
+                print(f"  移動が必要: {os.path.basename(path)} -> {manifest.shard_for(path)}")
+        return 0
+
+    shards = args.shards.split(",") if args.shards else None
+    coordinator = create_coordinator(args.lock_dir, args.state_file,
+                                     stale_after=getattr(args, "stale_after", 600.0))
+    if args.command == "preprocess":
+        tasks = [t.strip() for t in args.tasks.split(",") if t.strip()]
+        unknown = set(tasks) - set(TASKS)
+        if unknown:
+            parser.error(f"未対応の処理です: {', '.join(sorted(unknown))}")
+        stats = run_preprocess(
+            manifest, coordinator, tasks, args.out_dir, args.modes.split(","), args.steps,
+            args.workers, shards, args.labels_file, sequence_dir=args.sequence_dir,
+        )
+        print(f"作業単位 {stats['units']} / 画像 {stats['images']} 枚 / 失敗 {stats['errors']} / "
+              f"他のノードが実行中 {stats['skipped']}")
+        return 1 if stats["errors"] else 0
+
+    if args.command == "status":
+        units, misplaced = plan_units(manifest, shards)
+        results = coordinator.results()
+        pending = sum(1 for unit, paths in units.items() if pending_images(paths, results.get(unit)))
+        errors = sum(1 for r in results.values() if r for i in r.get("images", []) if "error" in i)
+        print(f"作業単位: 完了 {len(units) - pending} / 未完了 {pending} / 実行中 {len(coordinator.claimed())}"
+              f"（このマシンから参照できる {len(units)} 単位）")
+        print(f"失敗した画像: {errors}  所属するシャードと異なるフォルダの画像: {len(misplaced)}")
+        return 0
+
+    index = DatasetIndex(args.index)
+    count = merge_results(coordinator, index, manifest)
+    index.save()
+    print(f"{count} 枚の前処理結果を取り込みました: {args.index}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""
+DifficultyCalibration - 画像ごとの難易度を推定し、推奨制限時間と表示カーブをデータセットインデックスに保存する
+
+難易度の指標:
+    edge_density:    Cannyエッジの画素の割合（細部が多い画像ほどぼかした状態で判別しにくい）
+    high_freq_ratio: 低解像度にした画像のパワースペクトルのうち、高周波成分が占める割合
+    セッションログ:   正答率と解答時間の中央値（回答数が多い画像ほどこちらを重視する）
+
+画像から求めた指標はデータセット内の順位（0.0-1.0）に変換して平均し、
+セッションログの指標と回答数に応じて混ぜ合わせて難易度 (0.0: 易しい - 1.0: 難しい) とする
+
+難易度から決める値:
+    time_limit: 基準の制限時間 × (0.6 + 0.8 × 難易度)（易しい画像は短く、難しい画像は長く）
+    curve:      進行度のガンマカーブ gamma = 2 ** (1 - 2 × 難易度)
+                易しい画像 (gamma > 1) は強いぼかしを長く保ち、難しい画像 (gamma < 1) は早く鮮明にする
+
+使い方:
+    python difficulty_calibration.py
+    python difficulty_calibration.py --images-dir images --index dataset_index.json --log logs/session_events.bin
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from dataset_index import DatasetIndex
+from dataset_loader import DatasetLoader
+from lazy_import import lazy_import
+from session_analytics import SessionAnalytics
+from session_log import default_log_path, load_names
+
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+
+SIGNAL_SIZE = 256  # 指標を計算する画像の長辺
+HIGH_FREQ_RADIUS = 0.25  # ナイキスト周波数に対するこの割合以上を高周波とする
+MIN_TIME_SCALE = 0.6
+MAX_TIME_SCALE = 1.4
+PRIOR_ATTEMPTS = 20  # セッションログの重みが1/2になる回答数
+
+
+def image_signals(image_path, size=SIGNAL_SIZE):
+    """
+    画像から難易度の指標を計算
+
+    Args:
+        image_path: 画像ファイルのパス
+        size: 縮小後の長辺のピクセル数
+
+    Returns:
+        {'edge_density', 'high_freq_ratio'} の辞書。読み込めない場合はNone
+    """
+    gray = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        return None
+    height, width = gray.shape
+    scale = size / max(height, width)
+    if scale < 1.0:
+        gray = cv2.resize(gray, (max(1, round(width * scale)), max(1, round(height * scale))),
+                          interpolation=cv2.INTER_AREA)
+
+    edges = cv2.Canny(gray, 100, 200)
+    edge_density = float(np.count_nonzero(edges)) / edges.size
+
+    data = gray.astype(np.float32)
+    power = np.abs(np.fft.rfft2(data - data.mean())) ** 2
+    fy = np.fft.fftfreq(data.shape[0])[:, None]
+    fx = np.fft.rfftfreq(data.shape[1])[None, :]
+    radius = np.sqrt(fx * fx + fy * fy) / 0.5
+    total = power.sum()
+    high_freq_ratio = float(power[radius >= HIGH_FREQ_RADIUS].sum() / total) if total > 0 else 0.0
+
+    return {"edge_density": round(edge_density, 5), "high_freq_ratio": round(high_freq_ratio, 5)}
+
+
+def rank_values(values):
+    """値をデータセット内の順位 (0.0-1.0) に変換（1件の場合は0.5）"""
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) <= 1:
+        return np.full(len(values), 0.5)
+    order = values.argsort(kind="stable").argsort(kind="stable")
+    return order / (len(values) - 1)
+
+
+def history_difficulty(stats, base_time):
+    """
+    セッションログの集計結果から難易度を計算
+
+    Args:
+        stats: SessionAnalytics.summaryの1画像分
+        base_time: 基準の制限時間（秒）
+
+    Returns:
+        (難易度, 回答数) のタプル
+    """
+    accuracy = stats.get("accuracy") or 0.0
+    median = stats.get("p50_solve_time")
+    time_factor = 1.0 if median is None else min(1.0, median / base_time)
+    return 0.5 * (1.0 - accuracy) + 0.5 * time_factor, stats.get("attempts", 0)
+
+
+def recommend(difficulty, base_time):
+    """
+    難易度から推奨制限時間と表示カーブを決める
+
+    Returns:
+        (time_limit, curve) のタプル
+    """
+    scale = MIN_TIME_SCALE + (MAX_TIME_SCALE - MIN_TIME_SCALE) * difficulty
+    time_limit = round(base_time * scale, 1)
+    curve = {"type": "gamma", "gamma": round(2.0 ** (1.0 - 2.0 * difficulty), 3)}
+    return time_limit, curve
+
+
+def load_history(log_path):
+    """
+    セッションログを画像ファイル名ごとに集計
+
+    Returns:
+        {画像ファイル名: 集計結果の辞書}。ログがない場合は空の辞書
+    """
+    if not log_path or not os.path.exists(log_path):
+        return {}
+    analytics = SessionAnalytics().update_file(log_path)
+    return {r["image"]: r for r in analytics.summary(load_names(log_path))}
+
+
+def calibrate(image_paths, base_time=30.0, history=None, workers=1):
+    """
+    画像ごとの較正結果を計算
+
+    Args:
+        image_paths: 画像ファイルパスのリスト
+        base_time: 基準の制限時間（秒）
+        history: load_historyの結果（オプション）
+        workers: 指標計算のプロセス数
+
+    Returns:
+        {画像ファイル名: 較正結果の辞書}
+    """
+    history = history or {}
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            signals = list(executor.map(image_signals, image_paths))
+    else:
+        signals = [image_signals(path) for path in image_paths]
+
+    valid = [(path, s) for path, s in zip(image_paths, signals) if s is not None]
+    if not valid:
+        return {}
+    edge_rank = rank_values([s["edge_density"] for _, s in valid])
+    freq_rank = rank_values([s["high_freq_ratio"] for _, s in valid])
+
+    results = {}
+    for i, (path, s) in enumerate(valid):
+        filename = os.path.basename(path)
+        visual = float(0.5 * (edge_rank[i] + freq_rank[i]))
+        difficulty = visual
+        entry_signals = dict(s)
+        stats = history.get(filename)
+        if stats:
+            observed, attempts = history_difficulty(stats, base_time)
+            weight = attempts / (attempts + PRIOR_ATTEMPTS)
+            difficulty = (1.0 - weight) * visual + weight * observed
+            entry_signals.update(
+                attempts=attempts, accuracy=stats.get("accuracy"),
+                p50_solve_time=stats.get("p50_solve_time"),
+            )
+        time_limit, curve = recommend(difficulty, base_time)
+        results[filename] = {
+            "difficulty": round(difficulty, 4),
+            "time_limit": time_limit,
+            "curve": curve,
+            "signals": entry_signals,
+        }
+    return results
+
+
+def main(argv=None):
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="画像ごとの難易度較正（推奨制限時間・表示カーブ）")
+    parser.add_argument("--images-dir", default="images")
+    parser.add_argument("--index", default="dataset_index.json", help="データセットインデックスのパス")
+    parser.add_argument("--log", default=default_log_path(), help="セッションログのパス（存在しない場合は画像のみで推定）")
+    parser.add_argument("--base-time", type=float, default=30.0, help="基準の制限時間（秒）")
+    parser.add_argument("--workers", type=int, default=1, help="指標計算のプロセス数")
+    args = parser.parse_args(argv)
+
+    image_paths = DatasetLoader(args.images_dir).get_all_images()
+    if not image_paths:
+        print(f"画像が見つかりません: {args.images_dir}")
+        return 1
+
+    history = load_history(args.log)
+    results = calibrate(image_paths, args.base_time, history, args.workers)
+
+    index = DatasetIndex(args.index)
+    for filename, calibration in sorted(results.items()):
+        index.update(filename, calibration=calibration)
+        print(f"{filename}: 難易度 {calibration['difficulty']:.2f}  制限時間 {calibration['time_limit']:.1f}s  "
+              f"gamma {calibration['curve']['gamma']:.2f}")
+    index.save()
+    print(f"{len(results)}/{len(image_paths)} 枚を較正しました（ログの画像数: {len(history)}）: {args.index}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
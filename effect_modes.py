@@ -0,0 +1,94 @@
+"""
+EffectModes - ゲームモード（画像効果）のレジストリ
+各モードはImageProcessorの描画メソッド（1フレーム・バッチ）と見た目の変化量の推定メソッド、
+コストの特性を登録する。GameEngine・サーバー・ツールはモード名からここを参照して処理を選ぶ
+
+新しいモードを追加する場合:
+    1. ImageProcessorに apply_<name>(image, progress) / apply_<name>_batch(image, progress_values, out)
+       / change_<name>(width, height, progress_a, progress_b) を実装する
+    2. reveal_curve.DEFAULT_CURVES に進行度カーブを追加する
+    3. register_mode(EffectMode(...)) で登録する
+"""
+
+from collections import namedtuple
+
+
+# コストの特性（ベンチマークの出力・実行形態の選択用）
+#   passes:      1フレームあたりの画像全体に対する処理の回数
+#   scales_with: 1画素あたりのコストが増える要因（Noneの場合は進行度によらず一定）
+#   setup:       画像ごと・サイズごとの事前計算（Noneの場合はなし）
+EffectCost = namedtuple("EffectCost", ["passes", "scales_with", "setup"])
+
+
+class EffectMode:
+    """ゲームモードの定義"""
+
+    def __init__(self, name, label, cost, batch_options=()):
+        """
+        初期化
+
+        Args:
+            name: モード名（GameEngineのmode）
+            label: 画面表示用の名前
+            cost: EffectCost
+            batch_options: バッチ描画メソッドが受け付けるオプション（例: ('use_pyramid',)）
+        """
+        self.name = name
+        self.label = label
+        self.cost = cost
+        self.batch_options = tuple(batch_options)
+        # ImageProcessorのメソッド名
+        self.render = f"apply_{name}"
+        self.render_batch = f"apply_{name}_batch"
+        self.change = f"change_{name}"
+
+    def describe(self):
+        """JSONに書き出せる辞書"""
+        return {
+            "name": self.name,
+            "label": self.label,
+            "passes": self.cost.passes,
+            "scales_with": self.cost.scales_with,
+            "setup": self.cost.setup,
+            "batch_options": list(self.batch_options),
+        }
+
+
+_modes = {}
+
+
+def register_mode(mode):
+    """モードを登録（同名のモードは置き換える）"""
+    _modes[mode.name] = mode
+    return mode
+
+
+def get_mode(name):
+    """
+    モードの定義を取得
+
+    Raises:
+        ValueError: 登録されていないモードの場合
+    """
+    mode = _modes.get(name)
+    if mode is None:
+        raise ValueError(f"未対応のモードです: {name}（{', '.join(_modes)}）")
+    return mode
+
+
+def mode_names():
+    """登録済みのモード名（登録順）"""
+    return list(_modes)
+
+
+def available_modes():
+    """登録済みのモードの定義（登録順）"""
+    return list(_modes.values())
+
+
+register_mode(EffectMode("blur", "Blur", EffectCost(1, "sigma", None), ("use_pyramid",)))
+register_mode(EffectMode("zoom", "Zoom", EffectCost(1, None, None)))
+register_mode(EffectMode("hybrid", "Hybrid", EffectCost(2, "sigma", None), ("use_pyramid",)))
+register_mode(EffectMode("pixelate", "Mosaic", EffectCost(2, None, None)))
+register_mode(EffectMode("tiles", "Tiles", EffectCost(2, None, "tile_order_map")))
+register_mode(EffectMode("noise", "Noise", EffectCost(1, None, "noise_field")))
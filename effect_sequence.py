@@ -0,0 +1,295 @@
+"""
+EffectSequence - エフェクトの事前レンダリングシーケンス
+1枚の画像についてモードの全進行度を1度だけ描画し、キーフレーム + 差分の列として保存する
+再生時は経過時間からフレームを求め、直前のフレームに差分を1つ適用するだけで次のフレームを得る
+
+保存形式:
+    .npz (キーフレーム + 差分, zlib圧縮, 可逆) または cv2.VideoWriter による動画 (非可逆)
+
+シーケンスの保存先は SEQUENCE_DIR（既定 sequences、環境変数 VGI_SEQUENCE_DIR）で、
+事前レンダリング（batch_renderer.py・dataset_shards.py）と再生（main.py）で共通
+
+.npzのメタ情報には元画像の内容ハッシュと寸法（source）を保存し、画像が差し替えられた場合は
+find_sequenceがシーケンスを使わない（古いフレームを再生せず、その場で描画する）
+"""
+
+import json
+import os
+import zlib
+
+from frame_cache import image_digest
+from image_validation import ValidationError, read_header
+from lazy_import import lazy_import
+
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+
+SEQUENCE_EXT = ".vgseq.npz"
+SEQUENCE_DIR = os.environ.get("VGI_SEQUENCE_DIR") or "sequences"
+
+
+def sequence_path(image_path, mode, directory=SEQUENCE_DIR):
+    """画像とモードに対応するシーケンスファイルのパス（拡張子違いの同名画像を区別するため拡張子を含める）"""
+    return os.path.join(directory, f"{os.path.basename(image_path)}_{mode}{SEQUENCE_EXT}")
+
+
+def source_identity(image_path):
+    """
+    シーケンスの元画像の識別情報
+
+    Returns:
+        {"digest": 内容ハッシュ, "shape": [高さ, 幅]}（寸法はデコードせずヘッダーから取得）
+
+    Raises:
+        OSError, ValidationError: 画像を読めない場合
+    """
+    _, width, height = read_header(image_path)
+    return {"digest": image_digest(image_path), "shape": [height, width]}
+
+
+def matches_source(source, image_path):
+    """シーケンスの元画像の識別情報が現在の画像と一致するか（寸法を先に比べ、一致した場合のみハッシュを計算する）"""
+    if not source:
+        return False
+    try:
+        _, width, height = read_header(image_path)
+        if list(source.get("shape", ())) != [height, width]:
+            return False
+        return source.get("digest") == image_digest(image_path)
+    except (OSError, ValidationError):
+        return False
+
+
+def find_sequence(image_path, mode, directory=SEQUENCE_DIR):
+    """
+    事前レンダリング済みのシーケンスを探して読み込む
+
+    Returns:
+        EffectSequence。見つからない場合や、作成後に元画像が変更された場合はNone
+    """
+    path = sequence_path(image_path, mode, directory)
+    if not os.path.exists(path):
+        return None
+    try:
+        sequence = EffectSequence.load(path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"シーケンスの読み込みエラー: {path}: {e}")
+        return None
+    if not matches_source(sequence.source, image_path):
+        print(f"元画像と一致しないシーケンスのため使用しません: {path}")
+        return None
+    return sequence
+
+
+class EffectSequence:
+    """キーフレーム + 差分で保持するエフェクトシーケンスクラス"""
+
+    def __init__(self, shape, dtype, progress_values, payloads, keyframe_interval, source=None):
+        """
+        初期化（通常はfrom_framesまたはloadを使用）
+
+        Args:
+            shape: フレームの形状
+            dtype: フレームのdtype
+            progress_values: 各フレームの進行度（昇順）
+            payloads: 各フレームのzlib圧縮データ（キーフレームは画素値、それ以外は差分）
+            keyframe_interval: キーフレームの間隔
+            source: 元画像の識別情報（source_identity）
+        """
+        self.source = source
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.progress_values = list(progress_values)
+        self.payloads = payloads
+        self.keyframe_interval = max(1, int(keyframe_interval))
+        self._last_index = None
+        self._last_frame = None
+        self.decoded_frames = 0
+
+    @classmethod
+    def from_frames(cls, frames, progress_values, keyframe_interval=30, level=6, source=None):
+        """
+        フレーム列からシーケンスを作成
+
+        Args:
+            frames: 進行度順のフレームのリスト
+            progress_values: 各フレームの進行度
+            keyframe_interval: キーフレームの間隔（シーク時に適用する差分の最大数）
+            level: zlibの圧縮レベル
+            source: 元画像の識別情報（source_identity）
+        """
+        payloads = []
+        previous = None
+        for i, frame in enumerate(frames):
+            frame = np.ascontiguousarray(frame)
+            if i % keyframe_interval == 0:
+                data = frame
+            else:
+                # uint8の剰余演算で差分を取るため可逆
+                data = np.subtract(frame, previous, dtype=frame.dtype)
+            payloads.append(zlib.compress(data.tobytes(), level))
+            previous = frame
+        return cls(frames[0].shape, frames[0].dtype, progress_values, payloads, keyframe_interval, source)
+
+    @classmethod
+    def render(cls, engine, steps=121, keyframe_interval=30):
+        """
+        GameEngineで全進行度を描画してシーケンスを作成
+
+        Args:
+            engine: 画像を読み込み済みのGameEngine
+            steps: 0.0〜1.0の分割数
+            keyframe_interval: キーフレームの間隔
+        """
+        progress_values = [i / (steps - 1) for i in range(steps)] if steps > 1 else [1.0]
+        frames = engine.render_progress_batch(progress_values)
+        return cls.from_frames(frames, progress_values, keyframe_interval,
+                               source=source_identity(engine.image_path))
+
+    def save(self, path):
+        """シーケンスをファイルに保存"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        offsets = np.cumsum([0] + [len(p) for p in self.payloads]).astype(np.int64)
+        meta = {
+            "shape": list(self.shape),
+            "dtype": self.dtype.str,
+            "progress": self.progress_values,
+            "keyframe_interval": self.keyframe_interval,
+            "source": self.source,
+        }
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                meta=np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8),
+                offsets=offsets,
+                blob=np.frombuffer(b"".join(self.payloads), dtype=np.uint8),
+            )
+
+    @classmethod
+    def load(cls, path):
+        """ファイルからシーケンスを読み込む（圧縮データのまま保持）"""
+        with np.load(path) as data:
+            meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+            offsets = data["offsets"]
+            blob = data["blob"].tobytes()
+        payloads = [blob[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+        return cls(meta["shape"], meta["dtype"], meta["progress"], payloads,
+                   meta["keyframe_interval"], meta.get("source"))
+
+    def __len__(self):
+        return len(self.payloads)
+
+    @property
+    def nbytes(self):
+        """圧縮データの合計バイト数"""
+        return sum(len(p) for p in self.payloads)
+
+    def index_for(self, progress):
+        """進行度に最も近いフレーム番号"""
+        values = self.progress_values
+        if len(values) <= 1:
+            return 0
+        progress = max(0.0, min(1.0, progress))
+        # 等間隔の場合が大半なので、まず位置を推定してから近傍を探す
+        i = int(round(progress * (len(values) - 1)))
+        i = max(0, min(len(values) - 1, i))
+        while i > 0 and values[i] > progress and values[i] - progress > progress - values[i - 1]:
+            i -= 1
+        while i < len(values) - 1 and values[i + 1] - progress < progress - values[i]:
+            i += 1
+        return i
+
+    def _decode(self, i):
+        """i番目のペイロードを配列に展開"""
+        self.decoded_frames += 1
+        return np.frombuffer(zlib.decompress(self.payloads[i]), dtype=self.dtype).reshape(self.shape)
+
+    def frame_at(self, progress):
+        """
+        進行度に対応するフレームを取得
+
+        同じフレームが続く場合は前回と同じオブジェクトを返す（表示側で再描画を省略できる）
+        順再生では直前のフレームに差分を1つ適用するだけで済む
+        """
+        index = self.index_for(progress)
+        if index == self._last_index:
+            return self._last_frame
+
+        keyframe = index - index % self.keyframe_interval
+        if self._last_index is not None and keyframe <= self._last_index < index:
+            start, frame = self._last_index + 1, self._last_frame
+        else:
+            start, frame = keyframe + 1, self._decode(keyframe)
+        for i in range(start, index + 1):
+            frame = np.add(frame, self._decode(i), dtype=self.dtype)
+
+        frame.flags.writeable = False
+        self._last_index = index
+        self._last_frame = frame
+        return frame
+
+    def frame_at_time(self, elapsed_time, time_limit):
+        """経過時間に対応するフレームを取得"""
+        progress = elapsed_time / time_limit if time_limit > 0 else 1.0
+        return self.frame_at(progress)
+
+
+class VideoSequence:
+    """cv2.VideoWriterで書き出した動画によるシーケンス（非可逆）"""
+
+    def __init__(self, path, frame_count=None):
+        """
+        初期化
+
+        Args:
+            path: 動画ファイルのパス
+            frame_count: フレーム数（Noneの場合は動画から取得）
+        """
+        self.path = path
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise ValueError(f"動画を開けません: {path}")
+        self.frame_count = frame_count or int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self._last_index = None
+        self._last_frame = None
+
+    @staticmethod
+    def write(frames, path, fps=10.0):
+        """RGBフレーム列を動画として書き出す"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        height, width = frames[0].shape[:2]
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+        try:
+            for frame in frames:
+                writer.write(cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
+        finally:
+            writer.release()
+
+    def frame_at(self, progress):
+        """進行度に対応するフレームを取得（順再生時はシークしない）"""
+        progress = max(0.0, min(1.0, progress))
+        index = int(round(progress * (self.frame_count - 1))) if self.frame_count > 1 else 0
+        if index == self._last_index:
+            return self._last_frame
+        if self._last_index is None or index != self._last_index + 1:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+        ok, frame = self.capture.read()
+        if not ok:
+            return self._last_frame
+        self._last_index = index
+        self._last_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        return self._last_frame
+
+    def frame_at_time(self, elapsed_time, time_limit):
+        """経過時間に対応するフレームを取得"""
+        progress = elapsed_time / time_limit if time_limit > 0 else 1.0
+        return self.frame_at(progress)
+
+    def release(self):
+        """動画を閉じる"""
+        self.capture.release()
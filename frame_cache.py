@@ -0,0 +1,602 @@
+"""
+FrameCache - 描画済みフレームの共有キャッシュ
+(画像の内容ハッシュ, モード, 量子化した進行度) をキーとして描画結果を共有する
+
+- FrameCache: プロセス内で全セッションが共有するLRUキャッシュ（バイト数で上限管理）
+  同じフレームへの同時要求は1回の描画にまとめる（シングルフライト）
+- SharedFrameStore: multiprocessing.shared_memory を使ったプロセス間の共有ストア
+  描画ワーカープロセス同士で同じフレームを再利用する
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict
+from multiprocessing import shared_memory
+
+from lazy_import import lazy_import
+
+np = lazy_import("numpy")
+
+
+_digest_cache = {}
+
+
+def image_digest(image_path):
+    """
+    画像ファイルの内容ハッシュを取得（ファイルサイズと更新時刻が同じ間はメモ化）
+
+    Args:
+        image_path: 画像ファイルのパス
+
+    Returns:
+        SHA-1の16進文字列
+    """
+    stat = os.stat(image_path)
+    memo_key = (os.path.abspath(image_path), stat.st_size, stat.st_mtime_ns)
+    digest = _digest_cache.get(memo_key)
+    if digest is None:
+        sha1 = hashlib.sha1()
+        with open(image_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha1.update(chunk)
+        digest = sha1.hexdigest()
+        _digest_cache[memo_key] = digest
+    return digest
+
+
+def value_size(value):
+    """キャッシュする値のバイト数（ndarrayまたはbytes）"""
+    nbytes = getattr(value, "nbytes", None)
+    return nbytes if nbytes is not None else len(value)
+
+
+def _consume_exception(task):
+    """待機者がいないまま失敗したタスクの未取得例外警告を抑止"""
+    if not task.cancelled():
+        task.exception()
+
+
+class _Flight:
+    """描画中のフレーム（シングルフライト用）"""
+
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class FrameCache:
+    """プロセス内フレームキャッシュクラス"""
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, quantize_steps=200, shared_store=None):
+        """
+        初期化
+
+        Args:
+            max_bytes: キャッシュの上限バイト数
+            quantize_steps: 進行度の量子化段階数（0.0-1.0をこの数で分割）
+            shared_store: プロセス間共有に使うSharedFrameStore（オプション）
+        """
+        self.max_bytes = max_bytes
+        self.quantize_steps = quantize_steps
+        self.shared_store = shared_store
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._async_inflight = {}
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.shared_hits = 0
+        self.evictions = 0
+        # MemoryBudgetに登録した場合に設定される（追加のたびに全体の上限を確認する）
+        self.memory_budget = None
+
+    def quantize(self, progress):
+        """進行度を量子化（同じ段階のフレームを共有するため）"""
+        progress = max(0.0, min(1.0, progress))
+        if self.quantize_steps <= 0:
+            return progress
+        return round(progress * self.quantize_steps) / self.quantize_steps
+
+    def make_key(self, image_id, mode, progress, *extra):
+        """
+        キャッシュキーを作成
+
+        Args:
+            image_id: 画像の内容ハッシュ（image_digestの戻り値）
+            mode: ゲームモード
+            progress: 進行度（内部で量子化する）
+            extra: 出力に影響するその他のパラメータ（コーデック、品質など）
+
+        Returns:
+            キー文字列（SHA-1の16進文字列）
+        """
+        step = round(self.quantize(progress) * max(1, self.quantize_steps))
+        text = ":".join(str(p) for p in (image_id, mode, step) + extra)
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """キャッシュからフレームを取得（なければNone）"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """フレームをキャッシュに追加し、上限を超えた分を古い順に削除"""
+        size = value_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= value_size(old)
+            self._entries[key] = value
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= value_size(evicted)
+                self.evictions += 1
+        if self.memory_budget is not None:
+            self.memory_budget.enforce()
+
+    def evict_bytes(self, nbytes):
+        """
+        古い順に指定バイト数以上を解放
+
+        Returns:
+            解放したバイト数
+        """
+        freed = 0
+        with self._lock:
+            while freed < nbytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                size = value_size(evicted)
+                self.current_bytes -= size
+                freed += size
+                self.evictions += 1
+        return freed
+
+    def clear(self):
+        """キャッシュを空にする"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def _load_or_render(self, key, render):
+        """共有ストアを確認し、なければ描画して共有ストアにも登録"""
+        store = self.shared_store
+        if store is None:
+            value = render()
+            self.misses += 1
+            return value
+
+        value = store.peek(key)
+        lock = None
+        if value is None:
+            # 描画権を取得できなければ他プロセスが描画中なので完了を待つ（待つのはここだけ）
+            lock = store.claim(key)
+            value = store.get(key) if lock is None else store.peek(key)
+        if value is not None:
+            store.release(lock)
+            self.shared_hits += 1
+            return value
+
+        try:
+            value = render()
+            self.misses += 1
+            store.put(key, value)
+        finally:
+            store.release(lock)
+        return value
+
+    def get_or_render(self, key, render):
+        """
+        フレームを取得し、なければ描画する（スレッド間でシングルフライト）
+
+        Args:
+            key: キャッシュキー
+            render: 引数なしでフレームを返す関数
+
+        Returns:
+            フレーム
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = self._load_or_render(key, render)
+            self.put(key, flight.value)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+
+    async def get_or_render_async(self, key, render):
+        """
+        get_or_renderのasyncio版（イベントループ内でシングルフライト）
+
+        Args:
+            key: キャッシュキー
+            render: 引数なしでフレームを返すコルーチン関数
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        # 描画は独立したタスクで行い、最初の要求元がキャンセルされても他の待機者に影響しない
+        task = self._async_inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(self._render_async(key, render))
+            task.add_done_callback(_consume_exception)
+            self._async_inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _render_async(self, key, render):
+        """get_or_render_asyncの描画タスク本体"""
+        try:
+            value = await render()
+            self.misses += 1
+            self.put(key, value)
+            return value
+        finally:
+            self._async_inflight.pop(key, None)
+
+    def get_stats(self):
+        """キャッシュの統計"""
+        lookups = self.hits + self.misses + self.coalesced + self.shared_hits
+        stats = {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "shared_hits": self.shared_hits,
+            "evictions": self.evictions,
+            "hit_rate": (lookups - self.misses) / lookups if lookups else 0.0,
+        }
+        if self.shared_store is not None:
+            stats["shared"] = self.shared_store.get_stats()
+        return stats
+
+
+# ---------------------------------------------------------------------------
+# プロセス間共有ストア
+# ---------------------------------------------------------------------------
+
+_STATE_WRITING = 0
+_STATE_READY = 1
+_HEADER = struct.Struct("!BI")  # 状態, メタ情報(JSON)の長さ
+_LOCK = struct.Struct("!Id")  # 描画中のプロセスID, 取得時刻（time.time）
+
+
+def attach_shared_memory(name):
+    """
+    既存の共有メモリに接続
+
+    Python 3.13以降は接続側をresource_trackerの管理対象外にする
+    （3.12以前はforkしたワーカーがtrackerを共有するため、削除は作成側のunlinkに任せる）
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+
+def try_attach_shared_memory(name, min_size=0):
+    """
+    既存の共有メモリに接続（存在しない場合や、作成中でサイズが足りない場合はNone）
+
+    作成側がshm_openとftruncateの間にある場合、接続するとValueError（空ファイルをmmapできない）になる
+    """
+    try:
+        shm = attach_shared_memory(name)
+    except (FileNotFoundError, ValueError):
+        return None
+    if shm.size < min_size:
+        shm.close()
+        return None
+    return shm
+
+
+class SharedFrameStore:
+    """
+    共有メモリによるプロセス間フレームストア
+
+    キーごとに名前付き共有メモリを1つ作成する。作成したプロセスが所有者となり、
+    所有者ごとの上限バイト数を超えた分を古い順に削除（unlink）する
+    同じキーを複数プロセスが同時に描画しないよう、ロック用の共有メモリで描画権を取得する
+    ロックには取得したプロセスIDと時刻を書き込み、プロセスが終了している場合や
+    lock_timeoutを過ぎた場合は放棄されたロックとして取り直す（描画中にワーカーが強制終了した場合など）
+    """
+
+    def __init__(self, prefix="vgc", max_bytes=128 * 1024 * 1024, wait_timeout=5.0, lock_timeout=30.0):
+        """
+        初期化
+
+        Args:
+            prefix: 共有メモリ名の接頭辞
+            max_bytes: このプロセスが所有する共有メモリの上限バイト数
+            wait_timeout: 他プロセスの描画完了を待つ最大秒数
+            lock_timeout: これより古いロックは放棄されたものとみなす秒数
+        """
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.wait_timeout = wait_timeout
+        self.lock_timeout = lock_timeout
+        self._owned = OrderedDict()  # 名前 -> (SharedMemory, サイズ)
+        self._lock = threading.Lock()
+        self.owned_bytes = 0
+        self.hits = 0
+        self.stores = 0
+        self.waits = 0
+        self.evictions = 0
+        self.stale_locks = 0
+
+    def _name(self, key, suffix=""):
+        # macOSの共有メモリ名は31文字まで
+        return f"{self.prefix}_{key[:20]}{suffix}"
+
+    def get(self, key):
+        """
+        フレームを取得（存在しない場合はNone）
+
+        他プロセスが描画中（ロックあり）の場合は完了を待つ
+        """
+        value = self._read(self._name(key))
+        if value is None and self._is_locked(key):
+            self.waits += 1
+            deadline = time.monotonic() + self.wait_timeout
+            while value is None and time.monotonic() < deadline and self._is_locked(key):
+                time.sleep(0.002)
+                value = self._read(self._name(key))
+            if value is None:
+                value = self._read(self._name(key))
+        if value is not None:
+            self.hits += 1
+        return value
+
+    def peek(self, key):
+        """フレームを取得（他プロセスの描画完了を待たない）"""
+        value = self._read(self._name(key))
+        if value is not None:
+            self.hits += 1
+        return value
+
+    def _read(self, name):
+        """共有メモリからフレームを読み出してコピーを返す"""
+        shm = try_attach_shared_memory(name, _HEADER.size)
+        if shm is None:
+            return None
+        try:
+            state, meta_len = _HEADER.unpack_from(shm.buf, 0)
+            if state != _STATE_READY:
+                return None
+            offset = _HEADER.size
+            meta = json.loads(bytes(shm.buf[offset:offset + meta_len]))
+            offset += meta_len
+            with shm.buf[offset:offset + meta["nbytes"]] as payload:
+                if meta["kind"] == "bytes":
+                    return bytes(payload)
+                return np.frombuffer(payload, dtype=meta["dtype"]).reshape(meta["shape"]).copy()
+        finally:
+            shm.close()
+
+    def _is_locked(self, key):
+        """他プロセスが描画中かどうか（放棄されたロックは描画中とみなさない）"""
+        owner = self._lock_owner(self._name(key, "l"))
+        return owner is not None and not self._is_stale(*owner)
+
+    @staticmethod
+    def _lock_owner(name):
+        """
+        ロックの (プロセスID, 取得時刻)
+
+        Returns:
+            ロックがない場合はNone。作成中で書き込まれていない場合は (0, 0.0)（描画中とみなす）
+        """
+        try:
+            shm = attach_shared_memory(name)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            # 作成中（まだサイズが設定されていない）
+            return 0, 0.0
+        try:
+            if shm.size < _LOCK.size:
+                return 0, 0.0
+            return _LOCK.unpack_from(shm.buf, 0)
+        finally:
+            shm.close()
+
+    def _is_stale(self, pid, acquired):
+        """ロックを取得したプロセスが終了しているか、lock_timeoutを過ぎているか"""
+        if pid == 0:
+            # 作成直後で、まだ書き込まれていない
+            return False
+        if time.time() - acquired > self.lock_timeout:
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+        return False
+
+    @staticmethod
+    def _create_lock(name):
+        """ロック用の共有メモリを排他的に作成し、プロセスIDと時刻を書き込む"""
+        lock = shared_memory.SharedMemory(name=name, create=True, size=_LOCK.size)
+        _LOCK.pack_into(lock.buf, 0, os.getpid(), time.time())
+        return lock
+
+    def claim(self, key):
+        """
+        描画権を取得（共有メモリの排他的作成を使ったプロセス間ロック）
+
+        放棄されたロックは削除して取り直す
+
+        Returns:
+            取得できた場合はロック用SharedMemory、他プロセスが描画中ならNone
+        """
+        name = self._name(key, "l")
+        try:
+            return self._create_lock(name)
+        except FileExistsError:
+            pass
+        owner = self._lock_owner(name)
+        if owner is not None:
+            if not self._is_stale(*owner):
+                return None
+            self.stale_locks += 1
+            self._unlink_lock(name, owner)
+        try:
+            return self._create_lock(name)
+        except FileExistsError:
+            return None
+
+    @staticmethod
+    def _unlink_lock(name, owner):
+        """ロックの内容がownerのままであれば削除（他プロセスが取り直したロックは消さない）"""
+        shm = try_attach_shared_memory(name, _LOCK.size)
+        if shm is None:
+            return
+        try:
+            if _LOCK.unpack_from(shm.buf, 0) == owner:
+                shm.unlink()
+        except FileNotFoundError:
+            pass
+        finally:
+            shm.close()
+
+    @classmethod
+    def release(cls, lock):
+        """
+        claimで取得した描画権を解放
+
+        放棄されたとみなされて他プロセスが取り直した後は、そのロックを削除しない
+        """
+        if lock is None:
+            return
+        owner = _LOCK.unpack_from(lock.buf, 0)
+        lock.close()
+        if cls._lock_owner(lock.name) == owner:
+            try:
+                lock.unlink()
+            except FileNotFoundError:
+                pass
+
+    def put(self, key, value):
+        """
+        フレームを共有メモリに書き込む
+
+        Returns:
+            書き込んだ場合True（既に他プロセスが書き込み済みの場合はFalse）
+        """
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            payload = memoryview(value).cast("B")
+            meta = {"kind": "bytes", "nbytes": payload.nbytes}
+        else:
+            value = np.ascontiguousarray(value)
+            payload = memoryview(value).cast("B")
+            meta = {"kind": "array", "nbytes": value.nbytes,
+                    "dtype": value.dtype.str, "shape": list(value.shape)}
+        meta_bytes = json.dumps(meta).encode("utf-8")
+        size = _HEADER.size + len(meta_bytes) + meta["nbytes"]
+        if size > self.max_bytes:
+            return False
+
+        name = self._name(key)
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            return False
+
+        _HEADER.pack_into(shm.buf, 0, _STATE_WRITING, len(meta_bytes))
+        offset = _HEADER.size
+        shm.buf[offset:offset + len(meta_bytes)] = meta_bytes
+        offset += len(meta_bytes)
+        shm.buf[offset:offset + meta["nbytes"]] = payload
+        _HEADER.pack_into(shm.buf, 0, _STATE_READY, len(meta_bytes))
+
+        with self._lock:
+            self._owned[name] = (shm, size)
+            self.owned_bytes += size
+            self.stores += 1
+            while self.owned_bytes > self.max_bytes and self._owned:
+                self._unlink(*self._owned.popitem(last=False))
+        return True
+
+    def _unlink(self, name, entry):
+        """所有する共有メモリを削除"""
+        shm, size = entry
+        self.owned_bytes -= size
+        self.evictions += 1
+        shm.close()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    def evict_bytes(self, nbytes):
+        """所有する共有メモリを古い順に指定バイト数以上解放"""
+        freed = 0
+        with self._lock:
+            while freed < nbytes and self._owned:
+                name, entry = self._owned.popitem(last=False)
+                freed += entry[1]
+                self._unlink(name, entry)
+        return freed
+
+    def close(self):
+        """所有するすべての共有メモリを削除"""
+        with self._lock:
+            while self._owned:
+                self._unlink(*self._owned.popitem(last=False))
+
+    def get_stats(self):
+        """共有ストアの統計"""
+        return {
+            "owned_entries": len(self._owned),
+            "owned_bytes": self.owned_bytes,
+            "hits": self.hits,
+            "stores": self.stores,
+            "waits": self.waits,
+            "evictions": self.evictions,
+            "stale_locks": self.stale_locks,
+        }
@@ -0,0 +1,174 @@
+"""
+FrameEncoder - ストリーミング配信用のフレームエンコーダー
+cv2.imencodeでJPEG/WebPに圧縮する。進行度に応じた品質ラダーを持ち、
+強くぼかした序盤のフレームは低品質（小さいサイズ）でエンコードする
+エンコード結果は量子化した進行度ごとにキャッシュし、エンコード時間とバイト数を集計する
+"""
+
+import threading
+import time
+
+from frame_cache import FrameCache
+from lazy_import import lazy_import
+
+cv2 = lazy_import("cv2")
+
+
+CODECS = ("jpeg", "webp")
+
+# 既定の品質ラダー: (この進行度以上, 品質)
+DEFAULT_QUALITY_LADDER = [(0.0, 40), (0.5, 60), (0.8, 75), (0.95, 90)]
+
+
+def parse_quality_ladder(text):
+    """
+    品質ラダーの文字列を解析
+
+    Args:
+        text: "0:40,0.5:60,0.9:85" 形式、または単一の品質 "80"
+
+    Returns:
+        (進行度, 品質) のリスト（進行度の昇順）
+    """
+    if ":" not in text:
+        return [(0.0, int(text))]
+    ladder = []
+    for item in text.split(","):
+        if item.strip():
+            progress, quality = item.split(":")
+            ladder.append((float(progress), int(quality)))
+    return sorted(ladder)
+
+
+def quality_for(quality_ladder, progress):
+    """
+    品質ラダーから進行度に対応する品質を取得
+
+    Args:
+        quality_ladder: (進行度, 品質) のリスト（進行度の昇順）
+        progress: 進行度（0.0-1.0）
+    """
+    quality = quality_ladder[0][1]
+    for threshold, q in quality_ladder:
+        if progress >= threshold:
+            quality = q
+        else:
+            break
+    return quality
+
+
+def encode_image(image, codec="jpeg", quality=80):
+    """
+    RGB画像をJPEG/WebPにエンコード
+
+    Returns:
+        エンコード済みのbytes
+    """
+    if codec == "webp":
+        ext, params = ".webp", [cv2.IMWRITE_WEBP_QUALITY, int(quality)]
+    elif codec == "jpeg":
+        ext, params = ".jpg", [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+    else:
+        raise ValueError(f"未対応のコーデックです: {codec}")
+    ok, buffer = cv2.imencode(ext, cv2.cvtColor(image, cv2.COLOR_RGB2BGR), params)
+    if not ok:
+        raise ValueError(f"エンコードに失敗しました: {codec}")
+    return buffer.tobytes()
+
+
+class FrameEncoder:
+    """フレームエンコーダークラス"""
+
+    def __init__(self, codec="jpeg", quality_ladder=None, cache=None):
+        """
+        初期化
+
+        Args:
+            codec: エンコード形式 ('jpeg', 'webp')
+            quality_ladder: (進行度, 品質) のリスト。Noneの場合は既定のラダー
+            cache: エンコード結果を保持するFrameCache（Noneの場合は新規作成）
+        """
+        if codec not in CODECS:
+            raise ValueError(f"未対応のコーデックです: {codec}")
+        self.codec = codec
+        self.quality_ladder = sorted(quality_ladder or DEFAULT_QUALITY_LADDER)
+        self.cache = cache if cache is not None else FrameCache(max_bytes=64 * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._stats = {}  # 品質 -> [フレーム数, 合計バイト数, 合計エンコード秒数]
+
+    def quality_for(self, progress):
+        """進行度に対応する品質を取得"""
+        return quality_for(self.quality_ladder, progress)
+
+    def encode(self, image, progress=1.0):
+        """
+        フレームをエンコード（キャッシュしない）
+
+        Returns:
+            (エンコード済みbytes, 品質, エンコード秒数) のタプル
+        """
+        quality = self.quality_for(progress)
+        start = time.perf_counter()
+        data = encode_image(image, self.codec, quality)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            entry = self._stats.setdefault(quality, [0, 0, 0.0])
+            entry[0] += 1
+            entry[1] += len(data)
+            entry[2] += elapsed
+        return data, quality, elapsed
+
+    def encode_frame(self, image_id, mode, progress, render, *extra):
+        """
+        量子化した進行度ごとにキャッシュしながらフレームをエンコード
+
+        Args:
+            image_id: 画像の内容ハッシュ
+            mode: ゲームモード
+            progress: 進行度（キャッシュの段階数で量子化される）
+            render: 量子化後の進行度を受け取りRGBフレームを返す関数
+            extra: 出力に影響するその他のパラメータ（縮小サイズなど）
+
+        Returns:
+            (エンコード済みbytes, 品質, エンコード秒数) のタプル（キャッシュヒット時は0秒）
+        """
+        progress = self.cache.quantize(progress)
+        quality = self.quality_for(progress)
+        key = self.cache.make_key(image_id, mode, progress, self.codec, quality, *extra)
+        spent = []
+
+        def produce():
+            data, _, elapsed = self.encode(render(progress), progress)
+            spent.append(elapsed)
+            return data
+
+        data = self.cache.get_or_render(key, produce)
+        return data, quality, spent[0] if spent else 0.0
+
+    def get_stats(self):
+        """
+        エンコードの統計
+
+        Returns:
+            全体と品質ごとのフレーム数・平均バイト数・平均エンコード時間
+        """
+        with self._lock:
+            items = sorted(self._stats.items())
+        frames = sum(e[0] for _, e in items)
+        total_bytes = sum(e[1] for _, e in items)
+        total_sec = sum(e[2] for _, e in items)
+        return {
+            "codec": self.codec,
+            "frames_encoded": frames,
+            "bytes_per_frame": total_bytes / frames if frames else 0.0,
+            "encode_ms_per_frame": total_sec * 1000 / frames if frames else 0.0,
+            "by_quality": {
+                str(q): {
+                    "frames": e[0],
+                    "bytes_per_frame": e[1] / e[0],
+                    "encode_ms_per_frame": e[2] * 1000 / e[0],
+                }
+                for q, e in items
+            },
+            "cache": self.cache.get_stats(),
+        }
@@ -0,0 +1,187 @@
+"""
+FrameProfiler - 描画ループの計測クラス
+フレームごとの各段階（画像処理・QImage変換・スケーリング・ウィジェット更新）の処理時間を
+リングバッファに保持し、取りこぼしたタイマーティック数とあわせて統計を提供する
+
+計測は time.perf_counter() の呼び出しと辞書への加算のみで行うため、
+本番環境でも常時有効にしておける
+"""
+
+import json
+import time
+from collections import deque
+
+
+class FrameProfiler:
+    """フレーム計測クラス"""
+
+    def __init__(self, capacity=300, tick_interval=0.1, enabled=True):
+        """
+        初期化
+
+        Args:
+            capacity: 保持する直近フレーム数
+            tick_interval: 想定するタイマー間隔（秒）。取りこぼし判定に使用
+            enabled: 計測を有効にするか
+        """
+        self.capacity = capacity
+        self.tick_interval = tick_interval
+        self.enabled = enabled
+        self.frames = deque(maxlen=capacity)  # (開始時刻, 合計時間, {段階: 時間})
+        self.frame_count = 0
+        self.dropped_ticks = 0
+        self.counters = {}  # 名前 -> 回数（描画の省略回数など）
+        self._frame_start = None
+        self._last_mark = None
+        self._last_frame_start = None
+        self._stages = None
+
+    def begin_frame(self):
+        """フレームの計測を開始"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+
+        # 前フレームの開始から想定間隔の倍以上空いていればティックを取りこぼしたとみなす
+        if self._last_frame_start is not None and self.tick_interval > 0:
+            missed = int((now - self._last_frame_start) / self.tick_interval + 0.5) - 1
+            if missed > 0:
+                self.dropped_ticks += missed
+
+        self._frame_start = now
+        self._last_mark = now
+        self._last_frame_start = now
+        self._stages = {}
+
+    def mark(self, stage):
+        """
+        直前のマーク（またはフレーム開始）からの経過時間を段階の処理時間として記録
+
+        Args:
+            stage: 段階名（例: 'process', 'convert', 'scale', 'widget'）
+        """
+        if self._frame_start is None:
+            return
+        now = time.perf_counter()
+        self._stages[stage] = self._stages.get(stage, 0.0) + (now - self._last_mark)
+        self._last_mark = now
+
+    def count(self, name, n=1):
+        """
+        名前付きの回数を加算（再描画の省略回数、ウィジェット更新回数など）
+
+        Args:
+            name: カウンタ名
+            n: 加算する回数
+        """
+        if not self.enabled:
+            return
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def end_frame(self):
+        """フレームの計測を終了してリングバッファに追加"""
+        if self._frame_start is None:
+            return
+        now = time.perf_counter()
+        self.frames.append((self._frame_start, now - self._frame_start, self._stages))
+        self.frame_count += 1
+        self._frame_start = None
+        self._stages = None
+
+    def reset(self):
+        """統計をリセット"""
+        self.frames.clear()
+        self.frame_count = 0
+        self.dropped_ticks = 0
+        self.counters = {}
+        self._frame_start = None
+        self._last_frame_start = None
+        self._stages = None
+
+    def pause(self):
+        """
+        タイマー停止時に呼び出す
+
+        次のbegin_frame()で停止期間を取りこぼしとして数えないようにする
+        """
+        self._last_frame_start = None
+        self._frame_start = None
+
+    @staticmethod
+    def _summarize(values):
+        """ミリ秒単位の統計（平均・p50・p95・最大）を計算"""
+        if not values:
+            return {"mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+        ordered = sorted(values)
+        n = len(ordered)
+        return {
+            "mean_ms": sum(ordered) / n * 1000,
+            "p50_ms": ordered[int(0.50 * (n - 1))] * 1000,
+            "p95_ms": ordered[int(0.95 * (n - 1))] * 1000,
+            "max_ms": ordered[-1] * 1000,
+        }
+
+    def get_stats(self):
+        """
+        直近フレームの統計を取得
+
+        Returns:
+            統計情報の辞書
+        """
+        frames = list(self.frames)
+        stage_names = []
+        for _, _, stages in frames:
+            for name in stages:
+                if name not in stage_names:
+                    stage_names.append(name)
+
+        fps = 0.0
+        if len(frames) >= 2:
+            span = frames[-1][0] - frames[0][0]
+            if span > 0:
+                fps = (len(frames) - 1) / span
+
+        return {
+            "frames_total": self.frame_count,
+            "frames_window": len(frames),
+            "dropped_ticks": self.dropped_ticks,
+            "counters": dict(self.counters),
+            "fps": fps,
+            "frame": self._summarize([total for _, total, _ in frames]),
+            "stages": {
+                name: self._summarize([s[name] for _, _, s in frames if name in s])
+                for name in stage_names
+            },
+        }
+
+    def format_overlay(self):
+        """画面オーバーレイ用の短いテキストを作成"""
+        stats = self.get_stats()
+        lines = [
+            f"fps {stats['fps']:.1f}  frame p95 {stats['frame']['p95_ms']:.1f}ms",
+            f"dropped ticks {stats['dropped_ticks']}",
+        ]
+        for name, s in stats["stages"].items():
+            lines.append(f"{name:<8} {s['mean_ms']:6.2f} / {s['p95_ms']:6.2f}ms")
+        for name, value in stats["counters"].items():
+            lines.append(f"{name:<16} {value}")
+        return "\n".join(lines)
+
+    def export_json(self, path, include_frames=False):
+        """
+        統計をJSONファイルに書き出す
+
+        Args:
+            path: 出力先パス
+            include_frames: 直近フレームの生データも含めるか
+        """
+        data = self.get_stats()
+        if include_frames:
+            data["recent_frames"] = [
+                {"start": start, "total_ms": total * 1000,
+                 "stages_ms": {k: v * 1000 for k, v in stages.items()}}
+                for start, total, stages in self.frames
+            ]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        return path
@@ -3,35 +3,78 @@ GameEngine - ゲームロジック管理クラス
 時間経過に応じた画像処理（線形変換）とスコア計算を担当
 """
 
-import cv2
 import os
+from effect_modes import get_mode
+from lazy_import import lazy_import
 from image_processor import ImageProcessor
 from label_loader import LabelLoader
+from reveal_curve import compile_curve
+import pixel_layout
+
+# 起動を速くするため、cv2は最初の画像読み込み時に読み込む
+cv2 = lazy_import("cv2")
 
 
 class GameEngine:
     """ゲームエンジンクラス"""
 
-    def __init__(self, image_path, mode="blur", time_limit=30.0, label_loader=None):
+    def __init__(self, image_path, mode="blur", time_limit=30.0, label_loader=None,
+                 defer_image=False, frame_cache=None, sequence=None, blur_method="gaussian",
+                 tile_workers=0, layout="rgb", incremental_threshold=None, dataset_index=None,
+                 curves=None, memory_budget=None):
         """
         初期化
 
         Args:
             image_path: 画像ファイルのパス
-            mode: ゲームモード ('blur', 'zoom', 'hybrid')
+            mode: ゲームモード（effect_modesに登録されたモード名。未登録の場合はValueError）
             time_limit: 画像が完全にクリアになるまでの時間（秒）
             label_loader: LabelLoaderインスタンス（Noneの場合は新規作成）
+            defer_image: Trueの場合、画像は最初のget_processed_image呼び出し時に読み込む
+                （描画を別プロセスで行うサーバーなど、正答判定のみに使う場合）
+            frame_cache: 複数のGameEngineで描画結果を共有するFrameCache（オプション）
+                指定した場合、進行度はキャッシュの段階数で量子化される
+            sequence: 事前レンダリング済みのEffectSequence（オプション）
+                指定した場合、フレームは描画せずシーケンスから再生する
+            blur_method: ImageProcessorのぼかし方式 ('gaussian', 'separable', 'box')
+            tile_workers: 大きい画像のぼかしをタイル分割して並列処理するスレッド数（0: 分割しない）
+            layout: 内部の画素レイアウト（pixel_layout.LAYOUTS）。'bgr' は読み込み時の色変換を省略する
+                sequenceを使う場合は 'rgb' にすること（シーケンスはRGBで保存される）
+            incremental_threshold: 前回描画したフレームからの見た目の変化（画素数の推定値）が
+                この値未満の場合、描画せずに前回のフレームオブジェクトをそのまま返す
+                （表示側は同じオブジェクトなら再描画を省略できる）。Noneの場合は毎回描画する
+            dataset_index: 難易度の較正結果を持つDatasetIndex（オプション）
+                画像が較正済みの場合、time_limitと表示カーブは較正結果で上書きされる
+            curves: モードごとの進行度カーブ（reveal_curve.DEFAULT_CURVESのキーとカーブ指定の辞書）
+            memory_budget: デコード済み画像・シーケンスの使用量を計上するMemoryBudget（オプション）
+                上限を超えた場合、古いエンジンの画像は解放され、次の描画時に読み込み直す
         """
         self.image_path = image_path
         self.mode = mode
+        self.effect = get_mode(mode)
         self.time_limit = time_limit
         self.original_image = None
         self.correct_answers = []  # 複数の正解キーワードを保持
         self.category = None
         self.hint = None
+        self.frame_cache = frame_cache
+        self.sequence = sequence
+        self.layout = pixel_layout.check_layout(layout)
+        self.incremental_threshold = incremental_threshold
+        self._image_id = None
+        self._last_frame = None
+        self._last_progress = None
+        # 描画した回数と、前回と同じフレームを返した回数
+        self.render_stats = {"rendered": 0, "skipped": 0}
+        self.reveal_curve = None  # 経過時間の割合 -> 表示の進行度のRevealCurve（Noneの場合は線形）
+        self.calibration = None
+        self.memory_budget = memory_budget
+        if memory_budget is not None and sequence is not None:
+            # シーケンスは読み込み直せないため、使用量の計上のみ
+            memory_budget.track("keyframes", sequence)
 
         # 画像プロセッサのインスタンス
-        self.image_processor = ImageProcessor()
+        self.image_processor = ImageProcessor(blur_method, tile_workers, layout, curves)
 
         # ラベルローダーの初期化
         if label_loader is None:
@@ -40,21 +83,53 @@ class GameEngine:
             self.label_loader = label_loader
 
         # 画像の読み込み
-        self.load_image()
+        self.image_deferred = defer_image
+        if not defer_image:
+            self.load_image()
 
         # ラベルから正解キーワードを読み込む
         self.load_answers_from_label()
 
+        # 較正済みの制限時間と表示カーブを適用
+        if dataset_index is not None:
+            self.apply_calibration(dataset_index.get_calibration(self.image_path))
+
     def load_image(self):
         """画像を読み込む"""
         if os.path.exists(self.image_path):
             self.original_image = cv2.imread(self.image_path)
             if self.original_image is None:
                 raise ValueError(f"画像の読み込みに失敗しました: {self.image_path}")
-            # BGRからRGBに変換
-            self.original_image = cv2.cvtColor(self.original_image, cv2.COLOR_BGR2RGB)
+            # BGRから内部レイアウトに変換（'rgb' の場合はRGBに変換）
+            self.original_image = pixel_layout.from_bgr(self.original_image, self.layout)
         else:
             raise FileNotFoundError(f"画像ファイルが見つかりません: {self.image_path}")
+        if self.memory_budget is not None:
+            self.memory_budget.track("decoded_images", self, GameEngine.image_nbytes, GameEngine.release_image)
+
+    def image_nbytes(self):
+        """デコード済み画像・保持中のフレーム・画像ごとの事前計算結果（タイルの表示順など）のバイト数"""
+        nbytes = 0 if self.original_image is None else self.original_image.nbytes
+        if self._last_frame is not None and self.sequence is None:
+            nbytes += self._last_frame.nbytes
+        return nbytes + self.image_processor.state_nbytes()
+
+    def release_image(self):
+        """
+        デコード済み画像を解放（次の描画時に読み込み直す）
+
+        Returns:
+            解放したバイト数
+        """
+        nbytes = self.image_nbytes()
+        if self.original_image is not None:
+            self.original_image = None
+            self.image_deferred = True
+        self._last_frame = None
+        self._last_progress = None
+        # 事前計算結果が元画像を参照したままだと解放されないため、合わせて破棄する
+        self.image_processor.clear_state()
+        return nbytes
 
     def load_answers_from_label(self):
         """ラベルファイルから正解キーワードを読み込む"""
@@ -80,6 +155,35 @@ class GameEngine:
                 # フォールバック: 最初の部分
                 self.correct_answers = [parts[0].lower()]
 
+    def apply_calibration(self, calibration):
+        """
+        難易度の較正結果を適用
+
+        Args:
+            calibration: DatasetIndex.get_calibrationの結果（Noneの場合は何もしない）
+        """
+        if not calibration:
+            return
+        self.calibration = calibration
+        if calibration.get("time_limit"):
+            self.time_limit = float(calibration["time_limit"])
+        if calibration.get("curve"):
+            self.reveal_curve = compile_curve(calibration["curve"])
+
+    def reveal_progress(self, progress):
+        """
+        経過時間の割合を表示の進行度に変換（表示カーブ）
+
+        Args:
+            progress: 経過時間 / 制限時間（0.0-1.0）
+
+        Returns:
+            描画に使う進行度（0.0-1.0）
+        """
+        if self.reveal_curve is None:
+            return progress
+        return self.reveal_curve(progress)
+
     def set_answers(self, answers):
         """
         正解を手動で設定（複数可）
@@ -103,7 +207,10 @@ class GameEngine:
             処理された画像
         """
         if self.original_image is None:
-            return None
+            if not self.image_deferred:
+                return None
+            self.image_deferred = False
+            self.load_image()
 
         # 進行度を計算 (0.0:開始直後 -> 1.0:完了)
         if self.time_limit > 0:
@@ -111,18 +218,100 @@ class GameEngine:
         else:
             progress = 1.0
 
-        # 0.0〜1.0の範囲にクリップ
-        progress = max(0.0, min(1.0, progress))
+        # 0.0〜1.0の範囲にクリップし、表示カーブを適用
+        progress = self.reveal_progress(max(0.0, min(1.0, progress)))
+
+        if self._can_reuse_frame(progress):
+            self.render_stats["skipped"] += 1
+            return self._last_frame
+
+        frame = self._render_frame(progress)
+        if frame is not None and frame is self._last_frame:
+            # シーケンス再生などで同じフレームが続いた場合
+            self.render_stats["skipped"] += 1
+            return frame
+        self.render_stats["rendered"] += 1
+        if self.incremental_threshold is not None:
+            # 前回のフレームを保持するのは差分描画が有効な場合のみ（サーバーのエンジンキャッシュ用）
+            self._last_frame = frame
+            self._last_progress = progress
+        return frame
+
+    def _can_reuse_frame(self, progress):
+        """前回描画したフレームと見た目がほぼ変わらないか"""
+        if self.incremental_threshold is None or self._last_frame is None:
+            return False
+        # 最後のクリアな画像は必ず描画する
+        if progress >= 1.0 and self._last_progress < 1.0:
+            return False
+        width, height = pixel_layout.image_size(self.original_image, self.layout)
+        change = self.image_processor.visible_change(
+            self.mode, width, height, self._last_progress, progress
+        )
+        return change < self.incremental_threshold
+
+    def get_render_stats(self):
+        """描画回数と省略回数の統計"""
+        total = self.render_stats["rendered"] + self.render_stats["skipped"]
+        return dict(
+            self.render_stats,
+            skip_ratio=self.render_stats["skipped"] / total if total else 0.0,
+        )
+
+    def _render_frame(self, progress):
+        """進行度のフレームを取得（シーケンス・キャッシュ・描画のいずれか）"""
+        if self.sequence is not None:
+            return self.sequence.frame_at(progress)
+
+        if self.frame_cache is not None:
+            from frame_cache import image_digest
+
+            if self._image_id is None:
+                self._image_id = image_digest(self.image_path)
+            progress = self.frame_cache.quantize(progress)
+            extra = () if self.layout == "rgb" else (self.layout,)
+            if self.image_processor.curve_key is not None:
+                extra += (self.image_processor.curve_key,)
+            key = self.frame_cache.make_key(self._image_id, self.mode, progress, *extra)
+            return self.frame_cache.get_or_render(key, lambda: self.render_progress(progress))
+
+        return self.render_progress(progress)
+
+    def render_progress(self, progress):
+        """
+        進行度に応じた画像を描画
+
+        Args:
+            progress: 進行度（0.0-1.0）
 
+        Returns:
+            処理された画像
+        """
         # ImageProcessorには progress (0.0-1.0) を渡す
-        if self.mode == "blur":
-            return self.image_processor.apply_blur(self.original_image, progress)
-        elif self.mode == "zoom":
-            return self.image_processor.apply_zoom(self.original_image, progress)
-        elif self.mode == "hybrid":
-            return self.image_processor.apply_hybrid(self.original_image, progress)
-        else:
-            return self.original_image.copy()
+        render = getattr(self.image_processor, self.effect.render)
+        return render(self.original_image, progress)
+
+    def render_progress_batch(self, progress_values, out=None, use_pyramid=False):
+        """
+        複数の進行度の画像をまとめて描画
+
+        Args:
+            progress_values: 進行度（0.0-1.0）の配列
+            out: 書き込み先の配列 (len(progress_values), H, W, C)。Noneの場合は新規作成
+            use_pyramid: Trueの場合、強いぼかしを縮小ピラミッド上で近似する（高速、ぼかしを使うモードのみ）
+
+        Returns:
+            フレームを積み重ねた配列
+        """
+        if self.original_image is None and self.image_deferred:
+            self.image_deferred = False
+            self.load_image()
+
+        # use_pyramidなどのオプションは対応しているモードにだけ渡す
+        options = {"use_pyramid": use_pyramid}
+        kwargs = {name: options[name] for name in self.effect.batch_options if name in options}
+        render_batch = getattr(self.image_processor, self.effect.render_batch)
+        return render_batch(self.original_image, progress_values, out, **kwargs)
 
     def check_answer(self, user_answer):
         """
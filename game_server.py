@@ -0,0 +1,789 @@
+"""
+GameServer - 複数クライアント向けゲームセッションサーバー
+asyncioでHTTP/WebSocketを受け付け、セッションごとにGameEngine・TimerControllerを管理する
+フレームの描画とJPEG/WebPエンコードはプロセスプールで行い、正答判定はサーバー側で行う
+デコード済み画像は共有メモリプールに置き、ワーカーにはハンドルのみを渡す
+
+使い方:
+    python game_server.py --port 8765
+    ブラウザで http://127.0.0.1:8765/ を開く
+
+WebSocket (/ws) メッセージ:
+    クライアント -> サーバー (JSON)
+        {"type": "start", "mode": "blur", "questions": 5, "hint_mode": "halfway"}
+            （questionsは1〜MAX_QUESTIONSに収める。制限時間はサーバー側の設定値を使う）
+        {"type": "answer", "text": "cat"}
+            （textはMAX_ANSWER_LENGTH文字に切り詰めて判定・記録する）
+        {"type": "next"}
+    サーバー -> クライアント
+        JSON: question / hint / result / session_end / error
+        バイナリ: エンコード済みフレーム
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing.util
+import os
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker
+
+import runtime_config
+import ws_protocol
+from dataset_index import DatasetIndex
+from dataset_loader import DatasetLoader
+from effect_modes import mode_names
+from frame_cache import FrameCache, SharedFrameStore, image_digest
+from frame_encoder import FrameEncoder, parse_quality_ladder, quality_for
+from game_engine import GameEngine
+from label_loader import LabelLoader
+from lazy_import import lazy_import
+from memory_budget import create_budget
+from session_log import MAX_ANSWER_LENGTH, SessionEventLog
+from shared_image_pool import SharedImagePool, attach_image
+from timer_controller import TimerController
+
+cv2 = lazy_import("cv2")
+
+
+# ---------------------------------------------------------------------------
+# ワーカープロセス側の処理
+# ---------------------------------------------------------------------------
+
+_worker_label_loader = None
+_worker_engines = OrderedDict()
+_worker_frame_cache = None
+_worker_encoders = {}
+WORKER_ENGINE_CACHE_SIZE = 32
+# 1セッションの問題数の上限（クライアントの指定をこの範囲に収める）
+MAX_QUESTIONS = 50
+HINT_MODES = ("always", "halfway", "none")
+
+
+def init_worker(labels_file="labels.json", shm_prefix=None, shm_bytes=0, quantize_steps=200,
+                runtime=None, worker_counter=None):
+    """
+    ワーカープロセスの初期化
+
+    Args:
+        labels_file: ラベルファイルのパス
+        shm_prefix: ワーカー間で共有する共有メモリ名の接頭辞（Noneの場合は共有しない）
+        shm_bytes: ワーカー1つあたりが所有する共有メモリの上限バイト数
+        quantize_steps: 進行度の量子化段階数
+        runtime: OpenCVのスレッド数などを設定するRuntimeConfig（オプション）
+        worker_counter: CPUアフィニティ割り当て用のワーカー通し番号カウンタ
+    """
+    global _worker_label_loader, _worker_frame_cache
+    if runtime is not None:
+        runtime_config.init_worker(runtime, worker_counter)
+    _worker_label_loader = LabelLoader(labels_file)
+    store = None
+    if shm_prefix and shm_bytes > 0:
+        store = SharedFrameStore(prefix=shm_prefix, max_bytes=shm_bytes)
+        # プロセス終了時に所有する共有メモリを削除
+        multiprocessing.util.Finalize(None, store.close, exitpriority=10)
+    _worker_frame_cache = FrameCache(
+        max_bytes=16 * 1024 * 1024, quantize_steps=quantize_steps, shared_store=store
+    )
+
+
+def get_worker_engine(handle, mode):
+    """
+    共有メモリ上の画像を参照するGameEngineを取得（LRUでキャッシュ）
+
+    Args:
+        handle: SharedImagePoolのImageHandle（keyは画像パス）
+        mode: ゲームモード
+    """
+    key = (handle.name, mode)
+    engine = _worker_engines.get(key)
+    if engine is not None:
+        _worker_engines.move_to_end(key)
+        return engine
+
+    label_loader = _worker_label_loader or LabelLoader()
+    engine = GameEngine(
+        handle.key, mode, time_limit=1.0, label_loader=label_loader, defer_image=True
+    )
+    # デコードはサーバー側で済んでいるため、共有メモリのビューをそのまま使う
+    engine.original_image = attach_image(handle)
+    engine.image_deferred = False
+
+    _worker_engines[key] = engine
+    while len(_worker_engines) > WORKER_ENGINE_CACHE_SIZE:
+        _worker_engines.popitem(last=False)
+    return engine
+
+
+def decode_image(image_path, max_side=0):
+    """
+    画像をデコードしてRGBに変換し、必要に応じて縮小
+
+    Args:
+        image_path: 画像ファイルのパス
+        max_side: 長辺の最大ピクセル数（0の場合は縮小しない）
+    """
+    image = cv2.imread(image_path)
+    if image is None:
+        raise ValueError(f"画像の読み込みに失敗しました: {image_path}")
+    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    height, width = image.shape[:2]
+    if max_side and max(height, width) > max_side:
+        scale = max_side / max(height, width)
+        image = cv2.resize(
+            image, (max(1, int(width * scale)), max(1, int(height * scale))),
+            interpolation=cv2.INTER_AREA,
+        )
+    return image
+
+
+def get_worker_encoder(codec, quality_ladder):
+    """ワーカー内のFrameEncoderを取得（エンコード結果はワーカーのフレームキャッシュに保持）"""
+    key = (codec, tuple(quality_ladder))
+    encoder = _worker_encoders.get(key)
+    if encoder is None:
+        cache = _worker_frame_cache or FrameCache(max_bytes=16 * 1024 * 1024)
+        encoder = _worker_encoders[key] = FrameEncoder(codec, list(quality_ladder), cache=cache)
+    return encoder
+
+
+def render_frame_job(handle, mode, progress, codec="jpeg", quality_ladder=((0.0, 80),), max_side=0):
+    """
+    1フレームを描画してエンコード（ワーカープロセスで実行）
+
+    Args:
+        handle: 共有メモリ上の画像のImageHandle（画像データ自体はプロセス間でコピーしない）
+        mode: ゲームモード
+        progress: 進行度（0.0-1.0）
+        codec: エンコード形式
+        quality_ladder: (進行度, 品質) のリスト
+        max_side: キャッシュキー用の縮小サイズ
+
+    Returns:
+        (エンコード済みbytes, 計測情報の辞書) のタプル
+    """
+    start = time.perf_counter()
+    encoder = get_worker_encoder(codec, quality_ladder)
+    engine = get_worker_engine(handle, mode)
+    data, quality, encode_sec = encoder.encode_frame(
+        image_digest(handle.key), mode, progress, engine.get_processed_image, max_side
+    )
+    return data, {
+        "seconds": time.perf_counter() - start,
+        "encode_seconds": encode_sec,
+        "quality": quality,
+    }
+
+
+# ---------------------------------------------------------------------------
+# セッション管理
+# ---------------------------------------------------------------------------
+
+def parse_question_count(value):
+    """
+    クライアントが指定した問題数を検証し、1〜MAX_QUESTIONSの範囲に収める
+
+    Raises:
+        ValueError: 整数として解釈できない場合
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError("invalid questions")
+    try:
+        count = int(value)
+    except (ValueError, OverflowError):
+        raise ValueError("invalid questions") from None
+    return min(MAX_QUESTIONS, max(1, count))
+
+
+class GameSession:
+    """1クライアント分のゲームセッション"""
+
+    def __init__(self, session_id, dataset_loader, label_loader, mode="blur",
+                 question_count=5, time_limit=30.0, hint_mode="halfway", event_log=None,
+                 dataset_index=None):
+        """
+        初期化
+
+        Args:
+            session_id: セッションID
+            dataset_loader: DatasetLoaderインスタンス（サーバー全体で共有）
+            label_loader: LabelLoaderインスタンス（サーバー全体で共有）
+            mode: ゲームモード ('blur', 'zoom', 'hybrid')
+            question_count: 問題数
+            time_limit: 1問の制限時間（秒）。較正済みの画像は較正結果の制限時間を使う
+            hint_mode: ヒント表示モード ("always", "halfway", "none")
+            event_log: 回答結果を記録するSessionEventLog（オプション）
+            dataset_index: 難易度の較正結果を持つDatasetIndex（オプション）
+        """
+        self.session_id = session_id
+        self.dataset_loader = dataset_loader
+        self.label_loader = label_loader
+        self.mode = mode
+        self.question_count = question_count
+        self.time_limit = time_limit
+        self.hint_mode = hint_mode
+        self.event_log = event_log
+        self.dataset_index = dataset_index
+
+        self.timer_controller = TimerController()
+        self.game_engine = None
+        self.current_question = 0
+        self.scores = []
+        self.correct_count = 0
+        self.used_images = set()
+        self.answered = False
+        self.image_handle = None  # 共有メモリ上の現在の画像
+
+    def next_question(self):
+        """
+        次の問題を開始
+
+        Returns:
+            問題情報の辞書。出題できる画像がない場合はNone
+        """
+        if self.current_question >= self.question_count:
+            return None
+        image_path = self.dataset_loader.get_random_image(exclude=self.used_images)
+        if image_path is None:
+            return None
+
+        self.used_images.add(image_path)
+        self.current_question += 1
+        self.answered = False
+
+        # 描画はワーカープロセスで行うため、サーバー側では画像をデコードしない
+        self.game_engine = GameEngine(
+            image_path, self.mode, time_limit=self.time_limit,
+            label_loader=self.label_loader, defer_image=True, dataset_index=self.dataset_index,
+        )
+        self.timer_controller.start()
+
+        info = {
+            "type": "question",
+            "index": self.current_question,
+            "total": self.question_count,
+            "mode": self.mode,
+            "time_limit": self.game_engine.time_limit,
+        }
+        if self.hint_mode == "always":
+            info.update(self.get_hint_info())
+        return info
+
+    def get_hint_info(self):
+        """カテゴリとヒントを取得"""
+        return {
+            "category": self.game_engine.get_category(),
+            "hint": self.game_engine.get_hint(),
+        }
+
+    def get_progress(self):
+        """現在の進行度（経過時間の割合、0.0-1.0）"""
+        time_limit = self.game_engine.time_limit
+        if time_limit <= 0:
+            return 1.0
+        return min(1.0, self.timer_controller.get_elapsed_time() / time_limit)
+
+    def submit_answer(self, answer):
+        """
+        回答を判定
+
+        Returns:
+            判定結果の辞書
+        """
+        # クライアントの入力はログの名前表に残るため、長さを制限する
+        answer = str(answer)[:MAX_ANSWER_LENGTH]
+        elapsed = self.timer_controller.get_elapsed_time()
+        self.timer_controller.stop()
+        self.answered = True
+
+        is_correct, correct_answer = self.game_engine.check_answer(answer)
+        score = 0.0
+        if is_correct:
+            score = self.game_engine.calculate_score(elapsed)
+            self.correct_count += 1
+        self.scores.append(score)
+        if self.event_log is not None:
+            self.event_log.record(
+                self.game_engine.image_path, self.mode, elapsed, answer, is_correct, score,
+                session_id=self.session_id, question=self.current_question,
+            )
+
+        return {
+            "type": "result",
+            "correct": is_correct,
+            "answer": correct_answer,
+            "score": score,
+            "elapsed": elapsed,
+            "total_score": sum(self.scores),
+            "finished": self.is_finished(),
+        }
+
+    def is_finished(self):
+        """全問回答済みかどうか"""
+        return self.answered and self.current_question >= self.question_count
+
+    def get_stats(self):
+        """セッション結果（GameScreen.end_sessionと同じ形式）"""
+        total_questions = self.question_count
+        total_score = sum(self.scores)
+        return {
+            "mode": self.mode,
+            "total_questions": total_questions,
+            "correct_count": self.correct_count,
+            "total_score": total_score,
+            "average_score": total_score / total_questions if total_questions > 0 else 0.0,
+            "accuracy": (self.correct_count / total_questions * 100) if total_questions > 0 else 0.0,
+            "scores": list(self.scores),
+        }
+
+
+# ---------------------------------------------------------------------------
+# サーバー本体
+# ---------------------------------------------------------------------------
+
+class GameServer:
+    """HTTP/WebSocketゲームサーバー"""
+
+    def __init__(self, host="127.0.0.1", port=8765, images_dir="images",
+                 labels_file="labels.json", workers=None, codec="jpeg", quality_ladder="0:40,0.5:60,0.8:75,0.95:90",
+                 max_side=640, tick_interval=0.1, time_limit=30.0, max_sessions=1000,
+                 cache_bytes=256 * 1024 * 1024, shm_bytes=64 * 1024 * 1024, quantize_steps=200,
+                 image_pool_bytes=512 * 1024 * 1024, runtime=None, event_log_path=None,
+                 dataset_index_path=None):
+        """
+        初期化
+
+        Args:
+            host: 待ち受けアドレス
+            port: 待ち受けポート（0の場合は空きポート）
+            images_dir: 画像フォルダのパス
+            labels_file: ラベルファイルのパス
+            workers: 描画プロセス数（既定: CPUコア数）
+            codec: フレームのエンコード形式 ('jpeg', 'webp')
+            quality_ladder: 進行度ごとのエンコード品質（"0:40,0.5:60" 形式の文字列、
+                単一の品質、または (進行度, 品質) のリスト）
+            max_side: 配信フレームの長辺の最大ピクセル数
+            tick_interval: フレーム配信間隔（秒）
+            time_limit: 1問の制限時間（秒）
+            max_sessions: 同時セッション数の上限
+            cache_bytes: サーバープロセス内のフレームキャッシュの上限バイト数
+            shm_bytes: 描画ワーカー1つあたりの共有メモリキャッシュの上限バイト数（0で無効）
+            quantize_steps: 進行度の量子化段階数（同じ段階のフレームをセッション間で共有）
+            image_pool_bytes: デコード済み画像を置く共有メモリプールの上限バイト数
+            runtime: 描画ワーカーに適用するRuntimeConfig（Noneの場合はserverの既定値）
+            event_log_path: 回答結果を追記するセッションログのパス（Noneの場合は記録しない）
+            dataset_index_path: 難易度の較正結果を持つデータセットインデックスのパス
+                （Noneの場合はすべての画像でtime_limitと線形の進行度を使う）
+        """
+        self.host = host
+        self.port = port
+        self.labels_file = labels_file
+        self.runtime = runtime or runtime_config.RuntimeConfig.for_mode("server", workers=workers)
+        self.workers = self.runtime.workers or os.cpu_count()
+        self.codec = codec
+        if isinstance(quality_ladder, (str, int)):
+            quality_ladder = parse_quality_ladder(str(quality_ladder))
+        self.quality_ladder = tuple(sorted(quality_ladder))
+        self.max_side = max_side
+        self.tick_interval = tick_interval
+        self.time_limit = time_limit
+        self.max_sessions = max_sessions
+        self.shm_bytes = shm_bytes
+
+        self.frame_cache = FrameCache(max_bytes=cache_bytes, quantize_steps=quantize_steps)
+        self.image_pool = SharedImagePool(max_bytes=image_pool_bytes)
+        # 実行時設定でメモリ予算を指定した場合、フレームキャッシュと画像プールの合計を制限する
+        self.memory_budget = create_budget(self.runtime.memory_budget, self.runtime.min_available)
+        if self.memory_budget is not None:
+            self.memory_budget.register("encoded_frames", self.frame_cache)
+            self.memory_budget.register("decoded_images", self.image_pool)
+        self.label_loader = LabelLoader(labels_file)
+        self.event_log = SessionEventLog(event_log_path) if event_log_path else None
+        self.dataset_index = DatasetIndex(dataset_index_path) if dataset_index_path else None
+        # ワーカーでの読み込みに失敗する画像・巨大な画像は起動時に出題対象から除く
+        self.dataset_loader = DatasetLoader(
+            images_dir, validate=True, dataset_index=self.dataset_index, label_loader=self.label_loader
+        )
+        self.executor = None
+        self.server = None
+        self.sessions = {}
+        self._session_ids = itertools.count(1)
+        self.metrics = {
+            "sessions_total": 0,
+            "frames_sent": 0,
+            "bytes_sent": 0,
+            "render_seconds": 0.0,
+            "encode_seconds": 0.0,
+            "frames_encoded": 0,
+            "dropped_ticks": 0,
+            "answers": 0,
+        }
+
+    async def start(self):
+        """サーバーを起動"""
+        shm_prefix = f"vgc{os.getpid()}"
+        # ワーカーがresource_trackerを共有するよう、プール作成前に起動しておく
+        # （各ワーカーが個別のtrackerを持つと、接続しただけの共有メモリが終了時に削除される）
+        resource_tracker.ensure_running()
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=init_worker,
+            initargs=(self.labels_file, shm_prefix, self.shm_bytes, self.frame_cache.quantize_steps,
+                      self.runtime, runtime_config.make_worker_counter()),
+        )
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        """サーバーを停止"""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        self.image_pool.close()
+        if self.event_log is not None:
+            self.event_log.close()
+
+    async def serve_forever(self):
+        """停止されるまで待ち受け"""
+        async with self.server:
+            await self.server.serve_forever()
+
+    def get_health(self):
+        """稼働状況"""
+        encoded = self.metrics["frames_encoded"]
+        sent = self.metrics["frames_sent"]
+        return dict(
+            self.metrics,
+            encode_ms_per_frame=self.metrics["encode_seconds"] * 1000 / encoded if encoded else 0.0,
+            bytes_per_frame=self.metrics["bytes_sent"] / sent if sent else 0.0,
+            sessions_active=len(self.sessions),
+            workers=self.workers,
+            runtime=self.runtime.describe(),
+            frame_cache=self.frame_cache.get_stats(),
+            image_pool=self.image_pool.get_stats(),
+            memory=self.memory_budget.get_stats() if self.memory_budget is not None else None,
+            images=self.dataset_loader.get_image_count(),
+            images_quarantined=len(self.dataset_loader.quarantined),
+        )
+
+    async def handle_client(self, reader, writer):
+        """接続ごとの処理"""
+        try:
+            method, path, headers = await ws_protocol.read_http_request(reader)
+        except (ConnectionError, ValueError):
+            writer.close()
+            return
+
+        try:
+            if path == "/ws" and ws_protocol.is_websocket_request(headers):
+                await ws_protocol.server_handshake(writer, headers)
+                await self.handle_websocket(reader, writer)
+            elif method == "GET" and path == "/health":
+                await self.send_http(writer, 200, json.dumps(self.get_health()), "application/json")
+            elif method == "GET" and path == "/":
+                await self.send_http(writer, 200, CLIENT_HTML, "text/html; charset=utf-8")
+            else:
+                await self.send_http(writer, 404, "not found", "text/plain")
+        except (ConnectionError, ws_protocol.WebSocketClosed):
+            pass
+        finally:
+            writer.close()
+
+    async def send_http(self, writer, status, body, content_type):
+        """HTTPレスポンスを送信"""
+        body = body.encode("utf-8")
+        reason = {200: "OK", 404: "Not Found"}.get(status, "")
+        header = (
+            f"HTTP/1.1 {status} {reason}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n"
+        )
+        writer.write(header.encode("ascii") + body)
+        await writer.drain()
+
+    async def send_json(self, writer, data):
+        """JSONメッセージを送信"""
+        await ws_protocol.write_message(writer, json.dumps(data, ensure_ascii=False))
+
+    async def handle_websocket(self, reader, writer):
+        """WebSocketセッションの処理"""
+        session = None
+        stream_task = None
+        try:
+            while True:
+                message = await ws_protocol.read_message(reader, writer)
+                if not isinstance(message, str):
+                    continue
+                try:
+                    data = json.loads(message)
+                except json.JSONDecodeError:
+                    await self.send_json(writer, {"type": "error", "message": "invalid json"})
+                    continue
+                if not isinstance(data, dict):
+                    await self.send_json(writer, {"type": "error", "message": "invalid message"})
+                    continue
+                kind = data.get("type")
+
+                if kind == "start":
+                    if session is None and len(self.sessions) >= self.max_sessions:
+                        await self.send_json(writer, {"type": "error", "message": "server full"})
+                        continue
+                    try:
+                        question_count = parse_question_count(data.get("questions", 5))
+                    except ValueError as e:
+                        await self.send_json(writer, {"type": "error", "message": str(e)})
+                        continue
+                    if stream_task:
+                        stream_task.cancel()
+                    if session is not None:
+                        self.release_image(session)
+                        self.sessions.pop(session.session_id, None)
+                    session = self.create_session(data, question_count)
+                    stream_task = await self.start_question(session, writer)
+
+                elif kind == "answer" and session and session.game_engine and not session.answered:
+                    text = data.get("text", "")
+                    if not isinstance(text, str):
+                        await self.send_json(writer, {"type": "error", "message": "invalid answer"})
+                        continue
+                    if stream_task:
+                        stream_task.cancel()
+                    result = session.submit_answer(text)
+                    self.release_image(session)
+                    self.metrics["answers"] += 1
+                    await self.send_json(writer, result)
+                    if result["finished"]:
+                        await self.send_json(writer, {"type": "session_end", **session.get_stats()})
+
+                elif kind == "next" and session and session.answered and not session.is_finished():
+                    stream_task = await self.start_question(session, writer)
+
+                else:
+                    await self.send_json(writer, {"type": "error", "message": f"unexpected: {kind}"})
+        finally:
+            if stream_task:
+                stream_task.cancel()
+            if session is not None:
+                self.release_image(session)
+                self.sessions.pop(session.session_id, None)
+
+    def create_session(self, data, question_count):
+        """
+        startメッセージからセッションを作成
+
+        制限時間はスコアに直結するため、クライアントからは指定させない
+        （サーバーの設定値、または較正済みの画像は較正結果を使う）
+        """
+        mode = data.get("mode", "blur")
+        if mode not in mode_names():
+            mode = "blur"
+        hint_mode = data.get("hint_mode", "halfway")
+        if hint_mode not in HINT_MODES:
+            hint_mode = "halfway"
+        session = GameSession(
+            next(self._session_ids),
+            self.dataset_loader,
+            self.label_loader,
+            mode=mode,
+            question_count=question_count,
+            time_limit=self.time_limit,
+            hint_mode=hint_mode,
+            event_log=self.event_log,
+            dataset_index=self.dataset_index,
+        )
+        self.sessions[session.session_id] = session
+        self.metrics["sessions_total"] += 1
+        return session
+
+    async def start_question(self, session, writer):
+        """次の問題を出題してフレーム配信を開始"""
+        info = session.next_question()
+        if info is None:
+            await self.send_json(writer, {"type": "error", "message": "no images available"})
+            return None
+        session.image_handle = await self.acquire_image(session.game_engine.image_path)
+        await self.send_json(writer, info)
+        return asyncio.create_task(self.stream_frames(session, writer))
+
+    async def acquire_image(self, image_path):
+        """
+        デコード済み画像を共有メモリプールから取得（未登録ならデコードして登録）
+
+        Returns:
+            ImageHandle
+        """
+        handle = self.image_pool.acquire(image_path)
+        if handle is None:
+            if self.memory_budget is not None:
+                self.memory_budget.relieve_pressure()
+            image = await asyncio.get_running_loop().run_in_executor(
+                None, decode_image, image_path, self.max_side
+            )
+            handle = self.image_pool.put(image_path, image)
+        return handle
+
+    def release_image(self, session):
+        """セッションが参照している画像を解放"""
+        if session.image_handle is not None:
+            self.image_pool.release(session.image_handle)
+            session.image_handle = None
+
+    async def stream_frames(self, session, writer):
+        """
+        回答されるまで一定間隔でフレームを配信
+
+        描画が間隔内に終わらない場合は、そのティックを取りこぼして次の進行度で描画する
+        """
+        loop = asyncio.get_running_loop()
+        engine = session.game_engine
+        handle = session.image_handle
+        image_id = image_digest(engine.image_path)
+        hint_sent = session.hint_mode == "always"
+        while not session.answered:
+            tick_start = loop.time()
+            # 同じ画像・モード・進行度段階のフレームはセッション間で共有する
+            # （較正済みの画像は表示カーブを適用してから量子化する）
+            progress = self.frame_cache.quantize(engine.reveal_progress(session.get_progress()))
+            # キーはワーカー側のFrameEncoderと同じ構成にする
+            quality = quality_for(self.quality_ladder, progress)
+            key = self.frame_cache.make_key(
+                image_id, engine.mode, progress, self.codec, quality, self.max_side
+            )
+
+            async def render():
+                data, info = await loop.run_in_executor(
+                    self.executor, render_frame_job, handle, engine.mode,
+                    progress, self.codec, self.quality_ladder, self.max_side,
+                )
+                self.metrics["render_seconds"] += info["seconds"]
+                if info["encode_seconds"] > 0:
+                    self.metrics["frames_encoded"] += 1
+                    self.metrics["encode_seconds"] += info["encode_seconds"]
+                return data
+
+            data = await self.frame_cache.get_or_render_async(key, render)
+            if session.answered or session.game_engine is not engine:
+                break
+            await ws_protocol.write_message(writer, data)
+            self.metrics["frames_sent"] += 1
+            self.metrics["bytes_sent"] += len(data)
+
+            if not hint_sent and session.hint_mode == "halfway" and progress > 0.5:
+                hint_sent = True
+                await self.send_json(writer, {"type": "hint", **session.get_hint_info()})
+
+            if progress >= 1.0:
+                break  # 完全にクリアになったら配信を止める
+
+            spent = loop.time() - tick_start
+            if spent > self.tick_interval:
+                self.metrics["dropped_ticks"] += int(spent / self.tick_interval)
+            await asyncio.sleep(max(0.0, self.tick_interval - spent))
+
+
+CLIENT_HTML = """<!DOCTYPE html>
+<html lang="ja"><head><meta charset="utf-8"><title>Visual Guess Challenge</title></head>
+<body style="font-family: sans-serif; text-align: center">
+<h1>タイムアタック画像クイズ</h1>
+<select id="mode">%MODE_OPTIONS%</select>
+<button id="start">スタート</button>
+<div id="info"></div>
+<img id="frame" style="max-width: 90vw; max-height: 60vh; border: 2px solid gray">
+<div><input id="answer" maxlength="64" placeholder="回答を入力"><button id="submit">回答する</button>
+<button id="next" disabled>次へ</button></div>
+<pre id="log"></pre>
+<script>
+const ws = new WebSocket(`ws://${location.host}/ws`);
+ws.binaryType = "blob";
+const $ = (id) => document.getElementById(id);
+let url = null;
+ws.onmessage = (ev) => {
+  if (typeof ev.data !== "string") {
+    if (url) URL.revokeObjectURL(url);
+    url = URL.createObjectURL(ev.data);
+    $("frame").src = url;
+    return;
+  }
+  const msg = JSON.parse(ev.data);
+  if (msg.type === "question") $("info").textContent = `問題 ${msg.index}/${msg.total}`;
+  if (msg.type === "hint") $("info").textContent += ` カテゴリ: ${msg.category || ""} 💡 ${msg.hint || ""}`;
+  if (msg.type === "result") {
+    $("log").textContent = msg.correct ? `正解！ ${msg.score.toFixed(1)}点` : `残念！正解は「${msg.answer}」`;
+    $("next").disabled = msg.finished;
+  }
+  if (msg.type === "session_end") $("log").textContent += `\\n総合スコア: ${msg.total_score.toFixed(1)}点`;
+};
+$("start").onclick = () => ws.send(JSON.stringify({type: "start", mode: $("mode").value, questions: 5}));
+$("submit").onclick = () => ws.send(JSON.stringify({type: "answer", text: $("answer").value}));
+$("next").onclick = () => { $("next").disabled = true; $("answer").value = ""; ws.send(JSON.stringify({type: "next"})); };
+</script>
+</body></html>
+"""
+
+# モードの選択肢はレジストリから作成する
+CLIENT_HTML = CLIENT_HTML.replace(
+    "%MODE_OPTIONS%", "".join(f"<option>{name}</option>" for name in mode_names())
+)
+
+
+def main(argv=None):
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="ゲームセッションサーバー")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--images-dir", default="images")
+    parser.add_argument("--labels-file", default="labels.json")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--codec", choices=["jpeg", "webp"], default="jpeg")
+    parser.add_argument("--quality", default="0:40,0.5:60,0.8:75,0.95:90",
+                        help="エンコード品質（単一の値、または 進行度:品質 のカンマ区切り）")
+    parser.add_argument("--max-side", type=int, default=640)
+    parser.add_argument("--tick", type=float, default=0.1, help="フレーム配信間隔（秒）")
+    parser.add_argument("--time-limit", type=float, default=30.0)
+    parser.add_argument("--max-sessions", type=int, default=1000)
+    parser.add_argument("--cache-mb", type=int, default=256, help="フレームキャッシュの上限（MB）")
+    parser.add_argument("--shm-mb", type=int, default=64, help="ワーカーごとの共有メモリキャッシュ上限（MB、0で無効）")
+    parser.add_argument("--quantize-steps", type=int, default=200, help="進行度の量子化段階数")
+    parser.add_argument("--image-pool-mb", type=int, default=512, help="共有メモリ画像プールの上限（MB）")
+    parser.add_argument("--event-log", default=None, help="回答結果を追記するセッションログのパス")
+    parser.add_argument("--dataset-index", default=None,
+                        help="難易度の較正結果を持つデータセットインデックスのパス（difficulty_calibration.py）")
+    runtime_config.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = GameServer(
+        host=args.host, port=args.port, images_dir=args.images_dir,
+        labels_file=args.labels_file, workers=args.workers, codec=args.codec,
+        quality_ladder=args.quality, max_side=args.max_side, tick_interval=args.tick,
+        time_limit=args.time_limit, max_sessions=args.max_sessions,
+        cache_bytes=args.cache_mb * 1024 * 1024, shm_bytes=args.shm_mb * 1024 * 1024,
+        quantize_steps=args.quantize_steps, image_pool_bytes=args.image_pool_mb * 1024 * 1024,
+        runtime=runtime_config.from_args("server", args, workers=args.workers),
+        event_log_path=args.event_log,
+        dataset_index_path=args.dataset_index,
+    )
+
+    async def run():
+        await server.start()
+        print(f"http://{server.host}:{server.port}/ で待ち受け中（描画プロセス数: {server.workers}）")
+        try:
+            await server.serve_forever()
+        finally:
+            await server.stop()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,60 +3,369 @@ ImageProcessor - 画像処理クラス
 ぼかし処理、ズーム処理、ハイブリッド処理を担当
 """
 
-import cv2
-import numpy as np
+import math
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from lazy_import import lazy_import
+from effect_modes import get_mode
+from pixel_layout import check_layout
+from reveal_curve import compile_effect_table, curve_key, resolve_curves
+
+# 起動を速くするため、cv2/numpyは最初の画像処理時に読み込む
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+
+BLUR_METHODS = ("gaussian", "separable", "box")
+
+# タイル処理用のスレッドプール（ワーカー数ごとに1つ、全インスタンスで共有）
+_tile_executors = {}
+_tile_executors_lock = threading.Lock()
+
+
+def get_tile_executor(workers):
+    """タイル処理用のスレッドプールを取得（cv2の関数はGILを解放するためスレッドで並列化できる）"""
+    with _tile_executors_lock:
+        executor = _tile_executors.get(workers)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tile")
+            _tile_executors[workers] = executor
+        return executor
+
+
+def box_sizes_for_gauss(sigma, passes=3):
+    """
+    ガウシアンぼかしをpasses回のボックスぼかしで近似するときの各カーネル幅
+
+    Args:
+        sigma: 近似するガウシアンのsigma
+        passes: ボックスぼかしの回数
+
+    Returns:
+        奇数のカーネル幅のリスト（分散の合計がsigma^2に最も近くなる組み合わせ）
+    """
+    ideal = math.sqrt(12.0 * sigma * sigma / passes + 1.0)
+    lower = int(ideal)
+    if lower % 2 == 0:
+        lower -= 1
+    upper = lower + 2
+    # 幅lowerを何回使うか（残りはupper）
+    m = round((12.0 * sigma * sigma - passes * lower * lower - 4 * passes * lower - 3 * passes)
+              / (-4.0 * lower - 4.0))
+    return [lower if i < m else upper for i in range(passes)]
 
 
 class ImageProcessor:
     """画像プロセッサークラス"""
 
-    def __init__(self):
-        """初期化"""
-        pass
+    # 最大ぼかし強度 (sigma)
+    MAX_SIGMA = 30.0
+    # ズームの最小表示割合 (例: 12.5% = 1/8)
+    MIN_ZOOM_RATIO = 0.125
+    # ピラミッドを使う場合、1段縮小するごとに必要な最小sigma
+    PYRAMID_MIN_SIGMA = 4.0
+    # 'separable'/'box' でsigmaを量子化する幅（カーネルキャッシュのキー）
+    SIGMA_STEP = 0.25
+    # タイル処理を行う最小画素数（小さい画像はスレッドの切り替えの方が高くつく）
+    TILE_MIN_PIXELS = 1024 * 1024
+    # モザイクの最大ブロックサイズ（進行度0のときの1ブロックの画素数）
+    MAX_PIXEL_BLOCK = 48
+    # タイル表示モードの横方向のタイル数（縦は画像の縦横比に合わせる）
+    REVEAL_TILES = 8
+    # タイルの表示順とノイズの乱数シード（同じ画像サイズなら毎回同じ見た目になる）
+    EFFECT_SEED = 20240601
+    # 画像ごとの事前計算結果（タイルの表示順・モザイク画像）を保持する数
+    EFFECT_STATE_SIZE = 8
 
-    def apply_blur(self, image, progress):
+    # サイズごとのノイズ画像のキャッシュ（全インスタンスで共有）
+    _noise_cache = OrderedDict()
+    NOISE_CACHE_SIZE = 4
+
+    # 1次元ガウシアンカーネルのキャッシュ（全インスタンスで共有）
+    _kernel_cache = {}
+    _kernel_lock = threading.Lock()
+
+    def __init__(self, blur_method="gaussian", tile_workers=0, layout="rgb", curves=None):
         """
-        progress: 0.0 (開始) -> 1.0 (クリア)
+        初期化
+
+        Args:
+            blur_method: ぼかしの実装
+                'gaussian': cv2.GaussianBlur（既定、従来と同じ結果）
+                'separable': 量子化したsigmaごとにキャッシュした1次元カーネルをsepFilter2Dで適用
+                'box': 3回のボックスぼかしで近似（sigmaに関わらず1画素あたりのコストが一定）
+            tile_workers: 大きい画像のぼかしを横帯のタイルに分割して並列処理するスレッド数
+                0の場合はタイル処理しない、Noneの場合はCPUコア数
+                タイルはぼかしの範囲分（ハロー）だけ重ねて処理するため、出力は分割しない場合と一致する
+            layout: 入力画像の画素レイアウト（pixel_layout.LAYOUTS）
+                'planar' の場合は (C, H, W) の各チャンネルを個別に処理する
+            curves: モードごとの進行度カーブ（reveal_curve.DEFAULT_CURVESのキーとカーブ指定の辞書）
+                指定しなかったキーは既定のカーブ（従来と同じ変化）を使う
         """
-        if image is None:
+        if blur_method not in BLUR_METHODS:
+            raise ValueError(f"未対応のぼかし方式です: {blur_method}")
+        self.blur_method = blur_method
+        self.tile_workers = (os.cpu_count() or 1) if tile_workers is None else tile_workers
+        self.layout = check_layout(layout)
+        self.curves = resolve_curves(curves)
+        # キャッシュのキーに加える識別子（既定のカーブの場合はNone）
+        self.curve_key = curve_key(self.curves)
+        # モードごとの効果パラメータのテーブル（フレームごとの計算は参照のみ）
+        self.tables = {
+            "blur": self._effect_table(blur=self.curves["blur"]),
+            "zoom": self._effect_table(zoom=self.curves["zoom"]),
+            "hybrid": self._effect_table(blur=self.curves["hybrid_blur"], zoom=self.curves["hybrid_zoom"]),
+            "pixelate": self._effect_table(strength=self.curves["pixelate"]),
+            "tiles": self._effect_table(strength=self.curves["tiles"]),
+            "noise": self._effect_table(strength=self.curves["noise"]),
+        }
+        # 画像ごとの事前計算結果 (種類, アドレス, 形状, ストライド) -> (image, 結果)
+        self._effect_state = OrderedDict()
+        # planarの各チャンネル（2次元画像）を処理するインターリーブ用のプロセッサ
+        self._plane_processor = None
+        if layout == "planar":
+            self._plane_processor = ImageProcessor(blur_method, tile_workers, curves=self.curves)
+
+    def _effect_table(self, blur=None, zoom=None, strength=None):
+        """効果パラメータのテーブルを作成（同じカーブのテーブルはインスタンス間で共有）"""
+        return compile_effect_table(blur, zoom, self.MAX_SIGMA, self.MIN_ZOOM_RATIO,
+                                    strength_spec=strength)
+
+    def _per_plane(self, method, image, progress_values, out=None, **kwargs):
+        """
+        planarの画像をチャンネルごとにバッチAPIで処理
+
+        各チャンネルの結果は出力配列の該当チャンネルに直接書き込む（結合のコピーなし）
+        """
+        out = self.prepare_batch_output(image, len(progress_values), out)
+        for c in range(image.shape[0]):
+            getattr(self._plane_processor, method)(image[c], progress_values, out[:, c], **kwargs)
+        return out
+
+    def quantize_sigma(self, sigma):
+        """カーネルキャッシュ用にsigmaを量子化"""
+        return round(sigma / self.SIGMA_STEP) * self.SIGMA_STEP
+
+    @classmethod
+    def gaussian_kernel(cls, sigma):
+        """
+        量子化済みsigmaの1次元ガウシアンカーネルを取得（キャッシュ）
+
+        Returns:
+            (ksize, 1) のfloat32カーネル
+        """
+        kernel = cls._kernel_cache.get(sigma)
+        if kernel is None:
+            ksize = int(sigma * 6) + 1
+            if ksize % 2 == 0:
+                ksize += 1
+            kernel = cv2.getGaussianKernel(ksize, sigma, cv2.CV_32F)
+            with cls._kernel_lock:
+                cls._kernel_cache.setdefault(sigma, kernel)
+        return kernel
+
+    def _tile_bands(self, image):
+        """
+        タイル処理する場合の横帯の範囲
+
+        Returns:
+            (開始行, 終了行) のリスト。タイル処理しない場合はNone
+        """
+        if self.tile_workers < 2 or image.shape[0] * image.shape[1] < self.TILE_MIN_PIXELS:
             return None
+        height = image.shape[0]
+        # 処理時間のばらつきを吸収するため、ワーカー数の2倍に分割する
+        count = min(self.tile_workers * 2, max(1, height // 64))
+        bounds = [height * i // count for i in range(count + 1)]
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def _run_tiles(self, bands, func):
+        """各横帯に対してfunc(開始行, 終了行)を並列に実行"""
+        executor = get_tile_executor(self.tile_workers)
+        # 例外を呼び出し元に伝えるため結果を取り出す
+        for _ in executor.map(lambda band: func(*band), bands):
+            pass
+
+    def _blur_halo(self, sigma, ksize):
+        """ぼかしが参照する範囲の半径（タイルの重なり幅）"""
+        if self.blur_method == "separable":
+            return len(self.gaussian_kernel(self.quantize_sigma(sigma))) // 2
+        if self.blur_method == "box":
+            return sum(width // 2 for width in box_sizes_for_gauss(self.quantize_sigma(sigma)))
+        return ksize // 2
+
+    def blur(self, image, sigma, ksize, dst=None):
+        """
+        blur_methodに応じてぼかしを適用
+
+        Args:
+            image: 入力画像
+            sigma: ガウシアンのsigma
+            ksize: 'gaussian' で使うカーネルサイズ
+            dst: 書き込み先（Noneの場合は新規作成）
+
+        Returns:
+            ぼかした画像
+        """
+        bands = self._tile_bands(image)
+        if bands is None:
+            return self._blur_whole(image, sigma, ksize, dst)
+
+        if dst is None:
+            dst = np.empty_like(image)
+        elif np.shares_memory(dst, image):
+            # その場で処理すると隣のタイルが参照するハローを書き換えてしまう
+            image = image.copy()
+        halo = self._blur_halo(sigma, ksize)
+        height = image.shape[0]
 
+        def blur_band(y0, y1):
+            # ハロー分だけ広げた範囲をぼかし、中央部分だけを書き込む
+            top = max(0, y0 - halo)
+            bottom = min(height, y1 + halo)
+            result = self._blur_whole(image[top:bottom], sigma, ksize)
+            dst[y0:y1] = result[y0 - top:y1 - top]
+
+        self._run_tiles(bands, blur_band)
+        return dst
+
+    def _blur_whole(self, image, sigma, ksize, dst=None):
+        """blur_methodに応じてぼかしを適用（分割しない）"""
+        if self.blur_method == "separable":
+            kernel = self.gaussian_kernel(self.quantize_sigma(sigma))
+            return cv2.sepFilter2D(image, -1, kernel, kernel, dst=dst,
+                                   borderType=cv2.BORDER_REFLECT_101)
+        if self.blur_method == "box":
+            # cv2.blurは累積和で計算するためカーネル幅によらずコストが一定
+            src = image
+            for width in box_sizes_for_gauss(self.quantize_sigma(sigma)):
+                if width > 1:
+                    dst = cv2.blur(src, (width, width), dst=dst,
+                                   borderType=cv2.BORDER_REFLECT_101)
+                    src = dst
+            if src is image:
+                if dst is None:
+                    return image.copy()
+                dst[...] = image
+            return dst
+        return cv2.GaussianBlur(image, (ksize, ksize), sigma, dst=dst)
+
+    def blur_params(self, progress):
+        """
+        進行度からぼかしのパラメータを計算（線形カーブの式。描画はself.tablesを参照する）
+
+        Returns:
+            (sigma, ksize) のタプル。ぼかし不要の場合はsigmaが0.1以下
+        """
         # 進行度を 0.0-1.0 にクリップ
         progress = max(0.0, min(1.0, progress))
 
-        # 最大ぼかし強度 (sigma)
-        max_sigma = 30.0
-
         # 進行度に応じてsigmaを減少 (1.0のとき0になる)
-        sigma = max_sigma * (1.0 - progress)
-
-        if sigma <= 0.1:  # ほぼ0なら処理しない
-            return image.copy()
+        sigma = self.MAX_SIGMA * (1.0 - progress)
 
         # カーネルサイズをsigmaから計算 (奇数にする必要がある)
         ksize = int(sigma * 6) + 1
         if ksize % 2 == 0:
             ksize += 1
+        return sigma, ksize
 
-        return cv2.GaussianBlur(image, (ksize, ksize), sigma)
+    def zoom_ratio(self, progress):
+        """進行度に対応する表示割合（線形カーブの式。描画はself.tablesを参照する）"""
+        progress = max(0.0, min(1.0, progress))
 
-    def apply_zoom(self, image, progress):
+        # 線形補間: min_ratio から 1.0 へ変化
+        return self.MIN_ZOOM_RATIO + (1.0 - self.MIN_ZOOM_RATIO) * progress
+
+    def visible_change(self, mode, width, height, progress_a, progress_b):
         """
-        progress: 0.0 (開始) -> 1.0 (クリア)
-        アフィン変換を使用してサブピクセル精度で滑らかにズームアウト
+        2つの進行度のフレームの見た目の差を、画素単位の移動量・ぼかし半径の差として推定
+
+        実際に描画せずにパラメータから求めるため、差が小さい場合は描画自体を省略できる
+
+        Args:
+            mode: ゲームモード（effect_modesに登録されたモード名）
+            width: 画像の幅
+            height: 画像の高さ
+            progress_a: 比較元の進行度
+            progress_b: 比較先の進行度
+
+        Returns:
+            推定される変化量（画素数）
         """
-        if image is None:
-            return None
+        return getattr(self, get_mode(mode).change)(width, height, progress_a, progress_b)
 
-        height, width = image.shape[:2]
-        progress = max(0.0, min(1.0, progress))
+    def change_blur(self, width, height, progress_a, progress_b):
+        """ぼかしモードの変化量（sigmaの差）"""
+        return self._zoom_blur_change("blur", width, height, progress_a, progress_b)
 
-        # 最小表示割合 (例: 12.5% = 1/8)
-        min_ratio = 0.125
+    def change_zoom(self, width, height, progress_a, progress_b):
+        """ズームモードの変化量（隅の画素の移動量）"""
+        return self._zoom_blur_change("zoom", width, height, progress_a, progress_b)
 
-        # 線形補間: min_ratio から 1.0 へ変化
-        current_ratio = min_ratio + (1.0 - min_ratio) * progress
+    def change_hybrid(self, width, height, progress_a, progress_b):
+        """ハイブリッドモードの変化量（移動量とsigmaの差の大きい方）"""
+        return self._zoom_blur_change("hybrid", width, height, progress_a, progress_b)
+
+    def _zoom_blur_change(self, mode, width, height, progress_a, progress_b):
+        """ズーム・ぼかしの変化量"""
+        table = self.tables[mode]
+        change = 0.0
+        if mode in ("zoom", "hybrid"):
+            ratio_a = table.zoom_ratio(progress_a)
+            ratio_b = table.zoom_ratio(progress_b)
+            # 出力画像の隅の画素が参照する位置の移動量を、出力画像の画素数に換算
+            radius = 0.5 * math.hypot(width, height)
+            change = radius * abs(ratio_a - ratio_b) / min(ratio_a, ratio_b)
+        if mode in ("blur", "hybrid"):
+            sigma_a = table.blur(progress_a)[0]
+            sigma_b = table.blur(progress_b)[0]
+            # sigmaが0.1以下のフレームはぼかしなしとして扱われる
+            sigma_a = sigma_a if sigma_a > 0.1 else 0.0
+            sigma_b = sigma_b if sigma_b > 0.1 else 0.0
+            change = max(change, abs(sigma_a - sigma_b))
+        return change
+
+    def change_pixelate(self, width, height, progress_a, progress_b):
+        """モザイクモードの変化量（ブロックサイズの差）"""
+        return float(abs(self.pixel_block(progress_a) - self.pixel_block(progress_b)))
+
+    def change_tiles(self, width, height, progress_a, progress_b):
+        """タイル表示モードの変化量（表示済みタイル数が変わればタイル1辺の画素数）"""
+        _, rows = self._tile_grid(width, height)
+        count_a = self.revealed_tiles(progress_a, rows)
+        count_b = self.revealed_tiles(progress_b, rows)
+        if count_a == count_b:
+            return 0.0
+        return float(abs(count_a - count_b)) * width / self.REVEAL_TILES
 
+    def change_noise(self, width, height, progress_a, progress_b):
+        """ノイズモードの変化量（画素値の変化の最大値）"""
+        table = self.tables["noise"]
+        return abs(table.effect_strength(progress_a) - table.effect_strength(progress_b)) * 255.0
+
+    def zoom_matrix(self, width, height, progress, mode="zoom"):
+        """
+        進行度からズーム用のアフィン変換行列を計算
+
+        Args:
+            mode: 拡大率を参照するテーブル ('zoom', 'hybrid')
+
+        Returns:
+            2x3のアフィン変換行列 (float32)
+        """
+        return self.scale_matrix(width, height, self.tables[mode].zoom_scale(progress))
+
+    @staticmethod
+    def scale_matrix(width, height, scale):
+        """
+        拡大率からズーム用のアフィン変換行列を計算
+
+        Returns:
+            2x3のアフィン変換行列 (float32)
+        """
         # 中心座標（浮動小数点精度）
         cx = width / 2.0
         cy = height / 2.0
@@ -64,8 +373,8 @@ class ImageProcessor:
         # アフィン変換を使用して滑らかにズームアウト
         # スケール係数: current_ratioが小さいほど拡大（ズームイン）、大きいほど縮小（ズームアウト）
         # 目標は元画像の中心部分をcurrent_ratioのサイズで切り出して、元サイズに拡大すること
-        scale = 1.0 / current_ratio
-        
+        # （scale = 1 / current_ratio はテーブルに計算済み）
+
         # アフィン変換行列: 中心を基準に拡大し、出力画像の中心に配置
         # M = [[scale, 0, tx],
         #      [0, scale, ty]]
@@ -73,30 +382,464 @@ class ImageProcessor:
         # 中心(cx, cy)が常に出力画像の中心(width/2, height/2)に対応するように設定
         tx = (width / 2.0) - (cx * scale)
         ty = (height / 2.0) - (cy * scale)
-        
-        M = np.array([[scale, 0, tx],
-                      [0, scale, ty]], dtype=np.float32)
+
+        return np.array([[scale, 0, tx],
+                         [0, scale, ty]], dtype=np.float32)
+
+    def apply_blur(self, image, progress):
+        """
+        progress: 0.0 (開始) -> 1.0 (クリア)
+        """
+        if image is None:
+            return None
+        if self._plane_processor is not None:
+            return self._per_plane("apply_blur_batch", image, [progress])[0]
+
+        sigma, ksize = self.tables["blur"].blur(progress)
+
+        if sigma <= 0.1:  # ほぼ0なら処理しない
+            return image.copy()
+
+        return self.blur(image, sigma, ksize)
+
+    def apply_zoom(self, image, progress):
+        """
+        progress: 0.0 (開始) -> 1.0 (クリア)
+        アフィン変換を使用してサブピクセル精度で滑らかにズームアウト
+        """
+        if image is None:
+            return None
+        if self._plane_processor is not None:
+            return self._per_plane("apply_zoom_batch", image, [progress])[0]
+
+        height, width = image.shape[:2]
+        M = self.zoom_matrix(width, height, progress)
 
         # アフィン変換を適用（サブピクセル精度で滑らかに処理）
-        result = cv2.warpAffine(
-            image, 
-            M, 
-            (width, height), 
+        return self.warp_affine(image, M)
+
+    def warp_affine(self, image, M, dst=None):
+        """
+        ズーム用のアフィン変換を適用
+
+        warpAffineは出力の絶対座標から参照位置を計算するため、横帯に分割すると丸めが変わり
+        出力が一致しなくなる。OpenCV内部の並列化（cv2.setNumThreads）に任せ、タイル処理はしない
+
+        Args:
+            image: 入力画像
+            M: 2x3のアフィン変換行列
+            dst: 書き込み先（Noneの場合は新規作成）
+
+        Returns:
+            変換後の画像
+        """
+        height, width = image.shape[:2]
+        # 4チャンネル（rgb32）のアルファは不透明のまま保つ（QImage.Format_RGB32は0xffを前提とする）
+        border = (0, 0, 0, 255) if image.ndim == 3 and image.shape[2] == 4 else (0, 0, 0)
+        return cv2.warpAffine(
+            image,
+            M,
+            (width, height),
+            dst=dst,
             flags=cv2.INTER_CUBIC,  # より滑らかな補間
             borderMode=cv2.BORDER_CONSTANT,
-            borderValue=(0, 0, 0)  # はみ出した部分は黒で塗りつぶし
+            borderValue=border  # はみ出した部分は黒で塗りつぶし
         )
-        
-        return result
 
     def apply_hybrid(self, image, progress):
         # ズームとぼかしを組み合わせる
-        # 例: ズームは線形に，ぼかしは後半早めに消えるように調整
-        zoomed = self.apply_zoom(image, progress)
+        # 既定ではズームは線形に，ぼかしは後半早めに消える (progress 0.8でぼかしゼロ)
+        if image is None:
+            return None
+        if self._plane_processor is not None:
+            return self._per_plane("apply_hybrid_batch", image, [progress])[0]
+        height, width = image.shape[:2]
+        zoomed = self.warp_affine(image, self.zoom_matrix(width, height, progress, "hybrid"))
+
+        sigma, ksize = self.tables["hybrid"].blur(progress)
+        if sigma <= 0.1:
+            return zoomed
+        return self.blur(zoomed, sigma, ksize, dst=zoomed)
+
+    # ------------------------------------------------------------------
+    # バッチAPI: 複数の進行度を1回の呼び出しで処理
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def prepare_batch_output(image, count, out):
+        """出力先の配列を用意（指定された場合は形状を検証）"""
+        shape = (count,) + image.shape
+        if out is None:
+            return np.empty(shape, dtype=image.dtype)
+        if out.shape != shape or out.dtype != image.dtype:
+            raise ValueError(f"出力配列の形状が一致しません: {out.shape} != {shape}")
+        return out
+
+    def _pyramid_levels(self, sigma):
+        """sigmaに対して縮小できる段数"""
+        levels = 0
+        while sigma / (2 ** (levels + 1)) >= self.PYRAMID_MIN_SIGMA:
+            levels += 1
+        return levels
+
+    def _build_pyramid(self, image, levels):
+        """縮小ピラミッド（pyrDownの繰り返し）を作成"""
+        pyramid = [image]
+        for _ in range(levels):
+            pyramid.append(cv2.pyrDown(pyramid[-1]))
+        return pyramid
+
+    def _blur_into(self, src, dst, sigma, ksize, pyramid=None):
+        """
+        src をぼかして dst に書き込む
+
+        pyramidを指定した場合、sigmaが大きいフレームは縮小画像上でぼかしてから拡大する（近似）
+        """
+        if sigma <= 0.1:
+            dst[...] = src
+            return
+
+        level = 0
+        if pyramid is not None:
+            level = min(len(pyramid) - 1, self._pyramid_levels(sigma))
+        if level == 0:
+            self.blur(src, sigma, ksize, dst=dst)
+            return
+
+        # pyrDownの5タップフィルタ分（1段あたり約sigma=1.0）を差し引いて縮小画像上でぼかす
+        base = pyramid[level]
+        level_sigma = sigma / (2 ** level)
+        residual = max(0.5, (level_sigma ** 2 - 1.0) ** 0.5)
+        small = self.blur(base, residual, int(residual * 6) | 1)
+        height, width = dst.shape[:2]
+        cv2.resize(small, (width, height), dst=dst, interpolation=cv2.INTER_LINEAR)
+
+    def apply_blur_batch(self, image, progress_values, out=None, use_pyramid=False):
+        """
+        複数の進行度のぼかし画像をまとめて生成
+
+        Args:
+            image: 入力画像
+            progress_values: 進行度の配列
+            out: 書き込み先の配列 (len(progress_values), H, W, C)。Noneの場合は新規作成
+            use_pyramid: Trueの場合、sigmaが大きいフレームは共有の縮小ピラミッド上で処理する（近似）
+
+        Returns:
+            フレームを積み重ねた配列
+        """
+        if image is None:
+            return None
+        progress_values = np.asarray(progress_values, dtype=np.float64)
+        if self._plane_processor is not None:
+            return self._per_plane("apply_blur_batch", image, progress_values, out,
+                                   use_pyramid=use_pyramid)
+        out = self.prepare_batch_output(image, len(progress_values), out)
+
+        table = self.tables["blur"]
+        params = [table.blur(p) for p in progress_values]
+        pyramid = None
+        if use_pyramid and params:
+            # ピラミッドはバッチ内で1度だけ作成し、全フレームで共有する
+            levels = self._pyramid_levels(max(sigma for sigma, _ in params))
+            pyramid = self._build_pyramid(image, levels)
+
+        # 同じパラメータのフレームは1度だけ処理してコピーする
+        done = {}
+        for i, (sigma, ksize) in enumerate(params):
+            key = (sigma, ksize) if sigma > 0.1 else None
+            if key in done:
+                out[i] = out[done[key]]
+                continue
+            self._blur_into(image, out[i], sigma, ksize, pyramid)
+            done[key] = i
+        return out
+
+    def apply_zoom_batch(self, image, progress_values, out=None, mode="zoom"):
+        """
+        複数の進行度のズーム画像をまとめて生成
+
+        Args:
+            image: 入力画像
+            progress_values: 進行度の配列
+            out: 書き込み先の配列 (len(progress_values), H, W, C)。Noneの場合は新規作成
+            mode: 拡大率を参照するテーブル ('zoom', 'hybrid')
+
+        Returns:
+            フレームを積み重ねた配列
+        """
+        if image is None:
+            return None
+        progress_values = np.asarray(progress_values, dtype=np.float64)
+        if self._plane_processor is not None:
+            return self._per_plane("apply_zoom_batch", image, progress_values, out, mode=mode)
+        out = self.prepare_batch_output(image, len(progress_values), out)
+        height, width = image.shape[:2]
+
+        for i, progress in enumerate(progress_values):
+            self.warp_affine(image, self.zoom_matrix(width, height, progress, mode), out[i])
+        return out
+
+    def apply_hybrid_batch(self, image, progress_values, out=None, use_pyramid=False):
+        """
+        複数の進行度のハイブリッド画像をまとめて生成
+
+        ズーム結果を出力配列に書き込み、その場でぼかす（中間バッファを確保しない）
+
+        Args:
+            image: 入力画像
+            progress_values: 進行度の配列
+            out: 書き込み先の配列 (len(progress_values), H, W, C)。Noneの場合は新規作成
+            use_pyramid: apply_blur_batchと同様（ズーム後の各フレームごとにピラミッドを作る）
+
+        Returns:
+            フレームを積み重ねた配列
+        """
+        if image is None:
+            return None
+        progress_values = np.asarray(progress_values, dtype=np.float64)
+        if self._plane_processor is not None:
+            return self._per_plane("apply_hybrid_batch", image, progress_values, out,
+                                   use_pyramid=use_pyramid)
+        out = self.apply_zoom_batch(image, progress_values, out, mode="hybrid")
+
+        table = self.tables["hybrid"]
+        for i, progress in enumerate(progress_values):
+            sigma, ksize = table.blur(progress)
+            if sigma <= 0.1:
+                continue
+            pyramid = None
+            if use_pyramid:
+                pyramid = self._build_pyramid(out[i], self._pyramid_levels(sigma))
+            self._blur_into(out[i], out[i], sigma, ksize, pyramid)
+        return out
+
+    # ------------------------------------------------------------------
+    # モザイク・タイル表示・ノイズ（1フレーム・バッチの両方）
+    # ------------------------------------------------------------------
+
+    def pixel_block(self, progress):
+        """進行度に対応するモザイクのブロックサイズ（1の場合はモザイクなし）"""
+        strength = self.tables["pixelate"].effect_strength(progress)
+        return 1 + int(strength * (self.MAX_PIXEL_BLOCK - 1) + 0.5)
+
+    def _pixelate_into(self, image, block, dst=None):
+        """縮小（面積平均）と最近傍補間の拡大でモザイクをかける（ブロックサイズによらずコスト一定）"""
+        height, width = image.shape[:2]
+        small = cv2.resize(image, (max(1, -(-width // block)), max(1, -(-height // block))),
+                           interpolation=cv2.INTER_AREA)
+        return cv2.resize(small, (width, height), dst=dst, interpolation=cv2.INTER_NEAREST)
+
+    def apply_pixelate(self, image, progress):
+        """
+        progress: 0.0 (開始) -> 1.0 (クリア)
+        ブロックサイズが小さくなっていくモザイク
+        """
+        if image is None:
+            return None
+        if self._plane_processor is not None:
+            return self._per_plane("apply_pixelate_batch", image, [progress])[0]
+        block = self.pixel_block(progress)
+        if block <= 1:
+            return image.copy()
+        return self._pixelate_into(image, block)
+
+    def apply_pixelate_batch(self, image, progress_values, out=None):
+        """
+        複数の進行度のモザイク画像をまとめて生成（同じブロックサイズのフレームは1度だけ処理）
+
+        Returns:
+            フレームを積み重ねた配列
+        """
+        if image is None:
+            return None
+        progress_values = np.asarray(progress_values, dtype=np.float64)
+        if self._plane_processor is not None:
+            return self._per_plane("apply_pixelate_batch", image, progress_values, out)
+        out = self.prepare_batch_output(image, len(progress_values), out)
+
+        done = {}
+        for i, progress in enumerate(progress_values):
+            block = self.pixel_block(progress)
+            if block in done:
+                out[i] = out[done[block]]
+                continue
+            if block <= 1:
+                out[i] = image
+            else:
+                self._pixelate_into(image, block, out[i])
+            done[block] = i
+        return out
+
+    def _tile_grid(self, width, height):
+        """タイル表示モードのタイル数 (列数, 行数)"""
+        rows = max(1, round(self.REVEAL_TILES * height / width))
+        return self.REVEAL_TILES, rows
+
+    def revealed_tiles(self, progress, rows):
+        """進行度に対応する表示済みタイル数"""
+        total = self.REVEAL_TILES * rows
+        strength = self.tables["tiles"].effect_strength(progress)
+        return int((1.0 - strength) * total + 0.5)
+
+    def _image_state(self, kind, image, build):
+        """
+        画像ごとの事前計算結果を取得（直近EFFECT_STATE_SIZE件を保持）
+
+        キーは画素データのアドレス・形状（planarのチャンネルのように呼び出しごとに
+        別のビューが渡されても一致する）。画像の参照を保持するため、保持中に同じアドレスが
+        別の画像に再利用されることはない
+        """
+        key = (kind, image.__array_interface__["data"][0], image.shape, image.strides)
+        entry = self._effect_state.get(key)
+        if entry is not None:
+            self._effect_state.move_to_end(key)
+            return entry[1]
+        state = build(image)
+        self._effect_state[key] = (image, state)
+        while len(self._effect_state) > self.EFFECT_STATE_SIZE:
+            self._effect_state.popitem(last=False)
+        return state
+
+    def state_nbytes(self):
+        """画像ごとの事前計算結果のバイト数（保持している画像自体は含まない）"""
+        nbytes = sum(
+            getattr(value, "nbytes", 0)
+            for _, state in self._effect_state.values()
+            for value in (state if isinstance(state, tuple) else (state,))
+        )
+        if self._plane_processor is not None:
+            nbytes += self._plane_processor.state_nbytes()
+        return nbytes
+
+    def clear_state(self):
+        """
+        画像ごとの事前計算結果を破棄
+
+        事前計算結果は画像の参照を保持するため、画像を解放する場合はこれも破棄する必要がある
+        """
+        self._effect_state.clear()
+        if self._plane_processor is not None:
+            self._plane_processor.clear_state()
+
+    def _build_tile_state(self, image):
+        """
+        タイルの表示順マップとタイルごとの平均色の画像を作成
+
+        Returns:
+            (各画素のタイルの表示順 (H, W) uint16, 未表示タイル用の画像) のタプル
+        """
+        height, width = image.shape[:2]
+        cols, rows = self._tile_grid(width, height)
+        rng = np.random.default_rng(self.EFFECT_SEED)
+        order = rng.permutation(cols * rows).astype(np.uint16).reshape(rows, cols)
+        # 表示順と平均色は同じ最近傍補間で拡大し、タイルの境界を一致させる
+        rank_map = cv2.resize(order, (width, height), interpolation=cv2.INTER_NEAREST)
+        small = cv2.resize(image, (cols, rows), interpolation=cv2.INTER_AREA)
+        covered = cv2.resize(small, (width, height), interpolation=cv2.INTER_NEAREST)
+        return rank_map, covered
+
+    def _tiles_into(self, image, progress, dst):
+        """表示済みのタイルだけ元画像、それ以外はタイルの平均色を dst に書き込む"""
+        rank_map, covered = self._image_state("tiles", image, self._build_tile_state)
+        height, width = image.shape[:2]
+        count = self.revealed_tiles(progress, self._tile_grid(width, height)[1])
+        np.copyto(dst, covered)
+        if count > 0:
+            # 表示順がcount未満の画素をマスクにして元画像をコピー（1回の比較と1回のコピー）
+            mask = cv2.compare(rank_map, count, cv2.CMP_LT)
+            cv2.copyTo(image, mask, dst)
+        return dst
 
-        # ぼかし用の進行度を少し早める (例: progress 0.8でぼかしゼロ)
-        blur_progress = min(1.0, progress * 1.25)
-        return self.apply_blur(zoomed, blur_progress)
+    def apply_tiles(self, image, progress):
+        """
+        progress: 0.0 (開始) -> 1.0 (クリア)
+        画像をタイルに分け、決まった順番で1枚ずつ表示する（未表示のタイルは平均色）
+        """
+        if image is None:
+            return None
+        if self._plane_processor is not None:
+            return self._per_plane("apply_tiles_batch", image, [progress])[0]
+        return self._tiles_into(image, progress, np.empty_like(image))
+
+    def apply_tiles_batch(self, image, progress_values, out=None):
+        """
+        複数の進行度のタイル表示画像をまとめて生成（表示順マップは全フレームで共有）
+
+        Returns:
+            フレームを積み重ねた配列
+        """
+        if image is None:
+            return None
+        progress_values = np.asarray(progress_values, dtype=np.float64)
+        if self._plane_processor is not None:
+            return self._per_plane("apply_tiles_batch", image, progress_values, out)
+        out = self.prepare_batch_output(image, len(progress_values), out)
+        for i, progress in enumerate(progress_values):
+            self._tiles_into(image, progress, out[i])
+        return out
+
+    @classmethod
+    def noise_field(cls, shape, dtype):
+        """
+        画像サイズごとのノイズ画像を取得（一様乱数、キャッシュ）
+
+        4チャンネル（rgb32）のアルファは不透明にする
+        """
+        key = (tuple(shape), np.dtype(dtype).str)
+        with cls._kernel_lock:
+            field = cls._noise_cache.get(key)
+            if field is not None:
+                cls._noise_cache.move_to_end(key)
+                return field
+        rng = np.random.default_rng(cls.EFFECT_SEED)
+        field = rng.integers(0, 256, size=shape, dtype=np.uint8).astype(dtype, copy=False)
+        if len(shape) == 3 and shape[2] == 4:
+            field[..., 3] = 255
+        field.flags.writeable = False
+        with cls._kernel_lock:
+            cls._noise_cache[key] = field
+            while len(cls._noise_cache) > cls.NOISE_CACHE_SIZE:
+                cls._noise_cache.popitem(last=False)
+        return field
+
+    def _noise_into(self, image, progress, dst=None):
+        """元画像とノイズ画像を進行度に応じて合成（1回の加重和）"""
+        amount = self.tables["noise"].effect_strength(progress)
+        if amount <= 0.0:
+            if dst is None:
+                return image.copy()
+            dst[...] = image
+            return dst
+        noise = self.noise_field(image.shape, image.dtype)
+        return cv2.addWeighted(image, 1.0 - amount, noise, amount, 0.0, dst=dst)
+
+    def apply_noise(self, image, progress):
+        """
+        progress: 0.0 (開始) -> 1.0 (クリア)
+        ノイズに埋もれた画像が徐々に現れる
+        """
+        if image is None:
+            return None
+        if self._plane_processor is not None:
+            return self._per_plane("apply_noise_batch", image, [progress])[0]
+        return self._noise_into(image, progress)
+
+    def apply_noise_batch(self, image, progress_values, out=None):
+        """
+        複数の進行度のノイズ画像をまとめて生成（ノイズ画像は全フレームで共有）
+
+        Returns:
+            フレームを積み重ねた配列
+        """
+        if image is None:
+            return None
+        progress_values = np.asarray(progress_values, dtype=np.float64)
+        if self._plane_processor is not None:
+            return self._per_plane("apply_noise_batch", image, progress_values, out)
+        out = self.prepare_batch_output(image, len(progress_values), out)
+        for i, progress in enumerate(progress_values):
+            self._noise_into(image, progress, out[i])
+        return out
 
     def resize_image(self, image, target_width, target_height):
         """
@@ -112,6 +855,11 @@ class ImageProcessor:
         """
         if image is None:
             return None
+        if self._plane_processor is not None:
+            return np.stack([
+                self._plane_processor.resize_image(plane, target_width, target_height)
+                for plane in image
+            ])
 
         return cv2.resize(
             image, (target_width, target_height), interpolation=cv2.INTER_LINEAR
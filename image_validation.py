@@ -0,0 +1,275 @@
+"""
+ImageValidation - 画像ファイルの整合性チェックと隔離
+出題前に画像のヘッダー・寸法・末尾・デコードを並列に確認し、問題のある画像をデータセットインデックスで
+隔離（quarantine）する。DatasetLoaderは隔離された画像を出題しない
+（出題中にGameEngine.load_imageが失敗したり、巨大な画像のデコードで画面が止まったりしないようにする）
+
+確認内容（上から順に、最初に見つかった問題を理由として記録する）:
+    header     拡張子に対応する形式のヘッダーとして読めない（PNG / JPEG / GIF / BMP）
+    dimensions 幅・高さが0
+    too_large  画素数が上限（MAX_PIXELS、環境変数 VGI_MAX_IMAGE_PIXELS）を超える（デコードしない）
+    truncated  ファイルの末尾が途切れている（PNGのIEND・JPEGのEOIがない）
+    decode     cv2.imreadで読み込めない
+    mismatch   デコードした寸法がヘッダーと異なる
+
+labels.jsonにエントリがない画像は "labeled": false として記録する（隔離はしない）
+
+結果はデータセットインデックスの "validation" に保存し、サイズ・更新時刻が変わっていない画像は再確認しない:
+    {"status": "ok" | "quarantined", "reason": null | "header" | ..., "detail": "...",
+     "format": "jpeg", "width": 640, "height": 480, "stamp": [サイズ, 更新時刻], "labeled": true}
+
+使い方:
+    python image_validation.py
+    python image_validation.py --images-dir images --index dataset_index.json --workers 8 --max-pixels 40000000
+"""
+
+import argparse
+import os
+import struct
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from dataset_index import DatasetIndex, file_stamp
+from lazy_import import lazy_import
+
+cv2 = lazy_import("cv2")
+
+
+MAX_PIXELS = int(os.environ.get("VGI_MAX_IMAGE_PIXELS") or 40_000_000)
+EXTENSION_FORMATS = {
+    ".png": "png",
+    ".jpg": "jpeg",
+    ".jpeg": "jpeg",
+    ".gif": "gif",
+    ".bmp": "bmp",
+}
+# JPEGのSOFマーカー（DHT・JPG・DACを除くC0-CF）
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+class ValidationError(Exception):
+    """画像の検証エラー（reasonは隔離の理由）"""
+
+    def __init__(self, reason, detail):
+        super().__init__(detail)
+        self.reason = reason
+
+
+def _read_jpeg_size(f):
+    """JPEGのマーカーを順に読み、SOFの寸法を取得"""
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        while byte == b"\xff":
+            marker = f.read(1)
+            if marker != b"\xff":
+                break
+        else:
+            raise ValidationError("header", "JPEGのマーカーが見つかりません")
+        if not marker:
+            raise ValidationError("header", "JPEGのSOFが見つかりません")
+        code = marker[0]
+        if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:
+            continue
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            raise ValidationError("header", "JPEGのSOFが見つかりません")
+        length = struct.unpack(">H", length_bytes)[0]
+        if code in _JPEG_SOF:
+            data = f.read(5)
+            if len(data) < 5:
+                raise ValidationError("header", "JPEGのSOFが途切れています")
+            height, width = struct.unpack(">HH", data[1:5])
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def read_header(image_path):
+    """
+    画像をデコードせずにヘッダーから形式と寸法を取得
+
+    Returns:
+        (形式, 幅, 高さ) のタプル
+
+    Raises:
+        ValidationError: 拡張子に対応する形式として読めない場合
+    """
+    expected = EXTENSION_FORMATS.get(os.path.splitext(image_path)[1].lower())
+    with open(image_path, "rb") as f:
+        head = f.read(32)
+        if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+            fmt = "png"
+            width, height = struct.unpack(">II", head[16:24])
+        elif head.startswith(b"\xff\xd8"):
+            fmt = "jpeg"
+            width, height = _read_jpeg_size(f)
+        elif head[:6] in (b"GIF87a", b"GIF89a"):
+            fmt = "gif"
+            width, height = struct.unpack("<HH", head[6:10])
+        elif head.startswith(b"BM") and len(head) >= 26:
+            fmt = "bmp"
+            width, height = struct.unpack("<ii", head[18:26])
+            width, height = abs(width), abs(height)
+        else:
+            raise ValidationError("header", "対応する画像形式のヘッダーではありません")
+    if expected is not None and fmt != expected:
+        raise ValidationError("header", f"拡張子と形式が一致しません（{fmt}）")
+    return fmt, width, height
+
+
+def is_truncated(image_path, fmt):
+    """ファイルの末尾が途切れているか（PNGとJPEGのみ確認）"""
+    size = os.path.getsize(image_path)
+    with open(image_path, "rb") as f:
+        f.seek(max(0, size - 64))
+        tail = f.read()
+    if fmt == "png":
+        return b"IEND" not in tail
+    if fmt == "jpeg":
+        # EOIの後に余分なデータが付いたファイルもあるため、末尾付近にあればよい
+        return b"\xff\xd9" not in tail
+    return False
+
+
+def validate_image(image_path, max_pixels=MAX_PIXELS, decode=True):
+    """
+    1枚の画像を検証
+
+    Args:
+        image_path: 画像ファイルのパス
+        max_pixels: 画素数の上限
+        decode: Falseの場合はデコードせずヘッダーと末尾のみ確認する
+
+    Returns:
+        検証結果の辞書（モジュールの説明を参照。labeledは含まない）
+    """
+    result = {"status": "ok", "reason": None, "detail": None, "format": None,
+              "width": None, "height": None}
+    try:
+        result["stamp"] = file_stamp(image_path)
+        fmt, width, height = read_header(image_path)
+        result.update(format=fmt, width=width, height=height)
+        if width <= 0 or height <= 0:
+            raise ValidationError("dimensions", f"寸法が不正です: {width}x{height}")
+        if width * height > max_pixels:
+            raise ValidationError("too_large", f"画素数が上限を超えています: {width}x{height}")
+        if is_truncated(image_path, fmt):
+            raise ValidationError("truncated", "ファイルの末尾が途切れています")
+        if decode:
+            image = cv2.imread(image_path)
+            if image is None:
+                raise ValidationError("decode", "cv2.imreadで読み込めません")
+            decoded = (image.shape[1], image.shape[0])
+            # EXIFの回転情報で縦横が入れ替わる場合がある
+            if decoded not in ((width, height), (height, width)):
+                raise ValidationError("mismatch", f"デコード後の寸法がヘッダーと異なります: "
+                                                  f"{decoded[0]}x{decoded[1]}")
+    except ValidationError as e:
+        result.update(status="quarantined", reason=e.reason, detail=str(e))
+    except (OSError, struct.error) as e:
+        result.update(status="quarantined", reason="header", detail=str(e))
+    return result
+
+
+def needs_validation(entry, image_path, max_pixels):
+    """
+    インデックスの検証結果が古いか
+
+    Args:
+        entry: インデックスの "validation"（Noneの場合は未検証）
+    """
+    if not entry:
+        return True
+    try:
+        if entry.get("stamp") != file_stamp(image_path):
+            return True
+    except OSError:
+        return True
+    # 上限を変更した場合は、上限の判定が変わる画像のみ再確認する
+    pixels = (entry.get("width") or 0) * (entry.get("height") or 0)
+    if entry.get("reason") == "too_large":
+        return pixels <= max_pixels
+    return entry.get("status") == "ok" and pixels > max_pixels
+
+
+def validate_images(image_paths, index=None, label_loader=None, max_pixels=MAX_PIXELS, workers=4,
+                    revalidate=False):
+    """
+    複数の画像を並列に検証し、結果をインデックスに記録
+
+    デコード（cv2.imread）はGILを解放するため、スレッドで並列化する
+
+    Args:
+        image_paths: 画像ファイルパスのリスト
+        index: 結果を記録するDatasetIndex（Noneの場合は記録しない）
+        label_loader: ラベルの有無を記録するLabelLoader（オプション）
+        max_pixels: 画素数の上限
+        workers: 並列に検証するスレッド数
+        revalidate: Trueの場合は記録済みの結果を使わない
+
+    Returns:
+        ({画像パス: 検証結果}, 新たに検証した画像数) のタプル
+    """
+    results = {}
+    todo = []
+    for path in image_paths:
+        entry = index.get_validation(path) if index is not None else None
+        if revalidate or needs_validation(entry, path, max_pixels):
+            todo.append(path)
+        else:
+            results[path] = dict(entry)
+
+    if workers > 1 and len(todo) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            checked = list(executor.map(lambda p: validate_image(p, max_pixels), todo))
+    else:
+        checked = [validate_image(path, max_pixels) for path in todo]
+    results.update(zip(todo, checked))
+
+    for path, result in results.items():
+        if label_loader is not None:
+            result["labeled"] = label_loader.has_label(path)
+        if index is not None:
+            index.update(path, validation=result)
+    return results, len(todo)
+
+
+def main(argv=None):
+    """メイン関数"""
+    from dataset_loader import DatasetLoader
+    from label_loader import LabelLoader
+
+    parser = argparse.ArgumentParser(description="画像ファイルの整合性チェックと隔離")
+    parser.add_argument("--images-dir", default="images")
+    parser.add_argument("--labels", default="labels.json")
+    parser.add_argument("--index", default="dataset_index.json", help="結果を記録するデータセットインデックス")
+    parser.add_argument("--max-pixels", type=int, default=MAX_PIXELS, help="画素数の上限")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--revalidate", action="store_true", help="記録済みの結果を使わずにすべて検証する")
+    args = parser.parse_args(argv)
+
+    # DatasetLoaderの検証は使わず、拡張子で列挙したすべての画像を対象にする
+    image_paths = DatasetLoader(args.images_dir).scan_image_files()
+    if not image_paths:
+        print(f"画像が見つかりません: {args.images_dir}")
+        return 1
+
+    index = DatasetIndex(args.index)
+    results, checked = validate_images(
+        image_paths, index, LabelLoader(args.labels), args.max_pixels, args.workers, args.revalidate
+    )
+    index.save()
+
+    quarantined = {p: r for p, r in results.items() if r["status"] != "ok"}
+    unlabeled = [p for p, r in results.items() if r["status"] == "ok" and not r.get("labeled", True)]
+    for path, r in sorted(quarantined.items()):
+        print(f"隔離: {os.path.basename(path)}  [{r['reason']}] {r['detail']}")
+    for path in sorted(unlabeled):
+        print(f"ラベルなし: {os.path.basename(path)}")
+    print(f"{len(results)} 枚（新たに検証 {checked} 枚）: 正常 {len(results) - len(quarantined)} / "
+          f"隔離 {len(quarantined)} / ラベルなし {len(unlabeled)}: {args.index}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+"""
+LazyImport - 遅延インポートユーティリティ
+cv2やnumpyなど読み込みに時間がかかるモジュールを、最初に属性へアクセスした時点で読み込む
+"""
+
+import importlib
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """最初の属性アクセス時に実体を読み込むモジュールのプロキシ"""
+
+    def __getattr__(self, attr):
+        # 通常の属性探索で見つからない場合のみ呼ばれる
+        # 読み込み後は実体の属性を自身にコピーするため、以降はこのメソッドを経由しない
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+def lazy_import(name):
+    """
+    モジュールを遅延インポート
+
+    Args:
+        name: モジュール名（例: 'cv2'）
+
+    Returns:
+        既に読み込み済みなら実体、未読み込みならLazyModule
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
+
+
+def preload(*names):
+    """
+    モジュールを明示的に読み込む（バックグラウンド初期化用）
+
+    Args:
+        names: モジュール名
+    """
+    for name in names:
+        importlib.import_module(name)
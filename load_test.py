@@ -0,0 +1,171 @@
+"""
+LoadTest - ゲームサーバーの負荷試験ハーネス
+localhostのgame_serverに多数のWebSocketクライアントを同時接続し、
+フレーム受信間隔・初回フレームまでの時間・受信量を集計する
+
+使い方:
+    python load_test.py --clients 200 --spawn-server
+    python load_test.py --clients 100 --port 8765     # 起動済みのサーバーに接続
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import ws_protocol
+
+
+async def run_client(host, port, mode, questions, answer_after, results):
+    """
+    1クライアント分のプレイを再現
+
+    各問題でanswer_after秒間フレームを受信してから回答し、次の問題へ進む
+    """
+    stats = {"frames": 0, "bytes": 0, "intervals": [], "first_frame": [], "error": None}
+    try:
+        reader, writer = await ws_protocol.client_connect(host, port)
+    except (OSError, ConnectionError) as e:
+        stats["error"] = str(e)
+        results.append(stats)
+        return
+
+    async def send(data):
+        await ws_protocol.write_message(writer, json.dumps(data), mask=True)
+
+    try:
+        await send({"type": "start", "mode": mode, "questions": questions})
+        question_start = None
+        last_frame = None
+        while True:
+            timeout = None
+            if question_start is not None:
+                timeout = max(0.0, answer_after - (time.perf_counter() - question_start))
+            try:
+                message = await asyncio.wait_for(
+                    ws_protocol.read_message(reader, writer, mask_replies=True), timeout
+                )
+            except asyncio.TimeoutError:
+                question_start = None
+                await send({"type": "answer", "text": "load-test"})
+                continue
+
+            now = time.perf_counter()
+            if isinstance(message, bytes):
+                stats["frames"] += 1
+                stats["bytes"] += len(message)
+                if last_frame is None:
+                    stats["first_frame"].append(now - question_start if question_start else 0.0)
+                else:
+                    stats["intervals"].append(now - last_frame)
+                last_frame = now
+                continue
+
+            data = json.loads(message)
+            if data["type"] == "question":
+                question_start = now
+                last_frame = None
+            elif data["type"] == "result" and not data["finished"]:
+                await send({"type": "next"})
+            elif data["type"] == "session_end":
+                break
+            elif data["type"] == "error":
+                stats["error"] = data.get("message")
+                break
+    except ws_protocol.WebSocketClosed as e:
+        stats["error"] = str(e)
+    finally:
+        await ws_protocol.close(writer, mask=True)
+        results.append(stats)
+
+
+def percentile(values, q):
+    """パーセンタイル値"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * (len(ordered) - 1) + 0.5))]
+
+
+def summarize(results, wall_seconds):
+    """全クライアントの結果を集計"""
+    intervals = [v for r in results for v in r["intervals"]]
+    first = [v for r in results for v in r["first_frame"]]
+    frames = sum(r["frames"] for r in results)
+    return {
+        "clients": len(results),
+        "errors": sum(1 for r in results if r["error"]),
+        "frames": frames,
+        "bytes": sum(r["bytes"] for r in results),
+        "wall_seconds": wall_seconds,
+        "frames_per_second": frames / wall_seconds if wall_seconds > 0 else 0.0,
+        "interval_p50_ms": percentile(intervals, 50) * 1000,
+        "interval_p95_ms": percentile(intervals, 95) * 1000,
+        "interval_p99_ms": percentile(intervals, 99) * 1000,
+        "first_frame_p50_ms": percentile(first, 50) * 1000,
+        "first_frame_p95_ms": percentile(first, 95) * 1000,
+    }
+
+
+async def run_load_test(args):
+    """負荷試験を実行"""
+    server = None
+    host, port = args.host, args.port
+    if args.spawn_server:
+        from game_server import GameServer
+
+        server = GameServer(
+            host=host, port=0, workers=args.workers, codec=args.codec,
+            quality_ladder=args.quality, max_side=args.max_side,
+        )
+        await server.start()
+        port = server.port
+
+    results = []
+    start = time.perf_counter()
+    tasks = []
+    for i in range(args.clients):
+        tasks.append(asyncio.create_task(run_client(
+            host, port, args.mode, args.questions, args.answer_after, results
+        )))
+        if args.ramp > 0:
+            await asyncio.sleep(args.ramp / args.clients)
+    await asyncio.gather(*tasks)
+    wall = time.perf_counter() - start
+
+    summary = summarize(results, wall)
+    if server is not None:
+        summary["server"] = server.get_health()
+        await server.stop()
+    return summary
+
+
+def main(argv=None):
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="ゲームサーバーの負荷試験")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--spawn-server", action="store_true", help="同一プロセスでサーバーを起動")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--mode", default="blur")
+    parser.add_argument("--questions", type=int, default=2)
+    parser.add_argument("--answer-after", type=float, default=3.0, help="回答までの秒数")
+    parser.add_argument("--ramp", type=float, default=1.0, help="全クライアント接続までの秒数")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--codec", default="jpeg")
+    parser.add_argument("--quality", default="0:40,0.5:60,0.8:75,0.95:90")
+    parser.add_argument("--max-side", type=int, default=640)
+    parser.add_argument("--output", help="集計結果のJSON出力先")
+    args = parser.parse_args(argv)
+
+    summary = asyncio.run(run_load_test(args))
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -18,16 +18,30 @@ from PyQt5.QtWidgets import (
     QStackedWidget,
     QRadioButton,
     QButtonGroup,
+    QShortcut,
 )
 from PyQt5.QtCore import Qt, QTimer, pyqtSignal
-from PyQt5.QtGui import QPixmap, QImage, QFont
+from PyQt5.QtGui import QPixmap, QImage, QFont, QKeySequence
 import os
+import threading
+import time
 
 from game_engine import GameEngine
+from effect_modes import available_modes
 from timer_controller import TimerController
 from dataset_loader import DatasetLoader
 from progress_bar import ProgressBar
 from label_loader import LabelLoader
+from dataset_index import DatasetIndex
+from frame_profiler import FrameProfiler
+from widget_updater import WidgetUpdater
+from session_log import SessionEventLog, default_log_path
+from lazy_import import preload
+from runtime_config import RuntimeConfig
+from memory_budget import create_budget
+from memory_monitor import MemoryMonitor
+import pixel_layout
+from effect_sequence import find_sequence
 
 
 class HomeScreen(QWidget):
@@ -157,18 +171,15 @@ class GameSetupScreen(QWidget):
         mode_button_layout.setSpacing(30)
         
         self.mode_buttons = {}
-        modes = [
-            ("blur", "Blur"),
-            ("zoom", "Zoom"),
-            ("hybrid", "Hybrid")
-        ]
+        # モードはレジストリに登録された順に並べる
+        modes = [(mode.name, mode.label) for mode in available_modes()]
         
         # 中央揃えのため、最初にストレッチを追加
         mode_button_layout.addStretch()
         
         for mode_key, mode_name in modes:
             btn = QPushButton(f"{mode_name}\nモード")
-            btn.setMinimumSize(200, 100)
+            btn.setMinimumSize(160, 100)
             btn.setCheckable(True)
             btn_font = QFont()
             btn_font.setPointSize(16)
@@ -420,15 +431,19 @@ class GameScreen(QWidget):
     
     back_to_home_signal = pyqtSignal()
     session_complete_signal = pyqtSignal(dict)  # セッション結果を送信
+
+    # 前回描画したフレームからの見た目の変化（画素数の推定値）がこの値未満なら描画を省略
+    INCREMENTAL_THRESHOLD = 0.5
     
     def __init__(self):
         super().__init__()
         # ゲーム関連のインスタンス
         self.game_engine = None
         self.timer_controller = TimerController()
-        self.dataset_loader = DatasetLoader()
-        self.progress_bar = ProgressBar()
-        self.label_loader = LabelLoader()
+        self.frame_profiler = FrameProfiler(tick_interval=0.1)
+        # ティックごとのラベル・プログレスバー更新は値が変わった場合のみ反映する
+        self.widget_updater = WidgetUpdater(self.frame_profiler)
+        self.progress_bar = ProgressBar(updater=self.widget_updater)
 
         # UIコンポーネント
         self.image_label = None
@@ -452,9 +467,76 @@ class GameScreen(QWidget):
         self.session_is_active = False  # セッションが有効か
         self.session_used_images = set()  # セッション中に使用した画像のパスを記録
         self.hint_mode = "halfway"  # ヒント表示モード ("always", "halfway", "none")
+        self.session_id = 0  # セッションログ用のID（セッション外は0）
+
+        # 1問ごとの回答結果を追記するログ（VGI_SESSION_LOG が空文字の場合は記録しない）
+        log_path = default_log_path()
+        self.session_log = SessionEventLog(log_path) if log_path else None
+
+        # データセットとラベルはホーム画面表示後にバックグラウンドで準備する
+        self._dataset_loader = None
+        self._label_loader = None
+        self._dataset_index = None
+        self._resource_lock = threading.Lock()
+        self._background_init = None
+        self._displayed_image = None  # 最後に表示したフレーム（同じなら再描画を省略）
+        # cv2は読み込まずに設定だけ決めておく（適用はバックグラウンド初期化で行う）
+        self.runtime_config = RuntimeConfig.for_mode("kiosk")
+        # デコード済み画像・シーケンスの合計を端末のメモリに合わせて制限する
+        self.memory_budget = create_budget(self.runtime_config.memory_budget, self.runtime_config.min_available)
 
         self.init_ui()
 
+    def start_background_init(self):
+        """cv2/numpyの読み込みとデータセット走査・ラベル解析をバックグラウンドで開始"""
+        if self._background_init is not None:
+            return
+        self._background_init = threading.Thread(
+            target=self._initialize_resources, name="resource-init", daemon=True
+        )
+        self._background_init.start()
+
+    def _initialize_resources(self):
+        """重いリソースを準備（バックグラウンドスレッドで実行）"""
+        preload("numpy", "cv2")
+        # キオスクは1セッションのみなので、OpenCV内部のスレッドに全コアを使わせる
+        self.runtime_config.apply()
+        self._ensure_loaders()
+
+    def _ensure_loaders(self):
+        """DatasetLoader・LabelLoader・DatasetIndexを未作成なら作成"""
+        with self._resource_lock:
+            if self._label_loader is None:
+                self._label_loader = LabelLoader()
+            if self._dataset_index is None:
+                self._dataset_index = DatasetIndex()
+            if self._dataset_loader is None:
+                # 壊れた画像・巨大な画像は出題中に読み込みで止まらないよう、ここで隔離しておく
+                self._dataset_loader = DatasetLoader(
+                    validate=True, dataset_index=self._dataset_index, label_loader=self._label_loader
+                )
+
+    @property
+    def dataset_loader(self):
+        """データセットローダー（初回アクセス時に作成）"""
+        if self._dataset_loader is None:
+            self._ensure_loaders()
+        return self._dataset_loader
+
+    @property
+    def label_loader(self):
+        """ラベルローダー（初回アクセス時に作成）"""
+        if self._label_loader is None:
+            self._ensure_loaders()
+        return self._label_loader
+
+    @property
+    def dataset_index(self):
+        """難易度の較正結果を持つデータセットインデックス（初回アクセス時に作成）"""
+        if self._dataset_index is None:
+            self._ensure_loaders()
+        return self._dataset_index
+
     def init_ui(self):
         main_layout = QVBoxLayout()
         
@@ -523,6 +605,17 @@ class GameScreen(QWidget):
         )
         self.image_label.setText("画像がここに表示されます")
 
+        # フレーム計測オーバーレイ（F3で表示切替、F4でJSON出力）
+        self.frame_overlay_label = QLabel(self.image_label)
+        self.frame_overlay_label.setStyleSheet(
+            "color: #fff; background-color: rgba(0, 0, 0, 160); "
+            "font-family: monospace; font-size: 11px; padding: 4px;"
+        )
+        self.frame_overlay_label.move(6, 6)
+        self.frame_overlay_label.setVisible(False)
+        QShortcut(QKeySequence("F3"), self, self.toggle_frame_overlay)
+        QShortcut(QKeySequence("F4"), self, self.export_frame_stats)
+
         # 回答入力エリア
         answer_layout = QHBoxLayout()
         answer_label = QLabel("回答入力：")
@@ -570,6 +663,7 @@ class GameScreen(QWidget):
         self.session_correct_count = 0
         self.session_is_active = True
         self.session_used_images = set()  # 出題済み画像をリセット
+        self.session_id = int(time.time())
         
         # UI更新
         self.question_counter_label.setText(f"問題：1/{question_count}")
@@ -609,24 +703,50 @@ class GameScreen(QWidget):
 
         if file_path:
             # ゲームエンジンの初期化
-            self.game_engine = GameEngine(file_path, self.current_mode, label_loader=self.label_loader)
+            self.game_engine = self.create_game_engine(file_path)
             self.timer_controller.start()
             self.update_display()
             self.update_timer.start(100)  # 100msごとに更新
 
+    def create_game_engine(self, image_path):
+        """
+        ゲームエンジンを作成
+
+        sequencesフォルダに事前レンダリング済みのシーケンスがあれば、描画せずに再生する
+        """
+        sequence = find_sequence(image_path, self.current_mode)
+        # シーケンスはRGBで保存されているため、再生時はRGBレイアウトにする
+        layout = "rgb" if sequence is not None else self.runtime_config.layout
+        self._displayed_image = None
+        if self.memory_budget is not None:
+            # 問題の切り替え時に空きメモリを確認し、不足していれば古い画像を解放する
+            self.memory_budget.relieve_pressure()
+        return GameEngine(
+            image_path, self.current_mode, label_loader=self.label_loader, sequence=sequence,
+            layout=layout, incremental_threshold=self.INCREMENTAL_THRESHOLD,
+            dataset_index=self.dataset_index, memory_budget=self.memory_budget,
+        )
+
     def update_display(self):
         """画面の更新"""
         if not self.game_engine:
             return
 
+        profiler = self.frame_profiler
+        profiler.begin_frame()
+
         # タイマー更新
         elapsed = self.timer_controller.get_elapsed_time()
-        self.time_label.setText(f"経過時間：{elapsed:.1f}s")
+        self.widget_updater.set_text(self.time_label, f"経過時間：{elapsed:.1f}s")
 
-        # 画像表示
+        # 画像表示（前回と同じフレームオブジェクトなら再描画しない）
         processed_image = self.game_engine.get_processed_image(elapsed)
-        if processed_image is not None:
+        profiler.mark("process")
+        if processed_image is not None and processed_image is not self._displayed_image:
             self.display_image(processed_image)
+            self._displayed_image = processed_image
+        else:
+            profiler.count("repaint_skipped")
 
         # 進行度表示
         time_limit = self.game_engine.time_limit
@@ -640,17 +760,43 @@ class GameScreen(QWidget):
         
         # ヒント表示を更新（進行度50%を超えた場合のみ表示）
         self.update_hint_display(progress)
+        profiler.mark("widget")
+        profiler.end_frame()
+
+        # オーバーレイは表示中のみ、10フレームごとに更新
+        if self.frame_overlay_label.isVisible() and profiler.frame_count % 10 == 0:
+            self.refresh_frame_overlay()
+
+    def toggle_frame_overlay(self):
+        """フレーム計測オーバーレイの表示を切り替える"""
+        visible = not self.frame_overlay_label.isVisible()
+        self.frame_overlay_label.setVisible(visible)
+        if visible:
+            self.refresh_frame_overlay()
+
+    def refresh_frame_overlay(self):
+        """フレーム計測オーバーレイの内容を更新"""
+        self.frame_overlay_label.setText(self.frame_profiler.format_overlay())
+        self.frame_overlay_label.adjustSize()
+        self.frame_overlay_label.raise_()
+
+    def export_frame_stats(self):
+        """フレーム計測結果をJSONファイルに書き出す"""
+        path = f"frame_stats_{time.strftime('%Y%m%d_%H%M%S')}.json"
+        self.frame_profiler.export_json(path, include_frames=True)
+        QMessageBox.information(self, "フレーム計測", f"計測結果を保存しました:\n{path}")
     
     def update_hint_display(self, progress=0.0):
         """
         ヒント情報を表示（設定に応じて表示タイミングを制御）
+        毎ティック呼ばれるため、テキストが変わった場合のみラベルを更新する
         
         Args:
             progress: 進行度（0.0-1.0）
         """
         if not self.game_engine:
-            self.category_label.setText("")
-            self.hint_label.setText("")
+            self.widget_updater.set_text(self.category_label, "")
+            self.widget_updater.set_text(self.hint_label, "")
             return
             
         # ヒント表示判定
@@ -668,41 +814,44 @@ class GameScreen(QWidget):
             hint = self.game_engine.get_hint()
             
             if category:
-                self.category_label.setText(f"カテゴリ: {category}")
+                self.widget_updater.set_text(self.category_label, f"カテゴリ: {category}")
             else:
-                self.category_label.setText("")
+                self.widget_updater.set_text(self.category_label, "")
             
             if hint:
-                self.hint_label.setText(f"💡 {hint}")
+                self.widget_updater.set_text(self.hint_label, f"💡 {hint}")
             else:
-                self.hint_label.setText("")
+                self.widget_updater.set_text(self.hint_label, "")
         else:
             # ヒントを非表示
-            self.category_label.setText("")
-            self.hint_label.setText("")
+            self.widget_updater.set_text(self.category_label, "")
+            self.widget_updater.set_text(self.hint_label, "")
 
     def display_image(self, image):
         """画像を表示する"""
         if image is None:
             return
 
-        # 念のためメモリの連続性を確保
-        if not image.flags["C_CONTIGUOUS"]:
-            image = image.copy()
-
-        height, width, channel = image.shape
-        bytes_per_line = 3 * width
+        # レイアウトに対応するQImageのフォーマットでそのまま渡す（連続性も確保される）
+        layout = self.game_engine.layout if self.game_engine else "rgb"
+        image, bytes_per_line, image_format = pixel_layout.display_buffer(
+            image, layout, bgr888=hasattr(QImage, "Format_BGR888")
+        )
+        height, width = image.shape[:2]
 
         q_image = QImage(
-            image.data, width, height, bytes_per_line, QImage.Format_RGB888
+            image.data, width, height, bytes_per_line, getattr(QImage, image_format)
         )
 
         # QPixmapに変換して表示
         pixmap = QPixmap.fromImage(q_image)
+        self.frame_profiler.mark("convert")
         scaled_pixmap = pixmap.scaled(
             self.image_label.contentsRect().size(), Qt.KeepAspectRatio, Qt.SmoothTransformation
         )
+        self.frame_profiler.mark("scale")
         self.image_label.setPixmap(scaled_pixmap)
+        self.frame_profiler.mark("pixmap")
 
     def submit_answer(self):
         """回答を提出"""
@@ -721,6 +870,7 @@ class GameScreen(QWidget):
         # タイマー停止
         self.timer_controller.stop()
         self.update_timer.stop()
+        self.frame_profiler.pause()
 
         # 正答判定
         is_correct, correct_answer = self.game_engine.check_answer(answer)
@@ -729,6 +879,13 @@ class GameScreen(QWidget):
         if is_correct:
             score = self.game_engine.calculate_score(elapsed)
             self.session_correct_count += 1
+
+        if self.session_log is not None:
+            self.session_log.record(
+                self.game_engine.image_path, self.game_engine.mode, elapsed, answer, is_correct, score,
+                session_id=self.session_id if self.session_is_active else 0,
+                question=self.session_current_question if self.session_is_active else 0,
+            )
         
         # セッション中の処理
         if self.session_is_active:
@@ -791,6 +948,9 @@ class GameScreen(QWidget):
             'scores': self.session_scores
         }
         
+        if self.session_log is not None:
+            self.session_log.flush()
+
         # 結果画面へ遷移
         self.session_complete_signal.emit(session_stats)
     
@@ -818,27 +978,31 @@ class GameScreen(QWidget):
     def reset_current_question(self):
         """現在の問題をリセット（次の問題用）"""
         self.game_engine = None
+        self._displayed_image = None
         self.timer_controller.reset()
         self.update_timer.stop()
+        self.frame_profiler.pause()
         self.image_label.clear()
         self.image_label.setText("画像がここに表示されます")
         self.answer_input.clear()
         self.time_label.setText("経過時間：00.0s")
-        self.progress_bar.setValue(0)
+        self.progress_bar.update_progress(0.0)
         self.category_label.setText("")
         self.hint_label.setText("")
     
     def reset_game(self):
         """ゲームをリセット"""
         self.game_engine = None
+        self._displayed_image = None
         self.timer_controller.reset()
         self.update_timer.stop()
+        self.frame_profiler.pause()
         self.image_label.clear()
         self.image_label.setText("画像がここに表示されます")
         self.answer_input.clear()
         self.time_label.setText("経過時間：00.0s")
         self.score_label.setText("スコア：---")
-        self.progress_bar.setValue(0)
+        self.progress_bar.update_progress(0.0)
         self.category_label.setText("")
         self.hint_label.setText("")
         
@@ -864,10 +1028,9 @@ class GameScreen(QWidget):
 
         # セッション中の場合は、使用済み画像を除外
         if self.session_is_active:
-            all_images = self.dataset_loader.get_all_images()
-            available_images = [img for img in all_images if img not in self.session_used_images]
-            
-            if not available_images:
+            image_path = self.dataset_loader.get_random_image(exclude=self.session_used_images)
+
+            if image_path is None and self.dataset_loader.get_image_count() > 0:
                 # 使用可能な画像がない場合（すべて使用済み）
                 QMessageBox.warning(
                     self,
@@ -877,10 +1040,8 @@ class GameScreen(QWidget):
                 )
                 return
             
-            # 使用可能な画像からランダムに選択
-            import random
-            image_path = random.choice(available_images)
-            self.session_used_images.add(image_path)  # 使用済みに追加
+            if image_path is not None:
+                self.session_used_images.add(image_path)  # 使用済みに追加
         else:
             # セッション外の場合は通常通りランダム選択
             image_path = self.dataset_loader.get_random_image()
@@ -895,7 +1056,7 @@ class GameScreen(QWidget):
             return
 
         # ゲームエンジンの初期化
-        self.game_engine = GameEngine(image_path, self.current_mode, label_loader=self.label_loader)
+        self.game_engine = self.create_game_engine(image_path)
         self.timer_controller.start()
         self.update_display()
         self.update_timer.start(100)  # 100msごとに更新
@@ -986,10 +1147,27 @@ class MainWindow(QMainWindow):
 
 def main():
     """メイン関数"""
-    app = QApplication(sys.argv)
+    # --memory-profile または VGI_MEMORY_PROFILE でメモリの時系列を記録する
+    memory_monitor = MemoryMonitor.from_environment()
+    argv = [arg for arg in sys.argv if not arg.startswith("--memory-profile")]
+    app = QApplication(argv)
     window = MainWindow()
     window.show()
-    sys.exit(app.exec_())
+    # ホーム画面の表示後に重い初期化を開始
+    QTimer.singleShot(0, window.game_screen.start_background_init)
+    if memory_monitor is not None:
+        memory_monitor.start()
+        memory_timer = QTimer()
+        memory_timer.timeout.connect(memory_monitor.sample)
+        memory_timer.start(int(memory_monitor.interval * 1000))
+        print(f"メモリプロファイリング: {memory_monitor.path}（{memory_monitor.interval:.0f}秒ごと）")
+    exit_code = app.exec_()
+    if memory_monitor is not None:
+        memory_timer.stop()
+        memory_monitor.close()
+    if window.game_screen.session_log is not None:
+        window.game_screen.session_log.close()
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
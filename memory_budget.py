@@ -0,0 +1,299 @@
+"""
+MemoryBudget - キャッシュ全体のメモリ使用量を管理する予算管理クラス
+各キャッシュ（デコード済み画像・キーフレーム・エンコード済みフレーム・サムネイルなど）は
+コンポーネントとして登録し、全体の合計がバイト数の上限を超えた場合や、
+システムの空きメモリが少なくなった場合に、優先度の低いコンポーネントから解放させる
+
+コンポーネントの要件:
+    current_bytes 属性（または usage 関数）: 現在の使用バイト数
+    evict_bytes(nbytes) メソッド（または evict 関数）: 指定バイト数以上を解放し、解放したバイト数を返す
+    memory_budget 属性がある場合は登録時にこのインスタンスを設定する
+    （FrameCache・SharedImagePoolは追加のたびに enforce を呼ぶ）
+
+個別のオブジェクトが保持するメモリ（GameEngineのoriginal_imageなど）はTrackedObjectsで集計する
+
+優先度（PRIORITIES、小さいほど先に解放する）:
+    frames          描画済みフレーム（再描画すれば作り直せる）
+    encoded_frames  エンコード済みフレーム
+    thumbnails      サムネイル
+    keyframes       事前レンダリング済みシーケンス（ディスクからの再読み込みが必要）
+    decoded_images  デコード済みの元画像（表示中の画像は最後に解放する）
+
+環境変数（runtime_config.pyで読み込む）:
+    VGI_MEMORY_BUDGET_MB    上限（MB、RuntimeConfigの既定値を上書き）
+    VGI_MIN_AVAILABLE_MB    システムの空きメモリがこれを下回ったら解放する（MB）
+"""
+
+import threading
+import weakref
+from collections import OrderedDict
+
+PRIORITIES = {
+    "frames": 10,
+    "encoded_frames": 20,
+    "thumbnails": 30,
+    "keyframes": 40,
+    "decoded_images": 50,
+}
+# 上限を超えた場合はこの割合まで解放する（上限付近で毎回解放が走らないようにする）
+LOW_WATER = 0.9
+
+
+def available_memory():
+    """
+    システムの空きメモリ（バイト、/proc/meminfoのMemAvailable）
+
+    Returns:
+        取得できない場合はNone
+    """
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class TrackedObjects:
+    """個別のオブジェクトが保持するメモリを集計するコンポーネント（弱参照で保持）"""
+
+    def __init__(self, size, release=None, keep_latest=1):
+        """
+        初期化
+
+        Args:
+            size: オブジェクトの使用バイト数を返す関数
+            release: オブジェクトのメモリを解放し、解放したバイト数を返す関数
+                （Noneの場合は集計のみで解放しない）
+            keep_latest: 解放しない最新のオブジェクト数（表示中の画像を解放して
+                次のフレームで読み込み直す、という繰り返しを防ぐ）
+        """
+        self.size = size
+        self.release = release
+        self.keep_latest = keep_latest
+        self._objects = OrderedDict()  # id -> weakref（追加順、古いものから解放する）
+        # 弱参照のコールバックは、ロック中の割り当てで起きたガベージコレクションから
+        # 同じスレッドで呼ばれることがあるため、再入可能なロックにする
+        self._lock = threading.RLock()
+
+    def add(self, obj):
+        """オブジェクトを追加（追加済みの場合は最も新しい扱いにする）"""
+        key = id(obj)
+        with self._lock:
+            if key in self._objects:
+                self._objects.move_to_end(key)
+                return
+            self._objects[key] = weakref.ref(obj, lambda _, key=key: self._discard(key))
+
+    def _discard(self, key):
+        """回収されたオブジェクトを除く"""
+        with self._lock:
+            self._objects.pop(key, None)
+
+    def _alive(self):
+        """生存しているオブジェクト（古い順）"""
+        with self._lock:
+            refs = list(self._objects.values())
+        return [obj for obj in (ref() for ref in refs) if obj is not None]
+
+    @property
+    def current_bytes(self):
+        return sum(self.size(obj) for obj in self._alive())
+
+    def __len__(self):
+        return len(self._alive())
+
+    def evict_bytes(self, nbytes):
+        """古いオブジェクトから指定バイト数以上を解放"""
+        if self.release is None:
+            return 0
+        objects = self._alive()
+        if self.keep_latest > 0:
+            objects = objects[:-self.keep_latest]
+        freed = 0
+        for obj in objects:
+            if freed >= nbytes:
+                break
+            freed += self.release(obj)
+        return freed
+
+
+class _Component:
+    """登録されたコンポーネント"""
+
+    __slots__ = ("name", "component", "priority", "usage", "evict", "evictions", "evicted_bytes")
+
+    def __init__(self, name, component, priority, usage, evict):
+        self.name = name
+        self.component = component
+        self.priority = priority
+        self.usage = usage
+        self.evict = evict
+        self.evictions = 0
+        self.evicted_bytes = 0
+
+
+class MemoryBudget:
+    """メモリ予算管理クラス"""
+
+    def __init__(self, max_bytes, min_available=None):
+        """
+        初期化
+
+        Args:
+            max_bytes: 登録したコンポーネントの合計の上限バイト数
+            min_available: システムの空きメモリがこのバイト数を下回ったら解放する（Noneの場合は確認しない）
+        """
+        self.max_bytes = max_bytes
+        self.min_available = min_available
+        self._components = {}
+        self._lock = threading.Lock()
+        self.enforcements = 0
+        self.pressure_events = 0
+
+    def register(self, name, component, priority=None, usage=None, evict=None):
+        """
+        コンポーネントを登録
+
+        Args:
+            name: コンポーネント名（PRIORITIESのキーなど、使用量の表示に使う）
+            component: キャッシュなどのオブジェクト（current_bytes / evict_bytes を持つ）
+            priority: 優先度（小さいほど先に解放する。Noneの場合はPRIORITIES、未定義なら0）
+            usage: 使用バイト数を返す関数（Noneの場合は component.current_bytes）
+            evict: 解放する関数（Noneの場合は component.evict_bytes、ない場合は解放しない）
+
+        Returns:
+            component
+        """
+        if priority is None:
+            priority = PRIORITIES.get(name, 0)
+        if usage is None:
+            usage = lambda: component.current_bytes  # noqa: E731
+        if evict is None and not (isinstance(component, TrackedObjects) and component.release is None):
+            evict = getattr(component, "evict_bytes", None)
+        self._components[name] = _Component(name, component, priority, usage, evict)
+        if hasattr(component, "memory_budget"):
+            component.memory_budget = self
+        return component
+
+    def unregister(self, name):
+        """コンポーネントの登録を解除"""
+        self._components.pop(name, None)
+
+    def track(self, name, obj, size=None, release=None):
+        """
+        オブジェクトをTrackedObjectsのコンポーネントに追加（なければ作成して登録）し、上限を確認
+
+        Args:
+            name: コンポーネント名
+            obj: 追加するオブジェクト
+            size: コンポーネントを作成する場合のサイズ関数（Noneの場合は obj.nbytes）
+            release: コンポーネントを作成する場合の解放関数
+        """
+        component = self._components.get(name)
+        if component is None:
+            tracked = TrackedObjects(size or (lambda o: o.nbytes), release)
+            self.register(name, tracked)
+        else:
+            tracked = component.component
+            if not isinstance(tracked, TrackedObjects):
+                raise ValueError(f"TrackedObjectsではないコンポーネントです: {name}")
+        tracked.add(obj)
+        self.enforce()
+
+    def usage(self):
+        """{コンポーネント名: 使用バイト数}"""
+        return {name: c.usage() for name, c in list(self._components.items())}
+
+    def total_bytes(self):
+        """全コンポーネントの合計使用バイト数"""
+        return sum(self.usage().values())
+
+    def reclaim(self, nbytes):
+        """
+        優先度の低いコンポーネントから指定バイト数以上を解放
+
+        Returns:
+            解放したバイト数
+        """
+        freed = 0
+        order = sorted(self._components.values(), key=lambda c: c.priority)
+        for component in order:
+            if freed >= nbytes:
+                break
+            if component.evict is None:
+                continue
+            released = component.evict(nbytes - freed)
+            if released:
+                component.evictions += 1
+                component.evicted_bytes += released
+                freed += released
+        return freed
+
+    def enforce(self):
+        """
+        合計が上限を超えていればLOW_WATERの割合まで解放
+
+        別スレッドが解放中の場合は待たずに戻る（キャッシュへの追加を止めない）
+
+        Returns:
+            解放したバイト数
+        """
+        if not self._lock.acquire(blocking=False):
+            return 0
+        try:
+            total = self.total_bytes()
+            if total <= self.max_bytes:
+                return 0
+            self.enforcements += 1
+            return self.reclaim(total - int(self.max_bytes * LOW_WATER))
+        finally:
+            self._lock.release()
+
+    def relieve_pressure(self):
+        """
+        システムの空きメモリがmin_availableを下回っていれば不足分を解放
+        （問題の切り替え時など、定期的に呼ぶ）
+
+        Returns:
+            解放したバイト数
+        """
+        freed = self.enforce()
+        if self.min_available is None:
+            return freed
+        available = available_memory()
+        if available is None or available >= self.min_available:
+            return freed
+        with self._lock:
+            self.pressure_events += 1
+            return freed + self.reclaim(self.min_available - available)
+
+    def get_stats(self):
+        """コンポーネントごとの使用量と解放の統計（監視用）"""
+        components = {}
+        for name, c in sorted(self._components.items(), key=lambda item: item[1].priority):
+            components[name] = {
+                "bytes": c.usage(),
+                "priority": c.priority,
+                "evictable": c.evict is not None,
+                "evictions": c.evictions,
+                "evicted_bytes": c.evicted_bytes,
+            }
+        return {
+            "max_bytes": self.max_bytes,
+            "used_bytes": sum(c["bytes"] for c in components.values()),
+            "min_available": self.min_available,
+            "available": available_memory(),
+            "enforcements": self.enforcements,
+            "pressure_events": self.pressure_events,
+            "components": components,
+        }
+
+
+def create_budget(max_bytes, min_available=None):
+    """上限が指定されている場合のみMemoryBudgetを作成（Noneの場合はNone）"""
+    if max_bytes is None:
+        return None
+    return MemoryBudget(max_bytes, min_available)
@@ -0,0 +1,220 @@
+"""
+MemoryMonitor - 長時間稼働するキオスク向けのメモリ・割り当てのプロファイリング
+一定間隔でRSS・tracemallocの使用量と増加の大きい割り当て箇所・生存しているオブジェクト数
+（GameEngine・ndarray・QPixmap・QImage）を記録し、JSON Lines形式の時系列に書き出す
+
+有効にする方法（main.py）:
+    python main.py --memory-profile                    # logs/memory_profile_<日時>.jsonl
+    python main.py --memory-profile=profile.jsonl
+    VGI_MEMORY_PROFILE=1 python main.py                # 環境変数（1以外の値は出力先のパス）
+    VGI_MEMORY_PROFILE_INTERVAL=30                     # 記録の間隔（秒、既定60）
+
+時系列の1行（1回の記録）:
+    {"elapsed": 経過秒, "label": 任意のラベル, "rss": バイト, "traced_current": バイト, "traced_peak": バイト,
+     "objects": {"GameEngine": 1, "ndarray": 12, ...}, "ndarray_bytes": バイト,
+     "top": [{"where": "ファイル:行", "size_diff": バイト, "count_diff": 個数}, ...]}
+
+ndarrayはガベージコレクタの追跡対象ではないため、追跡対象のオブジェクトから直接参照されているものを数える
+（QLabelなどC++側が保持しているQPixmapはPythonのオブジェクトではないため数えられない）
+長時間の増加の確認は soak_test.py を参照
+"""
+
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+COUNT_TYPES = ("GameEngine", "ndarray", "QPixmap", "QImage")
+DEFAULT_INTERVAL = 60.0
+
+
+def current_rss():
+    """現在のプロセスの常駐メモリ（バイト）。取得できない場合はピーク値"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOSはバイト、Linuxはキロバイト単位
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def count_live_objects(type_names=COUNT_TYPES):
+    """
+    生存しているオブジェクトを型名ごとに数える
+
+    Args:
+        type_names: 数える型の名前（モジュールを読み込まずに済むよう名前で比較する）
+
+    Returns:
+        ({型名: 個数}, ndarrayのデータの合計バイト数) のタプル
+        （ビューは元の配列のデータを数える。同じデータは1回だけ）
+    """
+    names = set(type_names)
+    counts = dict.fromkeys(type_names, 0)
+    seen = set()
+    owners = {}
+    for obj in gc.get_objects():
+        for candidate in [obj] + gc.get_referents(obj):
+            name = type(candidate).__name__
+            if name not in names or id(candidate) in seen:
+                continue
+            seen.add(id(candidate))
+            counts[name] += 1
+            if name == "ndarray":
+                base = candidate
+                while getattr(base, "base", None) is not None and type(base.base).__name__ == "ndarray":
+                    base = base.base
+                owners[id(base)] = getattr(base, "nbytes", 0)
+    return counts, sum(owners.values())
+
+
+def profile_path_from(argv=None, environ=None):
+    """
+    コマンドライン引数（--memory-profile[=パス]）または環境変数 VGI_MEMORY_PROFILE から出力先を決める
+
+    Returns:
+        出力先のパス。プロファイリングが無効の場合はNone
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    environ = os.environ if environ is None else environ
+    value = None
+    for arg in argv:
+        if arg == "--memory-profile":
+            value = "1"
+        elif arg.startswith("--memory-profile="):
+            value = arg.split("=", 1)[1] or "1"
+    if value is None:
+        value = environ.get("VGI_MEMORY_PROFILE") or None
+    if value is None or value.lower() in ("0", "false", "no"):
+        return None
+    if value == "1":
+        return os.path.join("logs", f"memory_profile_{time.strftime('%Y%m%d_%H%M%S')}.jsonl")
+    return value
+
+
+class MemoryMonitor:
+    """メモリの時系列記録クラス"""
+
+    def __init__(self, path=None, interval=DEFAULT_INTERVAL, top=10, trace_frames=1,
+                 count_types=COUNT_TYPES, collect=False):
+        """
+        初期化
+
+        Args:
+            path: 時系列の出力先（JSON Lines、Noneの場合は書き出さずsamplesに保持するのみ）
+            interval: 記録の間隔（秒、呼び出し側のタイマーで使う）
+            top: 記録する割り当て箇所の数（開始時からの増加が大きい順、0の場合は記録しない）
+            trace_frames: tracemallocが保持するスタックの深さ
+            count_types: 生存数を数える型の名前
+            collect: Trueの場合、記録の前にgc.collect()する（回収可能な循環参照を除いて数える）
+        """
+        self.path = path
+        self.interval = interval
+        self.top = top
+        self.trace_frames = trace_frames
+        self.count_types = tuple(count_types)
+        self.collect = collect
+        self.samples = []
+        self._file = None
+        self._baseline = None
+        self._started_tracing = False
+        self._start = None
+
+    @classmethod
+    def from_environment(cls, argv=None, environ=None):
+        """
+        引数・環境変数でプロファイリングが有効な場合のみ作成
+
+        Returns:
+            MemoryMonitor。無効の場合はNone
+        """
+        environ = os.environ if environ is None else environ
+        path = profile_path_from(argv, environ)
+        if path is None:
+            return None
+        interval = float(environ.get("VGI_MEMORY_PROFILE_INTERVAL") or DEFAULT_INTERVAL)
+        return cls(path, interval=interval)
+
+    def start(self):
+        """tracemallocを開始し、割り当て箇所の比較の基準を記録"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.trace_frames)
+            self._started_tracing = True
+        if self.top:
+            self._baseline = self._snapshot()
+        if self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._start = time.monotonic()
+        return self
+
+    def _snapshot(self):
+        """tracemalloc自体とインポート処理の割り当てを除いたスナップショット"""
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    def sample(self, label=None):
+        """
+        現在のメモリの状態を記録
+
+        Args:
+            label: 記録に付けるラベル（問題数など）
+
+        Returns:
+            記録した辞書
+        """
+        if self._start is None:
+            self.start()
+        if self.collect:
+            gc.collect()
+        counts, ndarray_bytes = count_live_objects(self.count_types)
+        traced_current, traced_peak = tracemalloc.get_traced_memory()
+        record = {
+            "elapsed": round(time.monotonic() - self._start, 3),
+            "label": label,
+            "rss": current_rss(),
+            "traced_current": traced_current,
+            "traced_peak": traced_peak,
+            "objects": counts,
+            "ndarray_bytes": ndarray_bytes,
+        }
+        if self._baseline is not None:
+            stats = self._snapshot().compare_to(self._baseline, "lineno")[:self.top]
+            record["top"] = [
+                {
+                    "where": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    "size_diff": stat.size_diff,
+                    "count_diff": stat.count_diff,
+                }
+                for stat in stats
+            ]
+        self.samples.append(record)
+        if self._file is not None:
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+        return record
+
+    def close(self):
+        """最後の記録を行い、ファイルを閉じてtracemallocを停止"""
+        if self._start is None:
+            return
+        self.sample("close")
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self._baseline = None
+        self._start = None
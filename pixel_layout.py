@@ -0,0 +1,111 @@
+"""
+PixelLayout - パイプライン内部の画素レイアウト
+cv2.imreadが返すBGRから各レイアウトへの変換と、表示・書き出し用の変換を担当
+
+レイアウト:
+    rgb:    RGBのインターリーブ (H, W, 3)。従来の形式
+    bgr:    BGRのインターリーブ (H, W, 3)。cv2.imreadの結果をそのまま使う（変換なし）
+    rgb32:  BGRAのインターリーブ (H, W, 4)。1画素4バイトに揃えた形式で、
+            リトルエンディアンではQImage.Format_RGB32と同じメモリ配置（表示時の変換なし）
+    planar: B, G, Rの各チャンネルを分けた (3, H, W)。チャンネルごとに連続したメモリで処理する
+"""
+
+from lazy_import import lazy_import
+
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+
+LAYOUTS = ("rgb", "bgr", "rgb32", "planar")
+
+
+def check_layout(layout):
+    """未対応のレイアウトの場合はValueError"""
+    if layout not in LAYOUTS:
+        raise ValueError(f"未対応の画素レイアウトです: {layout}")
+    return layout
+
+
+def from_bgr(image, layout):
+    """
+    cv2.imreadで読み込んだBGR画像を指定レイアウトに変換
+
+    Args:
+        image: BGRの画像 (H, W, 3)
+        layout: 変換先のレイアウト
+
+    Returns:
+        変換後の画像（'bgr' の場合は入力そのもの）
+    """
+    check_layout(layout)
+    if layout == "rgb":
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    if layout == "rgb32":
+        return cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
+    if layout == "planar":
+        return np.ascontiguousarray(image.transpose(2, 0, 1))
+    return image
+
+
+def to_bgr(image, layout):
+    """
+    指定レイアウトの画像をBGRのインターリーブに変換（cv2.imwrite/VideoWriter/imencode用）
+
+    Returns:
+        BGRの画像 (H, W, 3)（'bgr' の場合は入力そのもの）
+    """
+    check_layout(layout)
+    if layout == "rgb":
+        return cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+    if layout == "rgb32":
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+    if layout == "planar":
+        return cv2.merge(list(image))
+    return image
+
+
+def to_rgb(image, layout):
+    """指定レイアウトの画像をRGBのインターリーブに変換（'rgb' の場合は入力そのもの）"""
+    check_layout(layout)
+    if layout == "rgb":
+        return image
+    if layout == "rgb32":
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2RGB)
+    return cv2.cvtColor(to_bgr(image, layout), cv2.COLOR_BGR2RGB)
+
+
+def display_buffer(image, layout, bgr888=True):
+    """
+    QImageに渡すバッファを用意
+
+    Args:
+        image: 指定レイアウトの画像
+        layout: 画素レイアウト
+        bgr888: QImage.Format_BGR888が使えるか（Qt 5.14以降）。Falseの場合BGRはRGBに変換する
+
+    Returns:
+        (C連続な配列, 1行のバイト数, QImageのフォーマット名) のタプル
+        'rgb'/'bgr'/'rgb32' は変換せずにそのまま渡す
+    """
+    check_layout(layout)
+    if layout == "planar":
+        image = to_bgr(image, layout)
+        layout = "bgr"
+    if layout == "bgr" and not bgr888:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        layout = "rgb"
+    if not image.flags["C_CONTIGUOUS"]:
+        image = np.ascontiguousarray(image)
+    height, width = image.shape[:2]
+    if layout == "rgb32":
+        return image, 4 * width, "Format_RGB32"
+    if layout == "bgr":
+        return image, 3 * width, "Format_BGR888"
+    return image, 3 * width, "Format_RGB888"
+
+
+def image_size(image, layout):
+    """画像の (幅, 高さ)"""
+    if layout == "planar":
+        return image.shape[2], image.shape[1]
+    return image.shape[1], image.shape[0]
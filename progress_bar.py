@@ -1,12 +1,16 @@
 from PyQt5.QtWidgets import QProgressBar
 from PyQt5.QtCore import Qt
 
+from widget_updater import WidgetUpdater
+
 class ProgressBar(QProgressBar):
     """
     ゲームの進行状況（画像の鮮明度など）を表示するプログレスバー
     """
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, updater=None):
         super().__init__(parent)
+        # 値・状態が変わったときだけウィジェットを更新する
+        self.updater = updater or WidgetUpdater()
         self.init_ui()
 
     def init_ui(self):
@@ -16,8 +20,9 @@ class ProgressBar(QProgressBar):
         self.setTextVisible(True)
         self.setAlignment(Qt.AlignCenter)
         self.setFormat("鮮明度: %p%")
-        
-        # スタイルの設定
+        self.setProperty("complete", False)
+
+        # スタイルの設定（完了時の色は動的プロパティ complete で切り替える）
         self.setStyleSheet("""
             QProgressBar {
                 border: 2px solid #bdc3c7;
@@ -32,12 +37,15 @@ class ProgressBar(QProgressBar):
                 width: 10px;
                 margin: 0.5px;
             }
+            QProgressBar[complete="true"]::chunk {
+                background-color: #2ecc71;
+            }
         """)
 
     def update_progress(self, value):
         """
-        進捗状況を更新する
-        
+        進捗状況を更新する（値・色が変わらない場合は何もしない）
+
         Args:
             value (float): 進捗値 (0.0 - 1.0) または パーセント (0 - 100)
         """
@@ -46,11 +54,8 @@ class ProgressBar(QProgressBar):
             percentage = int(value * 100)
         else:
             percentage = int(value)
-            
-        self.setValue(percentage)
-        
-        # 進行度に応じて色を変えるなどの演出も可能
-        if percentage >= 100:
-            self.setStyleSheet(self.styleSheet().replace("#3498db", "#2ecc71")) # 緑色に変更
-        else:
-            self.setStyleSheet(self.styleSheet().replace("#2ecc71", "#3498db")) # 青色に戻す
+
+        self.updater.set_value(self, percentage)
+
+        # 進行度100%で緑色、それ以外は青色
+        self.updater.set_property(self, "complete", percentage >= 100)
@@ -0,0 +1,290 @@
+"""
+RevealCurve - 進行度から効果の強さへの変換カーブと、事前計算したルックアップテーブル
+カーブは文字列または辞書で指定し（コードの変更なしに差し替えられる）、
+LUT_SIZE段階の配列にコンパイルしておく。フレームごとの処理は配列の参照のみ
+
+カーブの指定方法:
+    "linear"                          線形（従来と同じ）
+    "ease_in" など                    EASINGSのイージング関数
+    "gamma:1.5"                       progress ** 1.5
+    "piecewise:0:0,0.8:1,1:1"         (進行度:値) の折れ線（"0:40,0.5:60" 形式と同じ区切り）
+    {"type": "gamma", "gamma": 1.5}   辞書形式（データセットインデックスの較正結果など）
+    {"type": "piecewise", "points": [[0, 0], [0.8, 1], [1, 1]]}
+    {"type": "easing", "name": "ease_out"}
+
+モードごとのカーブ（DEFAULT_CURVESのキー）:
+    blur:        ぼかしモードのぼかしの進行度
+    zoom:        ズームモードの表示割合の進行度
+    hybrid_zoom: ハイブリッドモードのズームの進行度
+    hybrid_blur: ハイブリッドモードのぼかしの進行度（既定は進行度0.8でぼかしゼロ）
+    pixelate:    モザイクモードのブロックサイズの進行度
+    tiles:       タイル表示モードの表示済みタイル数の進行度
+    noise:       ノイズモードのノイズの割合の進行度
+"""
+
+import hashlib
+import json
+import threading
+
+from lazy_import import lazy_import
+
+np = lazy_import("numpy")
+
+
+# テーブルの段階数（進行度の分解能0.001。FrameCacheの量子化段階200の倍数で割り切れる）
+LUT_SIZE = 1001
+
+EASINGS = {
+    "linear": lambda t: t,
+    "ease_in": lambda t: t * t,
+    "ease_out": lambda t: 1.0 - (1.0 - t) ** 2,
+    "ease_in_out": lambda t: t * t * (3.0 - 2.0 * t),
+    "ease_in_cubic": lambda t: t ** 3,
+    "ease_out_cubic": lambda t: 1.0 - (1.0 - t) ** 3,
+}
+
+DEFAULT_CURVES = {
+    "blur": "linear",
+    "zoom": "linear",
+    "hybrid_zoom": "linear",
+    "hybrid_blur": "piecewise:0:0,0.8:1,1:1",
+    "pixelate": "linear",
+    "tiles": "linear",
+    "noise": "linear",
+}
+
+# コンパイル済みのカーブ・テーブルのキャッシュ（GameEngineごとに作り直さない）
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def normalize_spec(spec):
+    """
+    カーブの指定を辞書形式に変換
+
+    Args:
+        spec: 文字列・辞書・None（Noneは線形）
+
+    Returns:
+        {'type': ...} の辞書
+    """
+    if spec is None:
+        return {"type": "easing", "name": "linear"}
+    if isinstance(spec, dict):
+        kind = spec.get("type", "easing")
+        if kind == "linear":
+            return {"type": "easing", "name": "linear"}
+        return dict(spec, type=kind)
+
+    text = str(spec).strip()
+    kind, _, args = text.partition(":")
+    kind = kind.strip().lower()
+    if kind == "gamma":
+        return {"type": "gamma", "gamma": float(args)}
+    if kind == "piecewise":
+        points = []
+        for item in args.split(","):
+            x, _, y = item.partition(":")
+            points.append([float(x), float(y)])
+        return {"type": "piecewise", "points": points}
+    return {"type": "easing", "name": kind}
+
+
+def _evaluate(spec, grid):
+    """辞書形式のカーブをgrid上で評価"""
+    kind = spec["type"]
+    if kind == "easing":
+        name = spec.get("name", "linear")
+        if name not in EASINGS:
+            raise ValueError(f"未対応のイージング関数です: {name}")
+        return EASINGS[name](grid)
+    if kind == "gamma":
+        return grid ** float(spec.get("gamma", 1.0))
+    if kind == "piecewise":
+        points = sorted((float(x), float(y)) for x, y in spec["points"])
+        if len(points) < 2:
+            raise ValueError("折れ線カーブには2点以上が必要です")
+        xs, ys = zip(*points)
+        return np.interp(grid, xs, ys)
+    raise ValueError(f"未対応のカーブです: {kind}")
+
+
+def _cached(key, build):
+    """キーに対応するオブジェクトをキャッシュから取得（なければ作成）"""
+    value = _cache.get(key)
+    if value is None:
+        value = build()
+        with _cache_lock:
+            value = _cache.setdefault(key, value)
+    return value
+
+
+class RevealCurve:
+    """テーブルにコンパイルした進行度カーブ"""
+
+    def __init__(self, spec, size=LUT_SIZE):
+        """
+        初期化（通常はcompile_curveを使用）
+
+        Args:
+            spec: カーブの指定（normalize_specを参照）
+            size: テーブルの段階数
+        """
+        self.spec = normalize_spec(spec)
+        self.size = size
+        grid = np.linspace(0.0, 1.0, size)
+        self.table = np.clip(_evaluate(self.spec, grid), 0.0, 1.0)
+        self.table.flags.writeable = False
+
+    def index(self, progress):
+        """進行度に最も近いテーブルのインデックス"""
+        progress = max(0.0, min(1.0, progress))
+        return int(progress * (self.size - 1) + 0.5)
+
+    def __call__(self, progress):
+        """進行度を変換"""
+        return float(self.table[self.index(progress)])
+
+    def map(self, progress_values):
+        """進行度の配列をまとめて変換"""
+        values = np.clip(np.asarray(progress_values, dtype=np.float64), 0.0, 1.0)
+        return self.table[(values * (self.size - 1) + 0.5).astype(np.intp)]
+
+
+def compile_curve(spec, size=LUT_SIZE):
+    """カーブをテーブルにコンパイル（同じ指定は共有する）"""
+    spec = normalize_spec(spec)
+    key = ("curve", json.dumps(spec, sort_keys=True), size)
+    return _cached(key, lambda: RevealCurve(spec, size))
+
+
+class EffectTable:
+    """進行度ごとの効果パラメータ（sigma, ksize, アフィン変換の拡大率, 効果の強さ）のテーブル"""
+
+    def __init__(self, blur_curve=None, zoom_curve=None, max_sigma=30.0, min_zoom_ratio=0.125,
+                 strength_curve=None):
+        """
+        初期化（通常はcompile_effect_tableを使用）
+
+        Args:
+            blur_curve: ぼかしのRevealCurve（Noneの場合はぼかさない）
+            zoom_curve: ズームのRevealCurve（Noneの場合はズームしない）
+            max_sigma: 進行度0のsigma
+            min_zoom_ratio: 進行度0の表示割合
+            strength_curve: 効果の強さ（進行度0で1.0、1で0.0）のRevealCurve
+                （モザイク・タイル・ノイズなど、sigma/拡大率以外の効果に使う）
+        """
+        curve = blur_curve or zoom_curve or strength_curve
+        self.size = curve.size if curve is not None else LUT_SIZE
+
+        if blur_curve is not None:
+            # ImageProcessor.blur_paramsと同じ式をテーブル全体に適用
+            self.sigma = max_sigma * (1.0 - blur_curve.table)
+            self.ksize = ((self.sigma * 6).astype(np.int32) + 1) | 1
+        else:
+            self.sigma = np.zeros(self.size)
+            self.ksize = np.ones(self.size, dtype=np.int32)
+
+        if zoom_curve is not None:
+            self.ratio = min_zoom_ratio + (1.0 - min_zoom_ratio) * zoom_curve.table
+        else:
+            self.ratio = np.ones(self.size)
+        self.scale = 1.0 / self.ratio
+        if strength_curve is not None:
+            self.strength = 1.0 - strength_curve.table
+        else:
+            self.strength = np.zeros(self.size)
+
+        # 参照のたびにnumpyのスカラーを作らないよう、Pythonのリストにしておく
+        self._sigma = self.sigma.tolist()
+        self._ksize = self.ksize.tolist()
+        self._ratio = self.ratio.tolist()
+        self._scale = self.scale.tolist()
+        self._strength = self.strength.tolist()
+
+    def index(self, progress):
+        """進行度に最も近いテーブルのインデックス"""
+        progress = max(0.0, min(1.0, progress))
+        return int(progress * (self.size - 1) + 0.5)
+
+    def blur(self, progress):
+        """(sigma, ksize) のタプル"""
+        i = self.index(progress)
+        return self._sigma[i], self._ksize[i]
+
+    def zoom_ratio(self, progress):
+        """表示割合"""
+        return self._ratio[self.index(progress)]
+
+    def zoom_scale(self, progress):
+        """アフィン変換の拡大率（1 / 表示割合）"""
+        return self._scale[self.index(progress)]
+
+    def effect_strength(self, progress):
+        """効果の強さ（1.0: 最大 - 0.0: 効果なし）"""
+        return self._strength[self.index(progress)]
+
+
+def compile_effect_table(blur_spec=None, zoom_spec=None, max_sigma=30.0, min_zoom_ratio=0.125,
+                         size=LUT_SIZE, strength_spec=None):
+    """
+    モードの効果パラメータテーブルを作成（同じ指定は共有する）
+
+    Args:
+        blur_spec: ぼかしのカーブ指定（Noneの場合はぼかさない）
+        zoom_spec: ズームのカーブ指定（Noneの場合はズームしない）
+        strength_spec: 効果の強さのカーブ指定（Noneの場合は常に0）
+    """
+    curves = [compile_curve(spec, size) if spec is not None else None
+              for spec in (blur_spec, zoom_spec, strength_spec)]
+    key = ("effect",) + tuple(
+        None if curve is None else json.dumps(curve.spec, sort_keys=True) for curve in curves
+    ) + (max_sigma, min_zoom_ratio, size)
+    blur_curve, zoom_curve, strength_curve = curves
+    return _cached(key, lambda: EffectTable(blur_curve, zoom_curve, max_sigma, min_zoom_ratio,
+                                            strength_curve))
+
+
+def resolve_curves(curves=None):
+    """
+    DEFAULT_CURVESに指定を重ねたモードごとのカーブ
+
+    Args:
+        curves: {キー: カーブ指定} の辞書（オプション）
+    """
+    resolved = dict(DEFAULT_CURVES)
+    for key, spec in (curves or {}).items():
+        if key not in DEFAULT_CURVES:
+            raise ValueError(f"未対応のカーブのキーです: {key}（{', '.join(DEFAULT_CURVES)}）")
+        resolved[key] = spec
+    return resolved
+
+
+def curve_key(curves):
+    """
+    モードごとのカーブの識別子（フレームキャッシュのキー用）
+
+    Returns:
+        既定のカーブと同じ場合はNone、それ以外はカーブ指定から求めた短い文字列
+    """
+    specs = {key: normalize_spec(spec) for key, spec in resolve_curves(curves).items()}
+    defaults = {key: normalize_spec(spec) for key, spec in DEFAULT_CURVES.items()}
+    if specs == defaults:
+        return None
+    text = json.dumps(specs, sort_keys=True)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=6).hexdigest()
+
+
+def parse_curve_args(items):
+    """
+    "キー=カーブ" 形式の指定（コマンドライン引数）を辞書に変換
+
+    例: ["blur=ease_out", "hybrid_blur=piecewise:0:0,0.6:1,1:1"]
+    """
+    curves = {}
+    for item in items or []:
+        key, sep, spec = item.partition("=")
+        if not sep:
+            raise ValueError(f"カーブは キー=カーブ の形式で指定してください: {item}")
+        curves[key.strip()] = spec.strip()
+    return resolve_curves(curves)
@@ -0,0 +1,241 @@
+"""
+RuntimeConfig - OpenCVのスレッド数・最適化・ワーカー数・CPUアフィニティ・メモリ予算の実行時設定
+実行形態（kiosk / server / batch）ごとに既定値を持ち、環境変数またはコマンドライン引数で上書きする
+
+実行形態ごとの既定値:
+    kiosk:  1セッションのみなのでOpenCV内部のスレッドに全コアを使わせる（ワーカープロセスなし）
+            メモリ2GBの端末を想定し、キャッシュ・デコード済み画像の合計を768MBに制限する
+    server: 描画プロセスをコア数だけ起動し、OpenCVは各プロセス1スレッド（過剰なスレッド生成を防ぐ）
+    batch:  serverと同じ。プロセスをコアに固定してキャッシュの移動を抑える
+
+環境変数:
+    VGI_CV_THREADS     cv2.setNumThreadsに渡す値（0: OpenCVの既定）
+    VGI_USE_OPTIMIZED  0の場合はcv2.setUseOptimized(False)
+    VGI_WORKERS        ワーカープロセス数
+    VGI_CPU_AFFINITY   'spread'（ワーカーを1コアずつに固定）, 'none', またはコア番号のカンマ区切り
+    VGI_LAYOUT         画素レイアウト（pixel_layout.LAYOUTS）
+    VGI_MEMORY_BUDGET_MB  キャッシュ・デコード済み画像の合計の上限（MB、0: 制限しない）
+    VGI_MIN_AVAILABLE_MB  システムの空きメモリがこれを下回ったらキャッシュを解放する（MB、0: 確認しない）
+"""
+
+import multiprocessing
+import os
+
+from lazy_import import lazy_import
+from pixel_layout import check_layout
+
+cv2 = lazy_import("cv2")
+
+
+EXECUTION_MODES = ("kiosk", "server", "batch")
+MB = 1024 * 1024
+AFFINITY_MODES = ("none", "spread")
+
+
+def available_cpus():
+    """このプロセスが使用できるコア番号のリスト"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def parse_affinity(text):
+    """
+    CPUアフィニティ指定を解析
+
+    Args:
+        text: 'none', 'spread', またはコア番号のカンマ区切り（例: "0,2,4"）
+
+    Returns:
+        'none', 'spread', またはコア番号のリスト
+    """
+    text = (text or "none").strip().lower()
+    if text in AFFINITY_MODES:
+        return text
+    return [int(c) for c in text.split(",") if c.strip()]
+
+
+class RuntimeConfig:
+    """実行時設定クラス"""
+
+    def __init__(self, mode="kiosk", cv_threads=None, use_optimized=True, workers=None,
+                 cpu_affinity="none", layout="rgb", memory_budget=None, min_available=None):
+        """
+        初期化（通常はfor_modeを使用）
+
+        Args:
+            mode: 実行形態 ('kiosk', 'server', 'batch')
+            cv_threads: cv2.setNumThreadsに渡す値（Noneの場合は変更しない）
+            use_optimized: cv2.setUseOptimizedに渡す値
+            workers: ワーカープロセス数（0の場合はワーカーを使わない）
+            cpu_affinity: 'none', 'spread', またはワーカーを割り当てるコア番号のリスト
+            layout: GameEngine/ImageProcessorの画素レイアウト
+            memory_budget: MemoryBudgetの上限バイト数（Noneの場合は各キャッシュの個別の上限のみ）
+            min_available: システムの空きメモリの下限バイト数（Noneの場合は確認しない）
+        """
+        if mode not in EXECUTION_MODES:
+            raise ValueError(f"未対応の実行形態です: {mode}")
+        self.mode = mode
+        self.cv_threads = cv_threads
+        self.use_optimized = use_optimized
+        self.workers = workers
+        self.cpu_affinity = cpu_affinity
+        self.layout = check_layout(layout)
+        self.memory_budget = memory_budget
+        self.min_available = min_available
+
+    @classmethod
+    def defaults(cls, mode):
+        """実行形態ごとの既定値"""
+        cpus = len(available_cpus())
+        if mode == "kiosk":
+            # 表示はQImage.Format_BGR888で受け取れるため、読み込み時のBGR -> RGB変換を省略する
+            return cls(mode, cv_threads=cpus, workers=0, cpu_affinity="none", layout="bgr",
+                       memory_budget=768 * MB, min_available=128 * MB)
+        if mode == "server":
+            return cls(mode, cv_threads=1, workers=cpus, cpu_affinity="none")
+        if mode == "batch":
+            return cls(mode, cv_threads=1, workers=cpus, cpu_affinity="spread")
+        raise ValueError(f"未対応の実行形態です: {mode}")
+
+    @classmethod
+    def for_mode(cls, mode, cv_threads=None, use_optimized=None, workers=None,
+                 cpu_affinity=None, environ=None, memory_budget_mb=None):
+        """
+        実行形態の既定値に環境変数と引数の指定を重ねた設定を作成
+
+        優先順位: 引数 > 環境変数 > 実行形態の既定値（Noneは未指定として扱う）
+        """
+        config = cls.defaults(mode)
+        environ = os.environ if environ is None else environ
+
+        if environ.get("VGI_CV_THREADS"):
+            config.cv_threads = int(environ["VGI_CV_THREADS"])
+        if environ.get("VGI_USE_OPTIMIZED"):
+            config.use_optimized = environ["VGI_USE_OPTIMIZED"] not in ("0", "false", "no")
+        if environ.get("VGI_WORKERS"):
+            config.workers = int(environ["VGI_WORKERS"])
+        if environ.get("VGI_CPU_AFFINITY"):
+            config.cpu_affinity = parse_affinity(environ["VGI_CPU_AFFINITY"])
+        if environ.get("VGI_LAYOUT"):
+            config.layout = check_layout(environ["VGI_LAYOUT"])
+        if environ.get("VGI_MEMORY_BUDGET_MB"):
+            config.memory_budget = int(environ["VGI_MEMORY_BUDGET_MB"]) * MB or None
+        if environ.get("VGI_MIN_AVAILABLE_MB"):
+            config.min_available = int(environ["VGI_MIN_AVAILABLE_MB"]) * MB or None
+
+        if cv_threads is not None:
+            config.cv_threads = cv_threads
+        if use_optimized is not None:
+            config.use_optimized = use_optimized
+        if workers is not None:
+            config.workers = workers
+        if cpu_affinity is not None:
+            config.cpu_affinity = parse_affinity(cpu_affinity) if isinstance(cpu_affinity, str) \
+                else cpu_affinity
+        if memory_budget_mb is not None:
+            config.memory_budget = memory_budget_mb * MB or None
+        return config
+
+    def apply(self):
+        """現在のプロセスのOpenCV設定を変更"""
+        if self.cv_threads is not None:
+            cv2.setNumThreads(int(self.cv_threads))
+        cv2.setUseOptimized(bool(self.use_optimized))
+
+    def worker_cpus(self, index):
+        """
+        index番目のワーカーを固定するコア
+
+        Returns:
+            コア番号の集合。固定しない場合はNone
+        """
+        if self.cpu_affinity == "none":
+            return None
+        cpus = available_cpus() if self.cpu_affinity == "spread" else list(self.cpu_affinity)
+        if not cpus:
+            return None
+        return {cpus[index % len(cpus)]}
+
+    def apply_worker(self, index):
+        """
+        ワーカープロセスの初期化時に呼び出す（OpenCV設定とCPUアフィニティ）
+
+        Args:
+            index: ワーカーの通し番号（アフィニティの割り当てに使用）
+        """
+        cpus = self.worker_cpus(index)
+        if cpus is not None and hasattr(os, "sched_setaffinity"):
+            try:
+                os.sched_setaffinity(0, cpus)
+            except OSError as e:
+                print(f"CPUアフィニティの設定に失敗しました: {cpus}: {e}")
+        self.apply()
+
+    def describe(self):
+        """
+        設定値と実際に有効な値（ベンチマークの出力用）
+
+        Returns:
+            JSONに書き出せる辞書
+        """
+        return {
+            "mode": self.mode,
+            "cv_threads": self.cv_threads,
+            "use_optimized": self.use_optimized,
+            "workers": self.workers,
+            "cpu_affinity": self.cpu_affinity,
+            "layout": self.layout,
+            "memory_budget": self.memory_budget,
+            "min_available": self.min_available,
+            "effective_cv_threads": cv2.getNumThreads(),
+            "effective_use_optimized": cv2.useOptimized(),
+            "available_cpus": len(available_cpus()),
+        }
+
+
+def make_worker_counter():
+    """ワーカーの通し番号を割り当てるプロセス間共有カウンタを作成"""
+    return multiprocessing.Value("i", 0)
+
+
+def init_worker(config, counter):
+    """
+    ProcessPoolExecutorのinitializer用: 通し番号を取得して設定を適用
+
+    Args:
+        config: RuntimeConfig
+        counter: make_worker_counterで作成したカウンタ（Noneの場合は番号0）
+    """
+    index = 0
+    if counter is not None:
+        with counter.get_lock():
+            index = counter.value
+            counter.value += 1
+    config.apply_worker(index)
+
+
+def add_arguments(parser):
+    """argparseに実行時設定の引数を追加"""
+    group = parser.add_argument_group("実行時設定")
+    group.add_argument("--cv-threads", type=int, default=None,
+                       help="cv2.setNumThreadsに渡す値（既定: 実行形態ごと）")
+    group.add_argument("--no-cv-optimized", action="store_true",
+                       help="cv2.setUseOptimized(False) にする")
+    group.add_argument("--cpu-affinity", default=None,
+                       help="ワーカーのCPUアフィニティ（none, spread, コア番号のカンマ区切り）")
+    group.add_argument("--memory-budget-mb", type=int, default=None,
+                       help="キャッシュ・デコード済み画像の合計の上限（MB、0: 制限しない、既定: 実行形態ごと）")
+    return group
+
+
+def from_args(mode, args, workers=None):
+    """add_argumentsで追加した引数から設定を作成"""
+    return RuntimeConfig.for_mode(
+        mode,
+        cv_threads=args.cv_threads,
+        use_optimized=False if args.no_cv_optimized else None,
+        workers=workers,
+        cpu_affinity=args.cpu_affinity,
+        memory_budget_mb=args.memory_budget_mb,
+    )
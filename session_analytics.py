@@ -0,0 +1,241 @@
+"""
+SessionAnalytics - セッションイベントログの集計
+ログをnumpyのmemmapで一定件数ずつ読み、画像ごとの正答率と解答時間の分布を逐次集計する
+（数百万件でもメモリ使用量はチャンクサイズと画像数に比例するだけ）
+
+解答時間は正解したレコードのみを対象とし、固定幅のヒストグラムから分位点を求める
+
+使い方:
+    python session_analytics.py logs/session_events.bin
+    python session_analytics.py logs/session_events.bin --mode blur --sort accuracy --top 20
+    python session_analytics.py logs/session_events.bin --output stats.json
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from lazy_import import lazy_import
+from session_log import MAGIC, MODES, default_log_path, load_names, record_dtype
+
+np = lazy_import("numpy")
+
+
+def iter_chunks(path, chunk_records=1 << 20):
+    """
+    ログのレコードをチャンクごとに読み込む
+
+    Args:
+        path: ログファイルのパス
+        chunk_records: 1チャンクのレコード数
+
+    Yields:
+        record_dtypeの構造化配列（memmapのビュー）
+    """
+    dtype = record_dtype()
+    size = os.path.getsize(path)
+    count = (size - len(MAGIC)) // dtype.itemsize
+    if count <= 0:
+        return
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"セッションログではありません: {path}")
+    records = np.memmap(path, dtype=dtype, mode="r", offset=len(MAGIC), shape=(count,))
+    for start in range(0, count, chunk_records):
+        yield records[start:start + chunk_records]
+
+
+class SessionAnalytics:
+    """画像ごとの逐次集計クラス"""
+
+    def __init__(self, max_time=60.0, bin_width=0.25, mode=None):
+        """
+        初期化
+
+        Args:
+            max_time: ヒストグラムの上限（秒）。超えた解答時間は最後のビンに入れる
+            bin_width: ヒストグラムのビン幅（秒）
+            mode: 集計対象のモード（Noneの場合はすべて）
+        """
+        self.bin_width = bin_width
+        self.bins = int(np.ceil(max_time / bin_width))
+        self.mode_index = MODES.index(mode) if mode is not None else None
+        self._index = {}  # image_id -> 行番号
+        self._ids = np.zeros(0, dtype=np.uint64)
+        self.attempts = np.zeros(0, dtype=np.int64)
+        self.correct = np.zeros(0, dtype=np.int64)
+        self.time_sum = np.zeros(0, dtype=np.float64)
+        self.time_sq_sum = np.zeros(0, dtype=np.float64)
+        self.histogram = np.zeros((0, self.bins), dtype=np.int64)
+        self.records = 0
+
+    def _rows(self, image_ids):
+        """
+        画像IDを行番号に変換（未登録の画像は行を追加）
+
+        Returns:
+            image_idsと同じ長さの行番号配列
+        """
+        unique, inverse = np.unique(image_ids, return_inverse=True)
+        rows = np.empty(len(unique), dtype=np.int64)
+        new_ids = []
+        for i, key in enumerate(unique.tolist()):
+            row = self._index.get(key)
+            if row is None:
+                row = len(self._index)
+                self._index[key] = row
+                new_ids.append(key)
+            rows[i] = row
+        if new_ids:
+            self._grow(len(new_ids), new_ids)
+        return rows[inverse]
+
+    def _grow(self, n, new_ids):
+        """集計配列に行を追加"""
+        self._ids = np.concatenate([self._ids, np.array(new_ids, dtype=np.uint64)])
+        self.attempts = np.concatenate([self.attempts, np.zeros(n, dtype=np.int64)])
+        self.correct = np.concatenate([self.correct, np.zeros(n, dtype=np.int64)])
+        self.time_sum = np.concatenate([self.time_sum, np.zeros(n)])
+        self.time_sq_sum = np.concatenate([self.time_sq_sum, np.zeros(n)])
+        self.histogram = np.concatenate([self.histogram, np.zeros((n, self.bins), dtype=np.int64)])
+
+    def update(self, chunk):
+        """
+        1チャンク分のレコードを集計に加える
+
+        Args:
+            chunk: record_dtypeの構造化配列
+        """
+        if self.mode_index is not None:
+            chunk = chunk[chunk["mode"] == self.mode_index]
+        if len(chunk) == 0:
+            return
+        self.records += len(chunk)
+        rows = self._rows(chunk["image_id"])
+        n = len(self._index)
+        self.attempts += np.bincount(rows, minlength=n)
+
+        solved = chunk["correct"] == 1
+        solved_rows = rows[solved]
+        elapsed = chunk["elapsed"][solved].astype(np.float64)
+        self.correct += np.bincount(solved_rows, minlength=n)
+        self.time_sum += np.bincount(solved_rows, weights=elapsed, minlength=n)
+        self.time_sq_sum += np.bincount(solved_rows, weights=elapsed * elapsed, minlength=n)
+
+        # (行, ビン) を1次元のインデックスにしてbincountで一括加算する
+        bins = np.clip((elapsed / self.bin_width).astype(np.int64), 0, self.bins - 1)
+        flat = np.bincount(solved_rows * self.bins + bins, minlength=n * self.bins)
+        self.histogram += flat.reshape(n, self.bins)
+
+    def update_file(self, path, chunk_records=1 << 20):
+        """ログファイル全体を集計に加える"""
+        for chunk in iter_chunks(path, chunk_records):
+            self.update(chunk)
+        return self
+
+    def quantiles(self, qs=(0.5, 0.9)):
+        """
+        画像ごとの解答時間の分位点（ヒストグラムのビン内は線形補間）
+
+        Returns:
+            (画像数, len(qs)) の配列。正解がない画像はNaN
+        """
+        cumulative = np.cumsum(self.histogram, axis=1)
+        totals = cumulative[:, -1]
+        result = np.full((len(totals), len(qs)), np.nan)
+        for j, q in enumerate(qs):
+            target = q * totals
+            # target以上になる最初のビン
+            idx = np.argmax(cumulative >= target[:, None], axis=1)
+            before = np.where(idx > 0, cumulative[np.arange(len(idx)), idx - 1], 0)
+            in_bin = self.histogram[np.arange(len(idx)), idx]
+            frac = np.divide(target - before, in_bin, out=np.zeros(len(idx)), where=in_bin > 0)
+            values = (idx + frac) * self.bin_width
+            result[:, j] = np.where(totals > 0, values, np.nan)
+        return result
+
+    def summary(self, names=None, qs=(0.5, 0.9)):
+        """
+        画像ごとの集計結果
+
+        Args:
+            names: {name_id: ファイル名} の辞書（session_log.load_names）
+            qs: 出力する分位点
+
+        Returns:
+            画像ごとの辞書のリスト
+        """
+        names = names or {}
+        with np.errstate(invalid="ignore", divide="ignore"):
+            accuracy = self.correct / self.attempts
+            mean = self.time_sum / self.correct
+            std = np.sqrt(np.maximum(self.time_sq_sum / self.correct - mean * mean, 0.0))
+        quantiles = self.quantiles(qs)
+
+        def value(x):
+            return None if np.isnan(x) else round(float(x), 3)
+
+        results = []
+        for row, key in enumerate(self._ids.tolist()):
+            entry = {
+                "image": names.get(key, f"{key:016x}"),
+                "attempts": int(self.attempts[row]),
+                "correct": int(self.correct[row]),
+                "accuracy": value(accuracy[row]),
+                "mean_solve_time": value(mean[row]),
+                "std_solve_time": value(std[row]),
+            }
+            for j, q in enumerate(qs):
+                entry[f"p{int(q * 100)}_solve_time"] = value(quantiles[row, j])
+            results.append(entry)
+        return results
+
+
+def print_summary(results, top):
+    """集計結果を表形式で表示"""
+    def fmt(x, suffix=""):
+        return "-" if x is None else f"{x:.2f}{suffix}"
+
+    print(f"{'画像':<32} {'回答数':>8} {'正答率':>8} {'平均':>8} {'p50':>8} {'p90':>8}")
+    for r in results[:top] if top else results:
+        print(f"{r['image'][:32]:<32} {r['attempts']:>8} {fmt(r['accuracy']):>8} "
+              f"{fmt(r['mean_solve_time'], 's'):>8} {fmt(r['p50_solve_time'], 's'):>8} "
+              f"{fmt(r['p90_solve_time'], 's'):>8}")
+
+
+def main(argv=None):
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="セッションイベントログの画像ごとの集計")
+    parser.add_argument("log", nargs="?", default=default_log_path(), help="セッションログのパス")
+    parser.add_argument("--mode", choices=MODES, default=None, help="集計するモード（既定: すべて）")
+    parser.add_argument("--max-time", type=float, default=60.0, help="ヒストグラムの上限（秒）")
+    parser.add_argument("--bin-width", type=float, default=0.25, help="ヒストグラムのビン幅（秒）")
+    parser.add_argument("--chunk", type=int, default=1 << 20, help="1度に読み込むレコード数")
+    parser.add_argument("--sort", choices=["attempts", "accuracy", "mean_solve_time"], default="attempts")
+    parser.add_argument("--top", type=int, default=30, help="表示する画像数（0ですべて）")
+    parser.add_argument("--output", default=None, help="集計結果のJSON出力先")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.log):
+        print(f"セッションログが見つかりません: {args.log}")
+        return 1
+
+    analytics = SessionAnalytics(max_time=args.max_time, bin_width=args.bin_width, mode=args.mode)
+    analytics.update_file(args.log, args.chunk)
+    results = analytics.summary(load_names(args.log))
+    # 未回答の指標（None）は末尾に並べる
+    results.sort(key=lambda r: (r[args.sort] is None, -(r[args.sort] or 0)))
+
+    print(f"レコード数: {analytics.records}  画像数: {len(results)}")
+    print_summary(results, args.top)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"records": analytics.records, "images": results}, f, ensure_ascii=False, indent=2)
+        print(f"集計結果を保存しました: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""
+SessionEventLog - 1問ごとの回答結果を記録する追記専用のバイナリログ
+画像・モード・経過時間・回答・正誤・スコアを固定長40バイトのレコードとして追記し、
+fsyncは一定件数または一定時間ごとにまとめて行う
+
+ファイル形式（リトルエンディアン）:
+    ヘッダー: MAGIC (8バイト)
+    レコード: RECORD_FORMAT (40バイト) の繰り返し
+        timestamp   f8  回答時刻（UNIX時間）
+        image_id    u8  画像ファイル名のハッシュ（name_id）
+        answer_id   u8  回答文字列のハッシュ（name_id）
+        elapsed     f4  経過時間（秒）
+        score       f4  スコア
+        session_id  u4  セッションID（セッション外の回答は0）
+        question    u2  セッション内の問題番号
+        mode        u1  MODESのインデックス
+        correct     u1  正解なら1
+
+画像ファイル名・回答文字列は "<ログファイル>.names" に "16進ID<TAB>文字列" の行で追記する
+（同じIDは1度だけ）。回答文字列は MAX_ANSWER_LENGTH 文字までを記録する
+ログの読み込みは session_analytics.py を参照
+"""
+
+import hashlib
+import os
+import struct
+import threading
+import time
+
+from lazy_import import lazy_import
+
+np = lazy_import("numpy")
+
+
+MAGIC = b"VGISLOG1"
+RECORD_FORMAT = "<dQQffIHBB"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+# レコードにはインデックスで記録するため、新しいモードは末尾に追加する
+MODES = ("blur", "zoom", "hybrid", "pixelate", "tiles", "noise")
+
+# 名前表に追記する回答文字列の最大文字数（任意の長さの回答で名前表が増え続けないようにする）
+MAX_ANSWER_LENGTH = 64
+
+DEFAULT_LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "session_events.bin")
+
+
+def record_dtype():
+    """レコードのnumpy dtype（RECORD_FORMATと同じ配置）"""
+    return np.dtype([
+        ("timestamp", "<f8"),
+        ("image_id", "<u8"),
+        ("answer_id", "<u8"),
+        ("elapsed", "<f4"),
+        ("score", "<f4"),
+        ("session_id", "<u4"),
+        ("question", "<u2"),
+        ("mode", "u1"),
+        ("correct", "u1"),
+    ])
+
+
+def name_id(text):
+    """文字列の64ビットID（blake2b）"""
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def names_path(path):
+    """名前表のパス"""
+    return path + ".names"
+
+
+def load_names(path):
+    """
+    名前表を読み込む
+
+    Returns:
+        {name_id: 文字列} の辞書
+    """
+    names = {}
+    try:
+        with open(names_path(path), "r", encoding="utf-8") as f:
+            for line in f:
+                key, sep, text = line.rstrip("\n").partition("\t")
+                if sep:
+                    names[int(key, 16)] = text
+    except FileNotFoundError:
+        pass
+    return names
+
+
+def default_log_path():
+    """ログの既定パス（環境変数 VGI_SESSION_LOG で変更、空文字の場合は記録しない）"""
+    return os.environ.get("VGI_SESSION_LOG", DEFAULT_LOG_PATH)
+
+
+class SessionEventLog:
+    """追記専用のセッションイベントログクラス"""
+
+    def __init__(self, path, sync_every=64, sync_interval=5.0):
+        """
+        初期化（ファイルは最初の記録時に開く）
+
+        Args:
+            path: ログファイルのパス
+            sync_every: この件数ごとにfsyncする
+            sync_interval: 前回のfsyncからこの秒数が経過していれば件数に関わらずfsyncする
+        """
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._file = None
+        self._names_file = None
+        self._known_names = set()
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+        self.records_written = 0
+        self.syncs = 0
+
+    def _open(self):
+        """ログファイルを開く（途中で書き込みが中断したレコードは切り詰める）"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "ab")
+        size = self._file.tell()
+        if size < len(MAGIC):
+            self._file.truncate(0)
+            self._file.write(MAGIC)
+        else:
+            torn = (size - len(MAGIC)) % RECORD_SIZE
+            if torn:
+                self._file.truncate(size - torn)
+        self._known_names = set(load_names(self.path))
+        self._names_file = open(names_path(self.path), "a", encoding="utf-8")
+
+    def _name(self, text):
+        """文字列のIDを取得し、未登録なら名前表に追記"""
+        key = name_id(text)
+        if key not in self._known_names:
+            self._known_names.add(key)
+            # 改行・タブは名前表の区切りと衝突するため空白に置き換える
+            clean = text.replace("\t", " ").replace("\n", " ")
+            self._names_file.write(f"{key:016x}\t{clean}\n")
+        return key
+
+    def record(self, image_path, mode, elapsed, answer, correct, score, session_id=0, question=0,
+               timestamp=None):
+        """
+        1問分の結果を追記
+
+        Args:
+            image_path: 画像ファイルのパス（ファイル名で記録する）
+            mode: ゲームモード
+            elapsed: 経過時間（秒）
+            answer: プレイヤーの回答（MAX_ANSWER_LENGTH文字に切り詰める）
+            correct: 正解かどうか
+            score: スコア
+            session_id: セッションID（セッション外は0）
+            question: セッション内の問題番号
+            timestamp: 回答時刻（Noneの場合は現在時刻）
+        """
+        with self._lock:
+            if self._file is None:
+                self._open()
+            data = struct.pack(
+                RECORD_FORMAT,
+                time.time() if timestamp is None else timestamp,
+                self._name(os.path.basename(image_path)),
+                self._name(str(answer)[:MAX_ANSWER_LENGTH]),
+                elapsed,
+                score,
+                session_id & 0xFFFFFFFF,
+                min(question, 0xFFFF),
+                MODES.index(mode) if mode in MODES else 0xFF,
+                1 if correct else 0,
+            )
+            self._file.write(data)
+            self.records_written += 1
+            self._pending += 1
+            if (self._pending >= self.sync_every
+                    or time.monotonic() - self._last_sync >= self.sync_interval):
+                self._sync()
+
+    def _sync(self):
+        """バッファを書き出してfsync（ロック取得済みで呼ぶ）"""
+        if self._file is None:
+            return
+        self._names_file.flush()
+        self._file.flush()
+        # 名前表を先に永続化し、レコードが参照する名前が失われないようにする
+        os.fsync(self._names_file.fileno())
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self.syncs += 1
+
+    def flush(self):
+        """未同期のレコードをfsync（セッション終了時などに呼ぶ）"""
+        with self._lock:
+            if self._pending:
+                self._sync()
+
+    def close(self):
+        """fsyncしてファイルを閉じる"""
+        with self._lock:
+            if self._file is None:
+                return
+            self._sync()
+            self._file.close()
+            self._names_file.close()
+            self._file = None
+            self._names_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
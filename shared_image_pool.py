@@ -0,0 +1,226 @@
+"""
+SharedImagePool - 共有メモリによるデコード済み画像プール
+デコード済みの画像（original_image）を共有メモリに1度だけ置き、
+描画ワーカープロセスはハンドルからnumpyビューとして参照する（フレームごとのコピー不要）
+
+- SharedImagePool: 所有側（サーバープロセス）。参照カウントと上限バイト数による削除を管理
+- attach_image: 利用側（ワーカープロセス）。ハンドルから読み取り専用のビューを取得
+"""
+
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from multiprocessing import shared_memory
+
+from frame_cache import attach_shared_memory
+from lazy_import import lazy_import
+
+np = lazy_import("numpy")
+
+
+# プロセス間で受け渡す軽量なハンドル（pickleしても数十バイト）
+ImageHandle = namedtuple("ImageHandle", ["name", "shape", "dtype", "key"])
+
+
+class _PoolEntry:
+    """プール内の1画像"""
+
+    __slots__ = ("shm", "handle", "refcount", "nbytes")
+
+    def __init__(self, shm, handle, nbytes):
+        self.shm = shm
+        self.handle = handle
+        self.refcount = 0
+        self.nbytes = nbytes
+
+
+class SharedImagePool:
+    """共有メモリ画像プールクラス"""
+
+    def __init__(self, max_bytes=512 * 1024 * 1024, prefix="vgi"):
+        """
+        初期化
+
+        Args:
+            max_bytes: プール全体の上限バイト数（参照中の画像は上限を超えても削除しない）
+            prefix: 共有メモリ名の接頭辞
+        """
+        self.max_bytes = max_bytes
+        self.prefix = prefix
+        self._entries = OrderedDict()  # key -> _PoolEntry
+        self._lock = threading.Lock()
+        self._serial = 0
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # MemoryBudgetに登録した場合に設定される（追加のたびに全体の上限を確認する）
+        self.memory_budget = None
+
+    def acquire(self, key):
+        """
+        登録済みの画像のハンドルを取得して参照カウントを増やす
+
+        Returns:
+            ImageHandle。未登録の場合はNone
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            entry.refcount += 1
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.handle
+
+    def put(self, key, image):
+        """
+        画像を共有メモリにコピーして登録し、参照カウントを1にしたハンドルを返す
+        既に登録済みの場合は既存のハンドルの参照カウントを増やして返す
+
+        Args:
+            key: 画像のキー（画像パスなど）
+            image: numpy配列
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.refcount += 1
+                self._entries.move_to_end(key)
+                return entry.handle
+            self._serial += 1
+            name = f"{self.prefix}{os.getpid()}_{self._serial}"
+
+        image = np.ascontiguousarray(image)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=max(1, image.nbytes))
+        view = np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf)
+        view[...] = image
+        del view
+        handle = ImageHandle(name, tuple(image.shape), image.dtype.str, key)
+
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                # 別スレッドが先に登録した場合はそちらを使う
+                shm.close()
+                shm.unlink()
+                existing.refcount += 1
+                return existing.handle
+            entry = _PoolEntry(shm, handle, image.nbytes)
+            entry.refcount = 1
+            self._entries[key] = entry
+            self.current_bytes += image.nbytes
+            self._evict_unreferenced()
+        if self.memory_budget is not None:
+            self.memory_budget.enforce()
+        return handle
+
+    def release(self, handle_or_key):
+        """参照カウントを減らす（0になった画像は上限超過時に削除対象になる）"""
+        key = handle_or_key.key if isinstance(handle_or_key, ImageHandle) else handle_or_key
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.refcount > 0:
+                entry.refcount -= 1
+            self._evict_unreferenced()
+
+    def _evict_unreferenced(self, target=None):
+        """参照されていない画像を古い順に削除（ロック取得済みで呼ぶ）"""
+        limit = self.max_bytes if target is None else target
+        freed = 0
+        for key in list(self._entries):
+            if self.current_bytes <= limit:
+                break
+            entry = self._entries[key]
+            if entry.refcount > 0:
+                continue
+            del self._entries[key]
+            self.current_bytes -= entry.nbytes
+            freed += entry.nbytes
+            self.evictions += 1
+            entry.shm.close()
+            try:
+                entry.shm.unlink()
+            except FileNotFoundError:
+                pass
+        return freed
+
+    def evict_bytes(self, nbytes):
+        """参照されていない画像を指定バイト数以上解放"""
+        with self._lock:
+            return self._evict_unreferenced(max(0, self.current_bytes - nbytes))
+
+    def close(self):
+        """すべての共有メモリを削除"""
+        with self._lock:
+            for entry in self._entries.values():
+                entry.shm.close()
+                try:
+                    entry.shm.unlink()
+                except FileNotFoundError:
+                    pass
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def get_stats(self):
+        """プールの統計"""
+        with self._lock:
+            referenced = sum(1 for e in self._entries.values() if e.refcount > 0)
+        return {
+            "images": len(self._entries),
+            "referenced": referenced,
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# ---------------------------------------------------------------------------
+# 利用側（ワーカープロセス）
+# ---------------------------------------------------------------------------
+
+_attached = OrderedDict()  # 共有メモリ名 -> (SharedMemory, ndarray)
+MAX_ATTACHED = 64
+
+
+def attach_image(handle):
+    """
+    ハンドルから共有メモリ上の画像を読み取り専用のnumpyビューとして取得
+
+    接続はプロセス内でLRUとして保持し、フレームごとに再接続しない
+    所有側が削除（unlink）した後も、接続済みのビューは閉じるまで有効
+    """
+    cached = _attached.get(handle.name)
+    if cached is not None:
+        _attached.move_to_end(handle.name)
+        return cached[1]
+
+    shm = attach_shared_memory(handle.name)
+    image = np.ndarray(handle.shape, dtype=np.dtype(handle.dtype), buffer=shm.buf)
+    image.flags.writeable = False
+    _attached[handle.name] = (shm, image)
+    while len(_attached) > MAX_ATTACHED:
+        _, (old_shm, _old_image) = _attached.popitem(last=False)
+        del _old_image
+        _close_quietly(old_shm)
+    return image
+
+
+def detach_image(handle):
+    """attach_imageで接続した共有メモリを切断"""
+    cached = _attached.pop(handle.name, None)
+    if cached is not None:
+        shm, image = cached
+        del image
+        _close_quietly(shm)
+
+
+def _close_quietly(shm):
+    """ビューが残っていて閉じられない場合はGCに任せる"""
+    try:
+        shm.close()
+    except BufferError:
+        pass
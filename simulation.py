@@ -0,0 +1,462 @@
+"""
+Simulation - GUIなしでプレイヤーの行動を再現する決定的なシミュレーションハーネス
+GameEngine・DatasetLoader・TimerControllerを仮想時計とシード付き乱数で動かし、
+多数のプレイヤーのプレイを実時間より速く再現する（容量計画用）
+
+プレイヤーの行動:
+    合成: プレイヤーごとに正答率と解答の速さを乱数で決め、問題ごとの解答時間と正誤を生成する
+    再生: セッションイベントログ（session_log.py）の回答を、セッションIDごとに1人のプレイヤーとして再生する
+
+各プレイヤーについて、描画のCPU時間・メモリ使用量（RSS、オプションでtracemallocのピーク）・
+フレームキャッシュのヒット率・差分描画の省略率を集計する。
+同じシードと引数であれば問題の選択・解答・スコアは毎回同じになる（digestで確認できる）
+
+使い方:
+    python simulation.py --players 1000 --questions 5 --mode hybrid --seed 1
+    python simulation.py --players 200 --frame-cache-mb 256 --incremental-threshold 0.5
+    python simulation.py --replay logs/session_events.bin --output sim.json
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+from dataset_index import DatasetIndex
+from dataset_loader import DatasetLoader
+from effect_modes import mode_names
+from game_engine import GameEngine
+from label_loader import LabelLoader
+from load_test import percentile
+from memory_budget import create_budget
+from memory_monitor import current_rss
+from session_log import MODES, SessionEventLog, load_names
+from timer_controller import TimerController
+
+# 仮想時計の開始時刻（ログに記録するタイムスタンプを毎回同じにする）
+VIRTUAL_EPOCH = 1_700_000_000.0
+WRONG_ANSWER = "__simulated_wrong__"
+
+
+class VirtualClock:
+    """手動で進める時計（TimerControllerのclockに渡す）"""
+
+    def __init__(self, start=VIRTUAL_EPOCH):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        """時計を進める"""
+        self.now += seconds
+
+
+class SyntheticPlayer:
+    """乱数で解答時間と正誤を決めるプレイヤー"""
+
+    def __init__(self, player_id, seed, accuracy=0.7, answer_fraction=0.5, mode="blur"):
+        """
+        初期化
+
+        Args:
+            player_id: プレイヤー番号
+            seed: シミュレーション全体のシード（プレイヤー番号と組み合わせて使う）
+            accuracy: 正答率の平均
+            answer_fraction: 解答時間（制限時間に対する割合）の平均
+            mode: ゲームモード
+        """
+        self.player_id = player_id
+        self.mode = mode
+        # プレイヤーごとに独立した乱数列（他のプレイヤーの数に影響されない）
+        self.rng = random.Random(f"{seed}:{player_id}")
+        self.accuracy = min(1.0, max(0.0, self.rng.gauss(accuracy, 0.1)))
+        self.speed = min(1.0, max(0.05, self.rng.gauss(answer_fraction, 0.15)))
+
+    def questions(self, count):
+        """
+        出題する問題の数だけ (画像パス, モード) を返す（画像パスがNoneの場合はランダムに選ぶ）
+        """
+        return [(None, self.mode)] * count
+
+    def respond(self, engine, question):
+        """
+        問題への解答を決める
+
+        Returns:
+            (解答までの秒数, 解答文字列) のタプル
+        """
+        fraction = self.rng.lognormvariate(math.log(self.speed), 0.3)
+        answer_time = engine.time_limit * min(1.0, max(0.02, fraction))
+        if self.rng.random() < self.accuracy:
+            return answer_time, engine.get_display_answer()
+        return answer_time, WRONG_ANSWER
+
+
+class ReplayPlayer:
+    """セッションイベントログの回答を再生するプレイヤー"""
+
+    def __init__(self, player_id, records, default_mode="blur"):
+        """
+        初期化
+
+        Args:
+            player_id: プレイヤー番号（セッションID）
+            records: (画像パス, モード, 経過時間, 回答) のリスト（回答順）
+            default_mode: ログのモードが不明な場合のモード
+        """
+        self.player_id = player_id
+        self.records = records
+        self.default_mode = default_mode
+
+    def questions(self, count):
+        """ログに記録された問題を順に返す（countは上限）"""
+        return [(path, mode or self.default_mode) for path, mode, _, _ in self.records[:count]]
+
+    def respond(self, engine, question):
+        """ログに記録された解答時間と回答"""
+        _, _, elapsed, answer = self.records[question]
+        return elapsed, answer
+
+
+def load_replay_players(log_path, image_paths, max_players=None, default_mode="blur"):
+    """
+    セッションイベントログからセッションごとのプレイヤーを作成
+
+    Args:
+        log_path: セッションログのパス
+        image_paths: データセットの画像パスのリスト（ログの画像ファイル名と照合する）
+        max_players: 作成するプレイヤー数の上限
+        default_mode: ログのモードが不明な場合のモード
+
+    Returns:
+        ReplayPlayerのリスト（セッションID順）。データセットにない画像の回答は除く
+    """
+    from session_analytics import iter_chunks
+
+    names = load_names(log_path)
+    by_name = {os.path.basename(path): path for path in image_paths}
+    sessions = {}
+    for chunk in iter_chunks(log_path):
+        for record in chunk.tolist():
+            timestamp, image_id, answer_id, elapsed, _, session_id, question, mode, _ = record
+            path = by_name.get(names.get(image_id))
+            if path is None:
+                continue
+            mode_name = MODES[mode] if mode < len(MODES) else None
+            sessions.setdefault(session_id, []).append(
+                (timestamp, question, path, mode_name, float(elapsed), names.get(answer_id, ""))
+            )
+
+    players = []
+    for session_id in sorted(sessions):
+        records = sorted(sessions[session_id], key=lambda r: (r[0], r[1]))
+        players.append(ReplayPlayer(session_id, [r[2:] for r in records], default_mode))
+        if max_players is not None and len(players) >= max_players:
+            break
+    return players
+
+
+class Simulation:
+    """シミュレーション実行クラス"""
+
+    def __init__(self, dataset_loader, label_loader=None, tick=0.1, time_limit=30.0,
+                 frame_cache=None, incremental_threshold=None, layout="rgb", dataset_index=None,
+                 event_log=None, trace_memory=False, memory_budget=None):
+        """
+        初期化
+
+        Args:
+            dataset_loader: シード付きのDatasetLoader
+            label_loader: LabelLoader（Noneの場合は新規作成）
+            tick: 画面更新の間隔（秒、GameScreenのタイマーと同じ100ms）
+            time_limit: 制限時間（較正済みの画像はdataset_indexの値）
+            frame_cache: プレイヤー間で共有するFrameCache（オプション）
+            incremental_threshold: GameEngineの差分描画のしきい値（オプション）
+            layout: 内部の画素レイアウト
+            dataset_index: 較正結果のDatasetIndex（オプション）
+            event_log: 回答を記録するSessionEventLog（オプション、仮想時計の時刻で記録）
+            trace_memory: Trueの場合、tracemallocでプレイヤーごとのピークを計測（低速）
+            memory_budget: フレームキャッシュとデコード済み画像を計上するMemoryBudget（オプション）
+        """
+        self.dataset_loader = dataset_loader
+        self.label_loader = label_loader or LabelLoader()
+        self.tick = tick
+        self.time_limit = time_limit
+        self.frame_cache = frame_cache
+        self.incremental_threshold = incremental_threshold
+        self.layout = layout
+        self.dataset_index = dataset_index
+        self.event_log = event_log
+        self.trace_memory = trace_memory
+        self.memory_budget = memory_budget
+        if memory_budget is not None and frame_cache is not None:
+            memory_budget.register("frames", frame_cache)
+        self.clock = VirtualClock()
+        self.timer = TimerController(clock=self.clock)
+        self._digest = hashlib.blake2b(digest_size=8)
+
+    def _cache_counts(self):
+        """フレームキャッシュのヒット数と参照数"""
+        if self.frame_cache is None:
+            return 0, 0
+        stats = self.frame_cache.get_stats()
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"] + stats["shared_hits"]
+        return lookups - stats["misses"], lookups
+
+    def play(self, player, question_count):
+        """
+        1人のプレイヤーのセッションを再現
+
+        Returns:
+            プレイヤーの集計結果の辞書
+        """
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        hits_before, lookups_before = self._cache_counts()
+        used_images = set()
+        frame_cpu = []
+        load_cpu = 0.0
+        rendered = skipped = correct = 0
+        total_score = 0.0
+        simulated = 0.0
+
+        for question, (image_path, mode) in enumerate(player.questions(question_count)):
+            if image_path is None:
+                image_path = self.dataset_loader.get_random_image(exclude=used_images)
+                if image_path is None:
+                    break
+            used_images.add(image_path)
+
+            start_cpu = time.process_time()
+            engine = GameEngine(
+                image_path, mode, time_limit=self.time_limit, label_loader=self.label_loader,
+                frame_cache=self.frame_cache, layout=self.layout,
+                incremental_threshold=self.incremental_threshold, dataset_index=self.dataset_index,
+                memory_budget=self.memory_budget,
+            )
+            load_cpu += time.process_time() - start_cpu
+            answer_time, answer = player.respond(engine, question)
+
+            # GameScreenと同じく、開始直後とtickごとに描画する
+            # （tick数は整数で数え、浮動小数点の誤差で終わらなくならないようにする）
+            self.timer.start()
+            shown = 0.0
+            for step in range(int(math.ceil(answer_time / self.tick)) + 1):
+                target = min(step * self.tick, answer_time)
+                self.clock.advance(target - shown)
+                shown = target
+                start_cpu = time.process_time()
+                engine.get_processed_image(self.timer.get_elapsed_time())
+                frame_cpu.append(time.process_time() - start_cpu)
+
+            self.timer.stop()
+            elapsed = self.timer.get_elapsed_time()
+            is_correct, _ = engine.check_answer(answer)
+            score = engine.calculate_score(elapsed) if is_correct else 0.0
+            correct += is_correct
+            total_score += score
+            simulated += elapsed
+            rendered += engine.render_stats["rendered"]
+            skipped += engine.render_stats["skipped"]
+            self._digest.update(
+                f"{player.player_id}|{os.path.basename(image_path)}|{mode}|{answer}|{score:.2f}\n".encode("utf-8")
+            )
+            if self.event_log is not None:
+                self.event_log.record(
+                    image_path, mode, elapsed, answer, is_correct, score,
+                    session_id=player.player_id, question=question + 1, timestamp=self.clock(),
+                )
+
+        hits, lookups = self._cache_counts()
+        hits -= hits_before
+        lookups -= lookups_before
+        frames = rendered + skipped
+        result = {
+            "player": player.player_id,
+            "questions": len(used_images),
+            "correct": correct,
+            "score": round(total_score, 2),
+            "simulated_seconds": round(simulated, 3),
+            "frames": frames,
+            "rendered": rendered,
+            "skip_ratio": skipped / frames if frames else 0.0,
+            "load_cpu_ms": load_cpu * 1000,
+            "render_cpu_ms": sum(frame_cpu) * 1000,
+            "frame_cpu_p50_ms": percentile(frame_cpu, 50) * 1000,
+            "frame_cpu_p95_ms": percentile(frame_cpu, 95) * 1000,
+            "cache_lookups": lookups,
+            "cache_hit_rate": hits / lookups if lookups else None,
+            "rss_bytes": current_rss(),
+        }
+        if self.trace_memory:
+            result["traced_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        return result
+
+    def run(self, players, question_count):
+        """
+        全プレイヤーのセッションを順に再現
+
+        Args:
+            players: SyntheticPlayer・ReplayPlayerのリスト
+            question_count: 1人あたりの問題数（再生の場合は上限）
+
+        Returns:
+            {'meta', 'players', 'summary'} の辞書
+        """
+        if self.trace_memory:
+            tracemalloc.start()
+        start_clock = self.clock()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            results = [self.play(player, question_count) for player in players]
+        finally:
+            if self.trace_memory:
+                tracemalloc.stop()
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        simulated = self.clock() - start_clock
+        if self.event_log is not None:
+            self.event_log.flush()
+        return {
+            "meta": {
+                "tick": self.tick,
+                "time_limit": self.time_limit,
+                "layout": self.layout,
+                "incremental_threshold": self.incremental_threshold,
+                "frame_cache": self.frame_cache is not None,
+            },
+            "players": results,
+            "summary": summarize(results, wall, cpu, simulated, self._digest.hexdigest(),
+                                 self.frame_cache, self.memory_budget),
+        }
+
+
+def summarize(results, wall_seconds, cpu_seconds, simulated_seconds, digest, frame_cache=None,
+              memory_budget=None):
+    """全プレイヤーの結果を集計"""
+    render_cpu = [r["render_cpu_ms"] for r in results]
+    questions = sum(r["questions"] for r in results)
+    frames = sum(r["frames"] for r in results)
+    summary = {
+        "players": len(results),
+        "questions": questions,
+        "accuracy": sum(r["correct"] for r in results) / questions if questions else 0.0,
+        "frames": frames,
+        "skip_ratio": sum(r["frames"] - r["rendered"] for r in results) / frames if frames else 0.0,
+        "wall_seconds": wall_seconds,
+        "cpu_seconds": cpu_seconds,
+        "simulated_seconds": simulated_seconds,
+        "speedup": simulated_seconds / wall_seconds if wall_seconds > 0 else 0.0,
+        "render_cpu_ms_per_player_p50": percentile(render_cpu, 50),
+        "render_cpu_ms_per_player_p95": percentile(render_cpu, 95),
+        "render_cpu_ms_per_simulated_second": (
+            sum(render_cpu) / simulated_seconds if simulated_seconds > 0 else 0.0
+        ),
+        "peak_rss_bytes": max((r["rss_bytes"] for r in results), default=current_rss()),
+        "digest": digest,
+    }
+    if frame_cache is not None:
+        summary["frame_cache"] = frame_cache.get_stats()
+    if memory_budget is not None:
+        summary["memory_budget"] = memory_budget.get_stats()
+    return summary
+
+
+def print_summary(report):
+    """集計結果を表示"""
+    s = report["summary"]
+    print(f"プレイヤー {s['players']} 人 / 問題 {s['questions']} 問 / フレーム {s['frames']} "
+          f"（省略率 {s['skip_ratio']:.1%}、正答率 {s['accuracy']:.1%}）")
+    print(f"仮想時間 {s['simulated_seconds']:.1f}s を {s['wall_seconds']:.1f}s で再現（{s['speedup']:.1f}倍速）、"
+          f"CPU {s['cpu_seconds']:.1f}s")
+    print(f"描画CPU時間/プレイヤー p50={s['render_cpu_ms_per_player_p50']:.1f}ms "
+          f"p95={s['render_cpu_ms_per_player_p95']:.1f}ms  "
+          f"仮想1秒あたり {s['render_cpu_ms_per_simulated_second']:.2f}ms")
+    print(f"RSSピーク {s['peak_rss_bytes'] / 1024 / 1024:.1f}MB")
+    if "frame_cache" in s:
+        print(f"フレームキャッシュ ヒット率 {s['frame_cache']['hit_rate']:.1%}")
+    if "memory_budget" in s:
+        budget = s["memory_budget"]
+        usage = "  ".join(f"{name} {c['bytes'] / 1024 / 1024:.1f}MB（解放 {c['evicted_bytes'] / 1024 / 1024:.1f}MB）"
+                          for name, c in budget["components"].items())
+        print(f"メモリ予算 {budget['used_bytes'] / 1024 / 1024:.1f}/{budget['max_bytes'] / 1024 / 1024:.0f}MB  {usage}")
+    print(f"digest {s['digest']}")
+
+
+def main(argv=None):
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="GUIなしのプレイヤーシミュレーション")
+    parser.add_argument("--images-dir", default="images")
+    parser.add_argument("--labels", default="labels.json")
+    parser.add_argument("--dataset-index", help="較正結果のデータセットインデックス（制限時間・表示カーブ）")
+    parser.add_argument("--players", type=int, default=100, help="プレイヤー数（再生の場合は上限）")
+    parser.add_argument("--questions", type=int, default=5, help="1人あたりの問題数")
+    parser.add_argument("--mode", choices=mode_names(), default="blur")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tick", type=float, default=0.1, help="画面更新の間隔（秒）")
+    parser.add_argument("--time-limit", type=float, default=30.0)
+    parser.add_argument("--accuracy", type=float, default=0.7, help="合成プレイヤーの正答率の平均")
+    parser.add_argument("--answer-fraction", type=float, default=0.5,
+                        help="合成プレイヤーの解答時間（制限時間に対する割合）の平均")
+    parser.add_argument("--replay", help="再生するセッションイベントログ（指定しない場合は合成プレイヤー）")
+    parser.add_argument("--frame-cache-mb", type=int, default=0, help="プレイヤー間で共有するフレームキャッシュ（0: なし）")
+    parser.add_argument("--incremental-threshold", type=float, default=None,
+                        help="差分描画のしきい値（表示上の変化量、画素。キオスクは0.5）")
+    parser.add_argument("--memory-budget-mb", type=int, default=0,
+                        help="フレームキャッシュとデコード済み画像の合計の上限（0: 制限しない）")
+    parser.add_argument("--layout", default="rgb")
+    parser.add_argument("--trace-memory", action="store_true", help="tracemallocでプレイヤーごとのピークを計測")
+    parser.add_argument("--event-log", help="シミュレーション結果を記録するセッションログのパス")
+    parser.add_argument("--output", help="集計結果のJSON出力先")
+    args = parser.parse_args(argv)
+
+    dataset_loader = DatasetLoader(args.images_dir, seed=args.seed)
+    if dataset_loader.get_image_count() == 0:
+        print(f"画像が見つかりません: {args.images_dir}")
+        return 1
+
+    if args.replay:
+        players = load_replay_players(args.replay, dataset_loader.get_all_images(), args.players, args.mode)
+    else:
+        players = [
+            SyntheticPlayer(i + 1, args.seed, args.accuracy, args.answer_fraction, args.mode)
+            for i in range(args.players)
+        ]
+
+    frame_cache = None
+    if args.frame_cache_mb > 0:
+        from frame_cache import FrameCache
+
+        frame_cache = FrameCache(max_bytes=args.frame_cache_mb * 1024 * 1024)
+
+    event_log = SessionEventLog(args.event_log) if args.event_log else None
+    simulation = Simulation(
+        dataset_loader, LabelLoader(args.labels), tick=args.tick, time_limit=args.time_limit,
+        frame_cache=frame_cache, incremental_threshold=args.incremental_threshold, layout=args.layout,
+        dataset_index=DatasetIndex(args.dataset_index) if args.dataset_index else None,
+        event_log=event_log, trace_memory=args.trace_memory,
+        memory_budget=create_budget(args.memory_budget_mb * 1024 * 1024 if args.memory_budget_mb > 0 else None),
+    )
+    try:
+        report = simulation.run(players, args.questions)
+    finally:
+        if event_log is not None:
+            event_log.close()
+    report["meta"].update(seed=args.seed, mode=args.mode, replay=args.replay)
+
+    print_summary(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+SoakTest - GUIなしで数千問を連続で出題し、メモリ使用量が増え続けないことを確認する
+simulation.pyのプレイヤーで問題を解き続け、一定問題数ごとにMemoryMonitorで記録する。
+ウォームアップ後の記録について、問題数に対するRSSとtracemallocの使用量の傾き（最小二乗法）から
+実行全体での増加量を推定し、上限を超えた場合や、生存しているGameEngineが増え続けた場合は失敗とする
+
+使い方:
+    python soak_test.py --questions 2000 --mode pixelate
+    python soak_test.py --questions 5000 --sample-every 100 --max-growth-mb 16 --output logs/soak.jsonl
+"""
+
+import argparse
+import sys
+
+from dataset_loader import DatasetLoader
+from effect_modes import mode_names
+from label_loader import LabelLoader
+from memory_monitor import MemoryMonitor
+from simulation import Simulation, SyntheticPlayer
+
+MB = 1024 * 1024
+
+
+def slope(xs, ys):
+    """最小二乗法の傾き（点が2つ未満、またはxが一定の場合は0）"""
+    n = len(xs)
+    if n < 2:
+        return 0.0
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    var = sum((x - mean_x) ** 2 for x in xs)
+    if var == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var
+
+
+def check_flat(samples, warmup, max_growth_bytes, max_engines=2):
+    """
+    記録した時系列からメモリが増え続けていないか判定
+
+    Args:
+        samples: MemoryMonitorの記録（labelは回答済みの問題数）
+        warmup: 判定に使わない最初の問題数（キャッシュが埋まるまで）
+        max_growth_bytes: 許容する増加量（傾き × 判定対象の問題数）
+        max_engines: 生存しているGameEngineの上限
+
+    Returns:
+        (成功したか, 判定結果の辞書) のタプル
+    """
+    points = [s for s in samples if isinstance(s["label"], int) and s["label"] >= warmup]
+    if len(points) < 3:
+        return False, {"error": "判定に必要な記録がありません（問題数を増やすか、sample-everyを小さくしてください）"}
+    questions = [s["label"] for s in points]
+    span = questions[-1] - questions[0]
+    result = {"samples": len(points), "questions": span}
+    ok = True
+    for key in ("rss", "traced_current", "ndarray_bytes"):
+        per_question = slope(questions, [s[key] for s in points])
+        growth = per_question * span
+        result[key] = {
+            "first": points[0][key],
+            "last": points[-1][key],
+            "bytes_per_question": per_question,
+            "projected_growth": growth,
+            "ok": growth <= max_growth_bytes,
+        }
+        ok = ok and result[key]["ok"]
+    engines = max(s["objects"].get("GameEngine", 0) for s in points)
+    result["max_live_engines"] = engines
+    result["engines_ok"] = engines <= max_engines
+    return ok and result["engines_ok"], result
+
+
+def main(argv=None):
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="長時間連続プレイでのメモリ増加の確認")
+    parser.add_argument("--images-dir", default="images")
+    parser.add_argument("--labels", default="labels.json")
+    parser.add_argument("--questions", type=int, default=2000, help="出題する問題数")
+    parser.add_argument("--mode", choices=mode_names(), default="pixelate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tick", type=float, default=0.5, help="描画の間隔（仮想時間の秒）")
+    parser.add_argument("--time-limit", type=float, default=30.0)
+    parser.add_argument("--incremental-threshold", type=float, default=None)
+    parser.add_argument("--sample-every", type=int, default=50, help="記録する問題数の間隔")
+    parser.add_argument("--warmup", type=int, default=200, help="判定に使わない最初の問題数")
+    parser.add_argument("--max-growth-mb", type=float, default=16.0, help="許容する増加量（MB）")
+    parser.add_argument("--top", type=int, default=5, help="記録する割り当て箇所の数")
+    parser.add_argument("--output", help="時系列の出力先（JSON Lines）")
+    args = parser.parse_args(argv)
+
+    dataset_loader = DatasetLoader(args.images_dir, seed=args.seed)
+    if dataset_loader.get_image_count() == 0:
+        print(f"画像が見つかりません: {args.images_dir}")
+        return 1
+
+    simulation = Simulation(
+        dataset_loader, LabelLoader(args.labels), tick=args.tick, time_limit=args.time_limit,
+        incremental_threshold=args.incremental_threshold,
+    )
+    monitor = MemoryMonitor(args.output, top=args.top, collect=True).start()
+    # プレイヤーは使用済みの画像を除いて出題するため、1人あたりの問題数は画像数まで
+    per_player = max(1, min(args.sample_every, dataset_loader.get_image_count()))
+    answered = 0
+    next_sample = 0
+    player_id = 0
+    try:
+        while answered < args.questions:
+            player_id += 1
+            player = SyntheticPlayer(player_id, args.seed, mode=args.mode)
+            result = simulation.play(player, min(per_player, args.questions - answered))
+            answered += result["questions"]
+            if answered >= next_sample:
+                record = monitor.sample(answered)
+                next_sample = answered + args.sample_every
+                print(f"{answered:6d}問  RSS {record['rss'] / MB:7.1f}MB  "
+                      f"traced {record['traced_current'] / MB:6.1f}MB  "
+                      f"ndarray {record['objects']['ndarray']}個/{record['ndarray_bytes'] / MB:.1f}MB  "
+                      f"GameEngine {record['objects']['GameEngine']}")
+    finally:
+        monitor.close()
+
+    ok, result = check_flat(monitor.samples, args.warmup, args.max_growth_mb * MB)
+    if "error" in result:
+        print(result["error"])
+        return 1
+    for key in ("rss", "traced_current", "ndarray_bytes"):
+        r = result[key]
+        print(f"{key}: {r['first'] / MB:.1f}MB -> {r['last'] / MB:.1f}MB  "
+              f"推定増加 {r['projected_growth'] / MB:+.2f}MB（{r['bytes_per_question']:+.0f}B/問）"
+              f"{'' if r['ok'] else '  ← 上限超過'}")
+    print(f"生存GameEngine最大 {result['max_live_engines']}{'' if result['engines_ok'] else '  ← 増加'}")
+    print("OK: メモリ使用量は一定です" if ok else "NG: メモリ使用量が増加しています")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+StartupReport - 起動時のインポート時間レポート
+`python -X importtime` の出力を集計し、起動時に読み込まれるモジュールとその時間を表示する
+
+使い方:
+    python startup_report.py                       # main.py の起動時インポートを集計
+    python startup_report.py --output startup.json
+    python startup_report.py --baseline startup.json --threshold 0.20
+    python startup_report.py --forbid cv2,numpy    # 起動時に読み込まれてはいけないモジュール
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+
+def measure_imports(module="main", python=None):
+    """
+    指定モジュールのインポート時間を計測
+
+    Args:
+        module: インポートするモジュール名
+        python: 使用するPythonインタプリタ（既定: 現在のインタプリタ）
+
+    Returns:
+        (エントリのリスト, エラーメッセージ) のタプル
+        エントリは {'module', 'self_us', 'cumulative_us', 'depth'} の辞書
+    """
+    command = [python or sys.executable, "-X", "importtime", "-c", f"import {module}"]
+    proc = subprocess.run(command, capture_output=True, text=True)
+
+    entries = []
+    errors = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            errors.append(line)
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # ヘッダー行
+        name = parts[2].rstrip()
+        entries.append({
+            "module": name.strip(),
+            "self_us": int(parts[0]),
+            "cumulative_us": int(parts[1]),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+        })
+
+    error = "\n".join(errors).strip() if proc.returncode != 0 else ""
+    return entries, error
+
+
+def summarize(entries, module="main", top=15):
+    """
+    計測結果を集計
+
+    Args:
+        entries: measure_importsのエントリ
+        module: 計測対象モジュール名
+        top: 表示する上位件数
+
+    Returns:
+        集計結果の辞書
+    """
+    total_us = sum(e["self_us"] for e in entries)
+    target = next((e for e in entries if e["module"] == module), None)
+    roots = [e for e in entries if e["depth"] == 0]
+    return {
+        "module": module,
+        "total_us": total_us,
+        "target_cumulative_us": target["cumulative_us"] if target else 0,
+        "module_count": len(entries),
+        "top_level": sorted(
+            ({"module": e["module"], "cumulative_us": e["cumulative_us"]} for e in roots),
+            key=lambda e: e["cumulative_us"], reverse=True,
+        )[:top],
+        "imported": sorted({e["module"] for e in entries}),
+    }
+
+
+def find_forbidden(summary, forbidden):
+    """起動時に読み込まれてはいけないモジュールのうち、実際に読み込まれたものを返す"""
+    imported = set(summary["imported"])
+    return [
+        name for name in forbidden
+        if name in imported or any(m.startswith(name + ".") for m in imported)
+    ]
+
+
+def print_summary(summary):
+    """集計結果を表示"""
+    print(f"対象: {summary['module']}  モジュール数: {summary['module_count']}")
+    print(f"インポート合計: {summary['total_us'] / 1000:.1f}ms")
+    print(f"{'module':<40} {'cumulative[ms]':>15}")
+    for e in summary["top_level"]:
+        print(f"{e['module']:<40} {e['cumulative_us'] / 1000:>15.1f}")
+
+
+def main(argv=None):
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="起動時インポート時間のレポート")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output", help="集計結果のJSON出力先")
+    parser.add_argument("--baseline", help="比較するベースラインJSON")
+    parser.add_argument("--threshold", type=float, default=0.20, help="許容する悪化率")
+    parser.add_argument("--forbid", default="", help="起動時に読み込まれてはいけないモジュール（カンマ区切り）")
+    args = parser.parse_args(argv)
+
+    entries, error = measure_imports(args.module)
+    if error:
+        print(f"インポートに失敗しました:\n{error}")
+        return 1
+
+    summary = summarize(entries, args.module, args.top)
+    print_summary(summary)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    status = 0
+    forbidden = find_forbidden(summary, [m for m in args.forbid.split(",") if m])
+    if forbidden:
+        print(f"起動時に読み込まれています: {', '.join(forbidden)}")
+        status = 1
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        base_us = baseline.get("total_us", 0)
+        if base_us > 0:
+            change = summary["total_us"] / base_us - 1.0
+            print(f"ベースライン比: {change:+.1%}")
+            if change > args.threshold:
+                print(f"起動時間の劣化を検出しました（閾値 {args.threshold:.0%}）")
+                status = 1
+
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,15 +9,21 @@ import time
 class TimerController:
     """タイマーコントローラークラス"""
     
-    def __init__(self):
-        """初期化"""
+    def __init__(self, clock=time.time):
+        """
+        初期化
+
+        Args:
+            clock: 現在時刻（秒）を返す関数（シミュレーションでは仮想時計を渡す）
+        """
+        self.clock = clock
         self.start_time = None
         self.is_running = False
         self.stopped_time = None  # 停止時の経過時間を保存
         
     def start(self):
         """タイマーを開始"""
-        self.start_time = time.time()
+        self.start_time = self.clock()
         self.is_running = True
         self.stopped_time = None  # リセット
         
@@ -25,7 +31,7 @@ class TimerController:
         """タイマーを停止"""
         if self.is_running and self.start_time is not None:
             # 停止時に経過時間を保存
-            self.stopped_time = time.time() - self.start_time
+            self.stopped_time = self.clock() - self.start_time
         self.is_running = False
     
     def reset(self):
@@ -45,7 +51,7 @@ class TimerController:
             return 0.0
         
         if self.is_running:
-            return time.time() - self.start_time
+            return self.clock() - self.start_time
         else:
             # 停止している場合は、停止時に保存した経過時間を返す
             if self.stopped_time is not None:
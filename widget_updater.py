@@ -0,0 +1,63 @@
+"""
+WidgetUpdater - 変更があった場合のみウィジェットを更新するヘルパー
+setText/setValue/setPropertyは値が同じでも再レイアウトや再描画を発生させるため、
+現在の値と比較して異なる場合のみ反映し、反映・省略した回数を数える
+"""
+
+
+class WidgetUpdater:
+    """変更駆動のウィジェット更新クラス"""
+
+    def __init__(self, profiler=None):
+        """
+        初期化
+
+        Args:
+            profiler: 回数を記録するFrameProfiler（オプション）
+                'widget_applied' / 'widget_skipped' カウンタに加算する
+        """
+        self.profiler = profiler
+        self.counts = {"applied": 0, "skipped": 0}
+
+    def _record(self, applied):
+        """反映・省略の回数を記録"""
+        key = "applied" if applied else "skipped"
+        self.counts[key] += 1
+        if self.profiler is not None:
+            self.profiler.count(f"widget_{key}")
+        return applied
+
+    def set_text(self, widget, text):
+        """
+        テキストが異なる場合のみsetTextを呼ぶ
+
+        Returns:
+            反映した場合True
+        """
+        if widget.text() == text:
+            return self._record(False)
+        widget.setText(text)
+        return self._record(True)
+
+    def set_value(self, widget, value):
+        """値が異なる場合のみsetValueを呼ぶ"""
+        if widget.value() == value:
+            return self._record(False)
+        widget.setValue(value)
+        return self._record(True)
+
+    def set_property(self, widget, name, value):
+        """
+        動的プロパティが異なる場合のみ変更し、スタイルを再適用する
+
+        スタイルシートは [name="value"] セレクタで状態ごとの見た目を定義しておく
+        （スタイルシート自体は書き換えないため再解析されない）
+        """
+        if widget.property(name) == value:
+            return self._record(False)
+        widget.setProperty(name, value)
+        style = widget.style()
+        style.unpolish(widget)
+        style.polish(widget)
+        widget.update()
+        return self._record(True)
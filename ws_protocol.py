@@ -0,0 +1,263 @@
+"""
+WebSocketプロトコル - 標準ライブラリのみで実装した最小限のWebSocket（RFC 6455）
+asyncioのStreamReader/StreamWriterに対してハンドシェイクとフレームの読み書きを行う
+"""
+
+import asyncio
+import base64
+import hashlib
+import os
+import struct
+
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+MAX_MESSAGE_SIZE = 1 << 20  # 受信メッセージの上限（1MB、分割フレームの合計）
+
+CLOSE_INVALID_DATA = 1007  # テキストがUTF-8として不正
+CLOSE_MESSAGE_TOO_BIG = 1009
+
+
+class WebSocketClosed(Exception):
+    """WebSocket接続が閉じられた（codeはこちらから送るクローズコード）"""
+
+    def __init__(self, message="", code=None):
+        super().__init__(message)
+        self.code = code
+
+
+async def read_http_request(reader):
+    """
+    HTTPリクエストの先頭行とヘッダーを読み込む
+
+    Returns:
+        (method, path, headers) のタプル。headersのキーは小文字
+    """
+    request_line = (await reader.readline()).decode("latin-1").strip()
+    if not request_line:
+        raise ConnectionError("空のリクエスト")
+    method, path, _ = request_line.split(" ", 2)
+
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1")
+        if line in ("\r\n", "\n", ""):
+            break
+        key, _, value = line.partition(":")
+        headers[key.strip().lower()] = value.strip()
+    return method, path, headers
+
+
+def accept_key(key):
+    """Sec-WebSocket-Keyから応答用のSec-WebSocket-Acceptを計算"""
+    digest = hashlib.sha1((key + WS_GUID).encode("ascii")).digest()
+    return base64.b64encode(digest).decode("ascii")
+
+
+def is_websocket_request(headers):
+    """WebSocketへのアップグレード要求かどうか"""
+    return (
+        headers.get("upgrade", "").lower() == "websocket"
+        and "sec-websocket-key" in headers
+    )
+
+
+async def server_handshake(writer, headers):
+    """サーバー側のハンドシェイク応答を送信"""
+    response = (
+        "HTTP/1.1 101 Switching Protocols\r\n"
+        "Upgrade: websocket\r\n"
+        "Connection: Upgrade\r\n"
+        f"Sec-WebSocket-Accept: {accept_key(headers['sec-websocket-key'])}\r\n"
+        "\r\n"
+    )
+    writer.write(response.encode("ascii"))
+    await writer.drain()
+
+
+def encode_frame(payload, opcode=OP_TEXT, mask=False):
+    """
+    WebSocketフレームを作成
+
+    Args:
+        payload: 送信データ（bytes）
+        opcode: オペコード
+        mask: マスクするか（クライアントからの送信時はTrue）
+    """
+    header = bytearray([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    length = len(payload)
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < (1 << 16):
+        header.append(mask_bit | 126)
+        header += struct.pack("!H", length)
+    else:
+        header.append(mask_bit | 127)
+        header += struct.pack("!Q", length)
+
+    if mask:
+        key = os.urandom(4)
+        header += key
+        payload = _apply_mask(payload, key)
+    return bytes(header) + payload
+
+
+def _apply_mask(payload, key):
+    """マスク処理（XOR）"""
+    if not payload:
+        return b""
+    repeated = (key * (len(payload) // 4 + 1))[:len(payload)]
+    value = int.from_bytes(payload, "big") ^ int.from_bytes(repeated, "big")
+    return value.to_bytes(len(payload), "big")
+
+
+async def write_message(writer, data, mask=False):
+    """
+    メッセージを送信（strはテキスト、bytesはバイナリとして送信）
+    """
+    if isinstance(data, str):
+        frame = encode_frame(data.encode("utf-8"), OP_TEXT, mask)
+    else:
+        frame = encode_frame(bytes(data), OP_BINARY, mask)
+    writer.write(frame)
+    await writer.drain()
+
+
+async def _read_frame(reader):
+    """1フレームを読み込み (fin, opcode, payload) を返す"""
+    head = await reader.readexactly(2)
+    fin = bool(head[0] & 0x80)
+    opcode = head[0] & 0x0F
+    masked = bool(head[1] & 0x80)
+    length = head[1] & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", await reader.readexactly(8))[0]
+    if length > MAX_MESSAGE_SIZE:
+        raise WebSocketClosed("メッセージが大きすぎます", CLOSE_MESSAGE_TOO_BIG)
+
+    key = await reader.readexactly(4) if masked else None
+    payload = await reader.readexactly(length) if length else b""
+    if key:
+        payload = _apply_mask(payload, key)
+    return fin, opcode, payload
+
+
+async def read_message(reader, writer, mask_replies=False):
+    """
+    メッセージを1件受信（分割フレームの結合とping/closeの処理を含む）
+
+    Returns:
+        テキストならstr、バイナリならbytes
+
+    Raises:
+        WebSocketClosed: 接続が閉じられた場合
+    """
+    chunks = []
+    total = 0
+    message_opcode = None
+    while True:
+        try:
+            fin, opcode, payload = await _read_frame(reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            raise WebSocketClosed("接続が切断されました")
+        except WebSocketClosed as e:
+            await _send_close(writer, e.code, mask_replies)
+            raise
+
+        if opcode == OP_CLOSE:
+            try:
+                writer.write(encode_frame(payload[:2], OP_CLOSE, mask_replies))
+                await writer.drain()
+            except ConnectionError:
+                pass
+            raise WebSocketClosed("クローズフレームを受信しました")
+        if opcode == OP_PING:
+            writer.write(encode_frame(payload, OP_PONG, mask_replies))
+            await writer.drain()
+            continue
+        if opcode == OP_PONG:
+            continue
+
+        if opcode != OP_CONTINUATION:
+            message_opcode = opcode
+        total += len(payload)
+        if total > MAX_MESSAGE_SIZE:
+            # 1フレームずつは上限以下でも、分割フレームの合計で上限を超えた場合は切断する
+            await _send_close(writer, CLOSE_MESSAGE_TOO_BIG, mask_replies)
+            raise WebSocketClosed("メッセージが大きすぎます", CLOSE_MESSAGE_TOO_BIG)
+        chunks.append(payload)
+        if fin:
+            data = b"".join(chunks)
+            if message_opcode != OP_TEXT:
+                return data
+            try:
+                return data.decode("utf-8")
+            except UnicodeDecodeError:
+                await _send_close(writer, CLOSE_INVALID_DATA, mask_replies)
+                raise WebSocketClosed("テキストがUTF-8として不正です", CLOSE_INVALID_DATA)
+
+
+async def _send_close(writer, code, mask=False):
+    """クローズコードを付けてクローズフレームを送信（codeがNoneの場合は何もしない）"""
+    if code is None:
+        return
+    try:
+        writer.write(encode_frame(struct.pack("!H", code), OP_CLOSE, mask))
+        await writer.drain()
+    except ConnectionError:
+        pass
+
+
+async def close(writer, mask=False):
+    """クローズフレームを送信して接続を閉じる"""
+    try:
+        writer.write(encode_frame(struct.pack("!H", 1000), OP_CLOSE, mask))
+        await writer.drain()
+    except ConnectionError:
+        pass
+    writer.close()
+
+
+async def client_connect(host, port, path="/ws"):
+    """
+    クライアントとしてWebSocket接続を確立（負荷試験用）
+
+    Returns:
+        (reader, writer) のタプル
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    key = base64.b64encode(os.urandom(16)).decode("ascii")
+    request = (
+        f"GET {path} HTTP/1.1\r\n"
+        f"Host: {host}:{port}\r\n"
+        "Upgrade: websocket\r\n"
+        "Connection: Upgrade\r\n"
+        f"Sec-WebSocket-Key: {key}\r\n"
+        "Sec-WebSocket-Version: 13\r\n"
+        "\r\n"
+    )
+    writer.write(request.encode("ascii"))
+    await writer.drain()
+
+    status = (await reader.readline()).decode("latin-1")
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1")
+        if line in ("\r\n", "\n", ""):
+            break
+        k, _, v = line.partition(":")
+        headers[k.strip().lower()] = v.strip()
+    if " 101 " not in status or headers.get("sec-websocket-accept") != accept_key(key):
+        writer.close()
+        raise ConnectionError(f"WebSocketハンドシェイクに失敗しました: {status.strip()}")
+    return reader, writer